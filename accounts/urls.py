@@ -10,4 +10,5 @@ urlpatterns = [
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('profile/', views.profile, name='profile'),
     path('recharge/', views.recharge, name='recharge'),
+    path('transactions/', views.transactions, name='transactions'),
 ]
@@ -4,7 +4,9 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
 from .forms import CustomUserCreationForm, UserProfileForm, RechargeForm
+from lottery import counters
 from lottery.models import UserProfile, Transaction, LotteryTicket
+from lottery.pagination import CursorPaginator
 
 
 def register(request):
@@ -13,6 +15,7 @@ def register(request):
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
             user = form.save()
+            counters.increment(total_users=1)
             login(request, user)
             messages.success(request, '등록 성공! 복권 사이트에 오신 것을 환영합니다!')
             return redirect('lottery:home')
@@ -39,7 +42,9 @@ def profile(request):
         form = UserProfileForm(instance=user_profile)
     
     # 사용자의 복권 구매 기록 가져오기
-    tickets = LotteryTicket.objects.filter(user=request.user).order_by('-purchase_time')[:10]
+    tickets = LotteryTicket.objects.filter(user=request.user).select_related(
+        'lottery_draw__lottery_type'
+    ).order_by('-purchase_time')[:10]
     
     # 거래 기록 가져오기
     transactions = Transaction.objects.filter(user=request.user)[:10]
@@ -84,4 +89,18 @@ def recharge(request):
     else:
         form = RechargeForm()
     
-    return render(request, 'accounts/recharge.html', {'form': form, 'user_profile': user_profile})
\ No newline at end of file
+    return render(request, 'accounts/recharge.html', {'form': form, 'user_profile': user_profile})
+
+
+TRANSACTION_PAGE_SIZE = 20
+
+
+@login_required
+def transactions(request):
+    """거래 내역"""
+    transactions_list = Transaction.objects.filter(user=request.user)
+    
+    paginator = CursorPaginator(transactions_list, ('-created_at', '-id'), TRANSACTION_PAGE_SIZE)
+    page = paginator.get_page(request.GET)
+    
+    return render(request, 'accounts/transactions.html', {'transactions': page})
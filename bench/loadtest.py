@@ -0,0 +1,87 @@
+"""HTTP 并发负载测试
+
+用 asyncio 直接建立 TCP 连接发送 HTTP/1.1 GET（每个请求一个连接，
+与大量客户端同时轮询的情形一致），在给定并发连接数下统计吞吐量、
+延迟分位数和失败数。不依赖第三方 HTTP 客户端，可以对同一个 URL
+分别测试 WSGI（同步 worker）和 ASGI（uvicorn worker）部署。
+"""
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from .runner import percentile
+
+
+class LoadResult:
+    """一轮负载测试的结果"""
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.latencies = []
+        self.status_counts = {}
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def completed(self):
+        return len(self.latencies)
+
+    @property
+    def requests_per_second(self):
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'connections': self.connections,
+            'completed': self.completed,
+            'errors': self.errors,
+            'status_counts': {str(status): count for status, count in sorted(self.status_counts.items())},
+            'requests_per_second': round(self.requests_per_second, 1),
+            'p50_ms': round(percentile(self.latencies, 50), 2),
+            'p90_ms': round(percentile(self.latencies, 90), 2),
+            'p99_ms': round(percentile(self.latencies, 99), 2),
+            'max_ms': round(max(self.latencies), 2) if self.latencies else 0.0,
+        }
+
+
+async def fetch(host, port, path, headers=None, timeout=30.0):
+    """发送一个 GET 请求，返回状态码（读完响应后关闭连接）"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        lines = [f'GET {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: close']
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run_load(url, connections, requests, headers=None, timeout=30.0):
+    """保持 connections 个并发连接，共发送 requests 个请求"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    path = parts.path or '/'
+    if parts.query:
+        path = f'{path}?{parts.query}'
+
+    result = LoadResult(connections)
+    remaining = iter(range(requests))
+
+    async def client():
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                status = await fetch(host, port, path, headers, timeout)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                result.errors += 1
+                continue
+            result.latencies.append((time.perf_counter() - started) * 1000)
+            result.status_counts[status] = result.status_counts.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    result.elapsed = time.perf_counter() - started
+    return result
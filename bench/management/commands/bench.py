@@ -0,0 +1,129 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from bench.plans import explain_queries
+from bench.runner import compare, measure
+from bench.scenarios import BENCH_DRAWS, BenchContext, build_scenarios, prepare_data, users_for_size
+from lottery.bitmask import np
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+class Command(BaseCommand):
+    help = '在独立的测试数据库中对购买、开奖和报表等热点路径进行基准测试'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000', help='每期彩票数量，逗号分隔的多个规模')
+        parser.add_argument('--iterations', type=int, default=20, help='每个场景计时的调用次数')
+        parser.add_argument('--warmup', type=int, default=2, help='每个场景计时前的预热次数')
+        parser.add_argument('--draw-iterations', type=int, default=3, help='开奖场景的调用次数')
+        parser.add_argument('--scenarios', help='只运行指定场景，逗号分隔')
+        parser.add_argument('--seed', type=int, default=0, help='生成数据的随机种子')
+        parser.add_argument('--output', '-o', default='bench_results.json', help='结果 JSON 文件路径')
+        parser.add_argument('--compare', help='与之前的结果 JSON 比较')
+        parser.add_argument('--threshold', type=float, default=0.2, help='p50 延迟或内存增加超过该比例视为退化')
+        parser.add_argument('--fail-on-regression', action='store_true', help='发现退化时以非零状态退出')
+        parser.add_argument('--keepdb', action='store_true', help='保留测试数据库')
+        parser.add_argument('--explain', action='store_true', help='输出热点查询的执行计划')
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('bench 需要安装 NumPy')
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes 应为逗号分隔的整数')
+        selected = set(options['scenarios'].split(',')) if options['scenarios'] else None
+
+        report = {
+            'meta': {
+                'revision': _git_revision(),
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'draws': BENCH_DRAWS,
+            },
+            'results': {},
+        }
+        if options['explain']:
+            report['plans'] = {}
+
+        # 在测试数据库中运行，不影响当前数据库的数据
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            report['meta']['database'] = connection.vendor
+            for size in sizes:
+                self.stdout.write(f'准备数据: 每期 {size} 张 x {BENCH_DRAWS} 期，{users_for_size(size)} 个用户')
+                prepare_data(size, seed=options['seed'])
+                context = BenchContext(size, seed=options['seed'])
+                if options['explain']:
+                    report['plans'][str(size)] = self._explain(context)
+                results = report['results'][str(size)] = {}
+                for scenario in build_scenarios(context, options['draw_iterations']):
+                    if selected and scenario.name not in selected:
+                        continue
+                    stats = measure(scenario, options['iterations'], options['warmup'])
+                    results[scenario.name] = stats
+                    self.stdout.write(
+                        f"  {scenario.name:<18} p50 {stats['p50_ms']:>9.2f} ms  p90 {stats['p90_ms']:>9.2f} ms  "
+                        f"p99 {stats['p99_ms']:>9.2f} ms  {stats['queries']:>4} 次查询  "
+                        f"{stats['peak_memory_kb']:>9.1f} KB"
+                    )
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f'结果已写入 {options["output"]}'))
+
+        if options['compare']:
+            self._compare(options['compare'], report, options['threshold'], options['fail_on_regression'])
+
+    def _explain(self, context):
+        plans = explain_queries(context)
+        for name, entry in plans.items():
+            label = '全表扫描' if entry['full_scan'] else '索引'
+            style = self.style.WARNING if entry['full_scan'] else self.style.SUCCESS
+            self.stdout.write(style(f'  EXPLAIN {name:<18} {label}'))
+            for line in entry['plan'].splitlines():
+                self.stdout.write(f'      {line}')
+        return plans
+
+    def _compare(self, path, report, threshold, fail_on_regression):
+        try:
+            with open(path, encoding='utf-8') as previous_file:
+                previous = json.load(previous_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'无法读取比较文件 {path}: {e}')
+
+        regressions = 0
+        self.stdout.write(f"与 {previous.get('meta', {}).get('revision') or path} 比较:")
+        for size, name, metric, before, after, regressed in compare(previous, report, threshold):
+            line = f'  [{size}] {name:<18} {metric:<15} {before:>10} -> {after:>10}'
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line + '  退化'))
+            else:
+                self.stdout.write(line)
+
+        if regressions and fail_on_regression:
+            raise CommandError(f'发现 {regressions} 项性能退化')
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from bench.loadtest import run_load
+
+
+class Command(BaseCommand):
+    help = '对运行中的服务发起并发 HTTP 请求，比较 WSGI 与 ASGI 部署的并发连接承载能力'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='测试的完整 URL，例如 http://127.0.0.1:8000/api/v1/draws/latest/')
+        parser.add_argument('--connections', default='50,200,1000', help='并发连接数，逗号分隔的多个级别')
+        parser.add_argument('--requests', type=int, default=2000, help='每个级别发送的请求总数')
+        parser.add_argument('--header', action='append', default=[], help='附加请求头，如 "Cookie: sessionid=..."')
+        parser.add_argument('--timeout', type=float, default=30.0, help='单个请求的超时秒数')
+        parser.add_argument('--label', default='', help='结果标签，例如 wsgi 或 asgi')
+        parser.add_argument('--output', '-o', help='结果 JSON 文件路径')
+        parser.add_argument('--compare', help='与之前的结果 JSON 并列显示')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['connections'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError('--connections 应为逗号分隔的整数')
+        headers = {}
+        for header in options['header']:
+            name, separator, value = header.partition(':')
+            if not separator:
+                raise CommandError(f'请求头格式应为 "名称: 值": {header}')
+            headers[name.strip()] = value.strip()
+
+        report = {
+            'meta': {
+                'url': options['url'],
+                'label': options['label'],
+                'requests': options['requests'],
+                'created_at': timezone.now().isoformat(),
+            },
+            'results': {},
+        }
+        for connections in levels:
+            result = asyncio.run(run_load(
+                options['url'], connections, options['requests'], headers, options['timeout'],
+            ))
+            stats = report['results'][str(connections)] = result.as_dict()
+            self.stdout.write(
+                f"  {connections:>5} 连接  {stats['requests_per_second']:>8.1f} 次/秒  "
+                f"p50 {stats['p50_ms']:>8.2f} ms  p99 {stats['p99_ms']:>9.2f} ms  "
+                f"失败 {stats['errors']}  状态 {stats['status_counts']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'结果已写入 {options["output"]}'))
+
+        if options['compare']:
+            self._compare(options['compare'], report)
+
+    def _compare(self, path, report):
+        try:
+            with open(path, encoding='utf-8') as previous_file:
+                previous = json.load(previous_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'无法读取比较文件 {path}: {e}')
+
+        before_label = previous.get('meta', {}).get('label') or path
+        after_label = report['meta']['label'] or '本次'
+        self.stdout.write(f'{before_label} -> {after_label}:')
+        for connections, stats in report['results'].items():
+            old = previous.get('results', {}).get(connections)
+            if old is None:
+                continue
+            self.stdout.write(
+                f"  {connections:>5} 连接  {old['requests_per_second']:>8.1f} -> {stats['requests_per_second']:>8.1f} 次/秒  "
+                f"p99 {old['p99_ms']:>9.2f} -> {stats['p99_ms']:>9.2f} ms  "
+                f"失败 {old['errors']} -> {stats['errors']}"
+            )
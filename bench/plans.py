@@ -0,0 +1,53 @@
+"""热点查询的执行计划
+
+对各视图实际使用的查询执行 EXPLAIN，并判断是否走了索引。
+SQLite 中全表扫描显示为 "SCAN 表名"，PostgreSQL 中显示为 "Seq Scan"。
+"""
+import re
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from lottery.models import LotteryDraw, LotteryTicket, Transaction
+from management.views import USER_ORDERING, USER_PAGE_SIZE, user_list
+
+
+# SQLite 的 "SCAN 表名"（不含 USING INDEX）和 PostgreSQL 的 "Seq Scan"
+_FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?\w+(?!.*\bUSING (?:COVERING )?INDEX\b)|\bSeq Scan\b')
+
+
+def uses_full_scan(plan):
+    """计划中是否有全表扫描"""
+    return any(_FULL_SCAN.search(line) for line in plan.splitlines())
+
+
+def build_queries(context):
+    """[(名称, 查询集)]，参数取自基准数据中购买最多的用户"""
+    user = context.user
+    lottery_type = context.lottery_type
+    draw = LotteryDraw.objects.filter(is_drawn=True).order_by('-draw_date').first()
+    since = timezone.now() - timedelta(days=30)
+    return [
+        ('my_tickets', LotteryTicket.objects.filter(user=user).order_by('-purchase_time')[:20]),
+        ('recent_sales', LotteryTicket.objects.order_by('-purchase_time')[:10]),
+        ('draw_winners', LotteryTicket.objects.filter(lottery_draw=draw, is_winning=True)),
+        ('user_winnings', LotteryTicket.objects.filter(user=user, is_winning=True, lottery_draw__is_drawn=True)),
+        ('unclaimed_winnings', LotteryTicket.objects.filter(user=user, is_winning=True, is_claimed=False)),
+        ('open_draw', LotteryDraw.objects.filter(lottery_type=lottery_type, is_drawn=False).order_by('draw_date')[:1]),
+        ('recent_draws', LotteryDraw.objects.filter(
+            lottery_type=lottery_type, is_drawn=True).order_by('-draw_date')[:10]),
+        ('user_transactions', Transaction.objects.filter(user=user)[:10]),
+        ('transaction_totals', Transaction.objects.filter(
+            transaction_type='purchase', created_at__gte=since).values('transaction_type').annotate(total=Sum('amount'))),
+        ('user_management', user_list().order_by(*USER_ORDERING)[:USER_PAGE_SIZE + 1]),
+    ]
+
+
+def explain_queries(context):
+    """{名称: {'plan': 执行计划, 'full_scan': 是否全表扫描}}"""
+    plans = {}
+    for name, queryset in build_queries(context):
+        plan = queryset.explain()
+        plans[name] = {'plan': plan, 'full_scan': uses_full_scan(plan)}
+    return plans
@@ -0,0 +1,96 @@
+"""基准测试计时与结果比较
+
+每个场景先预热，再计时多次调用得到延迟分位数，最后单独调用一次
+记录 SQL 查询数量和 Python 内存峰值（tracemalloc 会拖慢计时，所以不和计时混在一起）。
+"""
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, percent):
+    """线性插值分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Scenario:
+    """一个基准场景
+
+    prepare() 在每次调用前执行且不计时，返回值作为参数传给 run()。
+    iterations、warmup 为 None 时使用 measure() 的参数。
+    """
+
+    def __init__(self, name, run, prepare=None, iterations=None, warmup=None):
+        self.name = name
+        self.run = run
+        self.prepare = prepare
+        self.iterations = iterations
+        self.warmup = warmup
+
+    def call(self):
+        args = self.prepare() if self.prepare is not None else ()
+        started = time.perf_counter()
+        self.run(*args)
+        return time.perf_counter() - started
+
+
+def measure(scenario, iterations=20, warmup=2):
+    """计时并返回统计结果（毫秒、查询数、KB）"""
+    iterations = scenario.iterations or iterations
+    if scenario.warmup is not None:
+        warmup = scenario.warmup
+    for _ in range(warmup):
+        scenario.call()
+
+    timings = [scenario.call() * 1000 for _ in range(iterations)]
+
+    args = scenario.prepare() if scenario.prepare is not None else ()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            scenario.run(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p90_ms': round(percentile(timings, 90), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': len(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(previous, current, threshold=0.2):
+    """比较两次结果，返回 [(规模, 场景, 指标, 旧值, 新值, 是否退化)]
+
+    延迟以 p50 为准，超过 threshold 比例视为退化；查询数增加即视为退化。
+    """
+    rows = []
+    for size, scenarios in current.get('results', {}).items():
+        for name, stats in scenarios.items():
+            old = previous.get('results', {}).get(size, {}).get(name)
+            if old is None:
+                continue
+            for metric in ('p50_ms', 'queries', 'peak_memory_kb'):
+                before, after = old.get(metric), stats.get(metric)
+                if before is None or after is None:
+                    continue
+                if metric == 'queries':
+                    regressed = after > before
+                else:
+                    regressed = before > 0 and (after - before) / before > threshold
+                rows.append((size, name, metric, before, after, regressed))
+    return rows
@@ -0,0 +1,134 @@
+"""基准场景
+
+按数据规模用 seed_load 生成数据，然后通过测试客户端请求各个热点视图，
+覆盖完整的 URL 解析、中间件、视图和模板渲染开销。
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from lottery.bitmask import np
+from lottery.models import LotteryDraw, LotteryTicket, LotteryType, UserProfile
+from lottery.pagination import CursorPaginator
+from lottery.seeding import seed_load, seed_tickets
+from lottery.ticket_numbers import reset_allocator
+from management.jobs import run_job
+from management.models import DrawJob
+
+from .runner import Scenario
+
+
+# init_data 有 4 种彩票，每种最后一期保持在售，其余期次已开奖
+BENCH_DRAWS = 8
+BENCH_PREFIX = 'bench'
+
+
+class BenchError(Exception):
+    """场景请求返回了意外的结果"""
+
+
+def _expect(response, status_code, name):
+    if response.status_code != status_code:
+        raise BenchError(f'{name}: HTTP {response.status_code}')
+
+
+def users_for_size(size):
+    return max(50, size // 20)
+
+
+def prepare_data(size, seed=0):
+    """清空数据库并生成 BENCH_DRAWS 期、每期 size 张彩票的数据"""
+    call_command('flush', interactive=False, verbosity=0)
+    cache.clear()
+    # 清空后号码序列从头开始，丢弃本进程已预留的号码区间
+    reset_allocator()
+    call_command('init_data', stdout=StringIO())
+    lottery_types = list(LotteryType.objects.filter(is_active=True).order_by('id'))
+    seed_load(users_for_size(size), BENCH_DRAWS, size, lottery_types, seed=seed, prefix=BENCH_PREFIX)
+    # 与长期运行的数据库一样，让查询规划器掌握表和索引的统计信息
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+class BenchContext:
+    """场景共用的客户端与数据"""
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        # 购买最多的用户最能体现按用户查询的开销
+        heavy_user_id = (LotteryTicket.objects.values('user').annotate(count=Count('id'))
+                         .order_by('-count').values_list('user', flat=True).first())
+        self.user = User.objects.get(pk=heavy_user_id)
+        UserProfile.objects.filter(user=self.user).update(balance=10 ** 7)
+        self.admin = User.objects.get(username='admin')
+
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+        self.lottery_type = LotteryType.objects.filter(is_active=True).order_by('id').first()
+        self.user_ids = np.asarray(
+            User.objects.filter(username__startswith=f'{BENCH_PREFIX}_').order_by('id').values_list('id', flat=True),
+            dtype=np.int64,
+        )
+        self.weights = np.full(len(self.user_ids), 1 / len(self.user_ids))
+        self.draw_sequence = 0
+        # 我的彩票列表最后一页之前的位置（深分页的成本也应与第一页相同）
+        ordering = ('-purchase_time', '-id')
+        oldest = LotteryTicket.objects.filter(user=self.user).order_by(*ordering)
+        deep_ticket = oldest[max(0, oldest.count() - 11)]
+        self.deep_tickets_cursor = CursorPaginator(oldest, ordering, 10).cursor_for(deep_ticket)
+
+    def get(self, client, url, data=None):
+        _expect(client.get(url, data), 200, url)
+
+    def purchase(self):
+        response = self.client.post(reverse('lottery:purchase_lottery', args=[self.lottery_type.id]), {
+            'lottery_type': self.lottery_type.id,
+            'is_auto_select': True,
+            'selected_numbers': '',
+        })
+        _expect(response, 302, 'purchase_lottery')
+
+    def new_draw_with_tickets(self):
+        """为开奖场景准备一个有 size 张彩票的新期次（不计时）"""
+        self.draw_sequence += 1
+        draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type,
+            draw_number=f'BENCH-DRAW-{self.draw_sequence:04d}',
+            draw_date=timezone.now() + timedelta(hours=1),
+        )
+        seed_tickets(draw, self.user_ids, self.weights, self.size, self.rng)
+        return (draw,)
+
+    def conduct_draw(self, draw):
+        response = self.admin_client.post(reverse('management:conduct_draw', args=[draw.id]))
+        _expect(response, 302, 'conduct_draw')
+        run_job(DrawJob.objects.get(lottery_draw=draw))
+
+
+def build_scenarios(context, draw_iterations=3):
+    return [
+        Scenario('purchase_lottery', context.purchase),
+        Scenario('check_winnings', lambda: context.get(context.client, reverse('lottery:check_winnings'))),
+        Scenario('my_tickets', lambda: context.get(context.client, reverse('lottery:my_tickets'))),
+        Scenario('my_tickets_deep', lambda: context.get(
+            context.client, reverse('lottery:my_tickets'), {'after': context.deep_tickets_cursor})),
+        Scenario('sales_report', lambda: context.get(
+            context.admin_client, reverse('management:sales_report'), {'range': '30'})),
+        Scenario('user_management', lambda: context.get(
+            context.admin_client, reverse('management:user_management'))),
+        # 开奖包括提交任务和后台结算，每次都需要新的期次，因此只运行少量次数且不预热
+        Scenario('conduct_draw', context.conduct_draw, prepare=context.new_draw_with_tickets,
+                 iterations=draw_iterations, warmup=0),
+    ]
@@ -0,0 +1,102 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from .runner import Scenario, compare, measure, percentile
+
+
+class RunnerTests(TestCase):
+    def test_percentile(self):
+        """测试分位数计算"""
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile(values, 100), 5)
+        self.assertEqual(percentile([1, 2], 50), 1.5)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_measure_records_queries_and_prepare(self):
+        """测试计时结果包含查询数，且 prepare 的参数传给场景"""
+        prepared = []
+
+        def prepare():
+            prepared.append(len(prepared))
+            return (prepared[-1],)
+
+        def run(value):
+            User.objects.filter(pk=value).exists()
+            User.objects.count()
+
+        stats = measure(Scenario('users', run, prepare=prepare, iterations=3), warmup=1)
+        self.assertEqual(stats['iterations'], 3)
+        self.assertEqual(stats['queries'], 2)
+        # 预热 1 次 + 计时 3 次 + 统计查询 1 次
+        self.assertEqual(len(prepared), 5)
+        self.assertLessEqual(stats['p50_ms'], stats['max_ms'])
+
+    def test_compare_flags_regressions(self):
+        """测试比较结果时标记延迟和查询数退化"""
+        previous = {'results': {'1000': {'my_tickets': {'p50_ms': 10.0, 'queries': 5, 'peak_memory_kb': 100.0}}}}
+        current = {'results': {'1000': {
+            'my_tickets': {'p50_ms': 11.0, 'queries': 6, 'peak_memory_kb': 200.0},
+            'new_scenario': {'p50_ms': 1.0, 'queries': 1, 'peak_memory_kb': 1.0},
+        }}}
+
+        rows = {metric: regressed for _, _, metric, _, _, regressed in compare(previous, current, threshold=0.2)}
+        self.assertEqual(rows, {'p50_ms': False, 'queries': True, 'peak_memory_kb': True})
+
+
+class PlanTests(TestCase):
+    def test_uses_full_scan(self):
+        """测试识别 SQLite 和 PostgreSQL 执行计划中的全表扫描"""
+        from .plans import uses_full_scan
+
+        self.assertTrue(uses_full_scan('3 0 0 SCAN lottery_lotteryticket'))
+        self.assertTrue(uses_full_scan('Seq Scan on lottery_transaction  (cost=0.00..1.01 rows=1 width=8)'))
+        self.assertFalse(uses_full_scan('5 0 0 SEARCH lottery_lotteryticket USING INDEX ticket_user_purchase_idx (user_id=?)'))
+        self.assertFalse(uses_full_scan('5 0 0 SCAN lottery_lotteryticket USING INDEX ticket_purchase_time_idx'))
+        self.assertFalse(uses_full_scan('Index Scan using txn_user_created_idx on lottery_transaction'))
+
+    def test_hot_queries_use_indexes(self):
+        """测试热点查询都能使用索引"""
+        from types import SimpleNamespace
+
+        from django.utils import timezone
+
+        from lottery.models import LotteryDraw, LotteryType
+
+        from .plans import explain_queries
+
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3
+        )
+        LotteryDraw.objects.create(
+            lottery_type=lottery_type, draw_number='TEST-001', draw_date=timezone.now(), is_drawn=True
+        )
+        plans = explain_queries(SimpleNamespace(user=user, lottery_type=lottery_type))
+        self.assertEqual([name for name, entry in plans.items() if entry['full_scan']], [])
+
+
+class LoadTestTests(TestCase):
+    def test_run_load(self):
+        """测试负载测试统计并发请求的状态码和延迟"""
+        import asyncio
+
+        from .loadtest import run_load
+
+        async def handle(reader, writer):
+            await reader.readuntil(b'\r\n\r\n')
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok')
+            await writer.drain()
+            writer.close()
+
+        async def scenario():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await run_load(f'http://127.0.0.1:{port}/api/v1/draws/latest/', 5, 20)
+
+        stats = asyncio.run(scenario()).as_dict()
+        self.assertEqual(stats['completed'], 20)
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['status_counts'], {'200': 20})
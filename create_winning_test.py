@@ -95,6 +95,7 @@ def create_winning_test():
     Transaction.objects.create(
         user=alex_user,
         transaction_type='purchase',
+        lottery_type=lottery_type,
         amount=total_cost,
         description=f'테스트 복권 구매 - 총 4장'
     )
@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import LotteryType, LotteryDraw, LotteryTicket, UserProfile, Transaction
+from .models import LotteryType, LotteryDraw, LotteryTicket, PrizeTier, UserProfile, Transaction, DailySalesRollup, DrawEvent
+
+
+class PrizeTierInline(admin.TabularInline):
+    model = PrizeTier
+    extra = 1
 
 
 @admin.register(LotteryType)
@@ -8,6 +13,7 @@ class LotteryTypeAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'created_at']
     search_fields = ['name']
     ordering = ['-created_at']
+    inlines = [PrizeTierInline]
 
 
 @admin.register(LotteryDraw)
@@ -41,4 +47,19 @@ class TransactionAdmin(admin.ModelAdmin):
     list_filter = ['transaction_type', 'created_at']
     search_fields = ['user__username', 'description']
     ordering = ['-created_at']
-    readonly_fields = ['created_at']
\ No newline at end of file
+    readonly_fields = ['created_at']
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'lottery_type', 'tickets', 'revenue', 'winnings_paid']
+    list_filter = ['lottery_type', 'date']
+    ordering = ['-date']
+
+
+@admin.register(DrawEvent)
+class DrawEventAdmin(admin.ModelAdmin):
+    list_display = ['lottery_draw', 'kind', 'created_at']
+    list_filter = ['kind', 'created_at']
+    ordering = ['-id']
+    readonly_fields = ['created_at']
@@ -0,0 +1,338 @@
+"""JSON API (v1)
+
+복권 유형, 판매 중인 회차, 추첨 결과, 내 복권을 JSON 으로 제공한다. 모델
+인스턴스를 만들지 않고 `.values()` 의 딕셔너리를 그대로 직렬화하며,
+`?fields=` 로 필요한 필드만 조회한다. 목록은 커서 페이지네이션
+(`?after=` / `?before=`, `?limit=`) 을 쓰고, 응답 본문의 해시를 ETag 로
+보내 `If-None-Match` 재검증 시 304 로 응답한다.
+
+최신 추첨 결과와 당첨 현황은 추첨 직후 대량 폴링을 받는 비동기 뷰다.
+Django 3.2 에는 비동기 ORM 도 비동기 캐시 API 도 없으므로, 캐시 조회와 캐시에
+없을 때의 데이터베이스 조회를 한 번의 sync_to_async 호출로 스레드에서 실행해
+네트워크 캐시(memcached 등)를 쓰더라도 이벤트 루프를 막지 않는다. 추첨 이벤트
+스트림은 lottery.events 참고.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, Sum
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
+
+from .events import events_after, existing_draw_ids, format_event, parse_draw_ids, parse_last_event_id, retry_ms
+from .models import LotteryDraw, LotteryTicket, LotteryType
+from .page_cache import content_version
+from .pagination import CursorPaginator, InvalidCursor
+
+
+API_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+LATEST_RESULTS_PREFIX = 'api_latest_results:'
+WINNINGS_STATUS_PREFIX = 'api_winnings_status:'
+
+
+def _numbers(value):
+    return [int(number) for number in value.split(',')] if value else []
+
+
+class ApiResource:
+    """API 응답 필드 정의, fields 는 [(응답 필드명, ORM 경로)]"""
+
+    def __init__(self, fields, ordering=(), converters=None):
+        self.fields = dict(fields)
+        self.ordering = ordering
+        self.converters = converters or {}
+
+    def select(self, requested):
+        """?fields= 값을 응답 필드 목록으로 변환 (알 수 없는 필드면 ValueError)"""
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ValueError(', '.join(unknown) or requested)
+        return names
+
+    def values(self, queryset, names):
+        """선택한 필드와 정렬 키만 조회하는 values() 쿼리셋"""
+        keys = list(dict.fromkeys(names + [name.lstrip('-') for name in self.ordering]))
+        plain = [name for name in keys if self.fields[name] == name]
+        aliased = {name: F(self.fields[name]) for name in keys if self.fields[name] != name}
+        return queryset.values(*plain, **aliased)
+
+    def serialize(self, rows, names):
+        converters = self.converters
+        return [
+            {name: converters[name](row[name]) if name in converters else row[name] for name in names}
+            for row in rows
+        ]
+
+
+LOTTERY_TYPE_RESOURCE = ApiResource([
+    ('id', 'id'),
+    ('name', 'name'),
+    ('description', 'description'),
+    ('price', 'price'),
+    ('max_number', 'max_number'),
+    ('numbers_count', 'numbers_count'),
+])
+
+DRAW_RESOURCE = ApiResource([
+    ('id', 'id'),
+    ('lottery_type_id', 'lottery_type_id'),
+    ('lottery_type_name', 'lottery_type__name'),
+    ('draw_number', 'draw_number'),
+    ('draw_date', 'draw_date'),
+    ('winning_numbers', 'winning_numbers'),
+], ordering=('-draw_date', '-id'), converters={'winning_numbers': _numbers})
+
+OPEN_DRAW_RESOURCE = ApiResource([
+    ('id', 'id'),
+    ('lottery_type_id', 'lottery_type_id'),
+    ('lottery_type_name', 'lottery_type__name'),
+    ('draw_number', 'draw_number'),
+    ('draw_date', 'draw_date'),
+], ordering=('draw_date', 'id'))
+
+TICKET_RESOURCE = ApiResource([
+    ('id', 'id'),
+    ('ticket_number', 'ticket_number'),
+    ('lottery_draw_id', 'lottery_draw_id'),
+    ('draw_number', 'lottery_draw__draw_number'),
+    ('lottery_type_name', 'lottery_draw__lottery_type__name'),
+    ('selected_numbers', 'selected_numbers'),
+    ('is_auto_select', 'is_auto_select'),
+    ('purchase_time', 'purchase_time'),
+    ('is_drawn', 'lottery_draw__is_drawn'),
+    ('match_count', 'match_count'),
+    ('is_winning', 'is_winning'),
+    ('winning_amount', 'winning_amount'),
+    ('is_claimed', 'is_claimed'),
+], ordering=('-purchase_time', '-id'), converters={'selected_numbers': _numbers})
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def _json_response(request, payload, public=True):
+    """본문 해시를 ETag 로 붙인 JSON 응답 (If-None-Match 가 같으면 304)"""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    if public:
+        patch_cache_control(response, public=True, max_age=0)
+    else:
+        patch_cache_control(response, private=True, max_age=0)
+    return response
+
+
+def _page_size(request):
+    value = request.GET.get('limit')
+    if value is None:
+        return API_PAGE_SIZE
+    size = int(value)
+    if size < 1:
+        raise ValueError(value)
+    return min(size, MAX_PAGE_SIZE)
+
+
+def _list_response(request, queryset, resource, public=True):
+    try:
+        names = resource.select(request.GET.get('fields'))
+    except ValueError as e:
+        return _error(f'알 수 없는 필드: {e}')
+    try:
+        per_page = _page_size(request)
+    except ValueError:
+        return _error('limit 은 1 이상의 정수여야 합니다')
+
+    paginator = CursorPaginator(resource.values(queryset, names), resource.ordering, per_page)
+    try:
+        page = paginator.get_page(request.GET, strict=True)
+    except InvalidCursor:
+        return _error('after / before 커서가 올바르지 않습니다')
+    return _json_response(request, {
+        'results': resource.serialize(page, names),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }, public)
+
+
+def _filter_lottery_type(request, queryset, field='lottery_type_id'):
+    lottery_type = request.GET.get('lottery_type')
+    if lottery_type is None:
+        return queryset
+    return queryset.filter(**{field: int(lottery_type)})
+
+
+def api_login_required(view):
+    """로그인하지 않은 요청에 로그인 페이지 대신 401 JSON 응답"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error('로그인이 필요합니다', status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@require_GET
+def lottery_types(request):
+    """판매 중인 복권 유형"""
+    try:
+        names = LOTTERY_TYPE_RESOURCE.select(request.GET.get('fields'))
+    except ValueError as e:
+        return _error(f'알 수 없는 필드: {e}')
+    rows = LOTTERY_TYPE_RESOURCE.values(LotteryType.objects.filter(is_active=True), names).order_by('id')
+    return _json_response(request, {'results': LOTTERY_TYPE_RESOURCE.serialize(rows, names)})
+
+
+@require_GET
+def open_draws(request):
+    """판매 중인 회차 (?lottery_type= 로 유형 지정)"""
+    try:
+        draws = _filter_lottery_type(request, LotteryDraw.objects.filter(is_drawn=False))
+    except ValueError:
+        return _error('lottery_type 은 정수여야 합니다')
+    return _list_response(request, draws, OPEN_DRAW_RESOURCE)
+
+
+@require_GET
+def draw_results(request):
+    """추첨 결과 (최신순)"""
+    try:
+        draws = _filter_lottery_type(request, LotteryDraw.objects.filter(is_drawn=True))
+    except ValueError:
+        return _error('lottery_type 은 정수여야 합니다')
+    return _list_response(request, draws, DRAW_RESOURCE)
+
+
+@require_GET
+@api_login_required
+def my_tickets(request):
+    """내 복권 (최신 구매순)"""
+    try:
+        tickets = _filter_lottery_type(
+            request, LotteryTicket.objects.filter(user=request.user), 'lottery_draw__lottery_type_id',
+        )
+    except ValueError:
+        return _error('lottery_type 은 정수여야 합니다')
+    return _list_response(request, tickets, TICKET_RESOURCE, public=False)
+
+
+def _latest_results_payload(lottery_type_id=None):
+    """유형별 가장 최근 추첨 결과"""
+    types = LotteryType.objects.filter(is_active=True).order_by('id')
+    if lottery_type_id is not None:
+        types = types.filter(id=lottery_type_id)
+    names = list(DRAW_RESOURCE.fields)
+    results = []
+    for type_id in types.values_list('id', flat=True):
+        # 유형별로 (lottery_type, is_drawn, draw_date) 인덱스에서 한 행만 읽는다
+        row = DRAW_RESOURCE.values(
+            LotteryDraw.objects.filter(lottery_type_id=type_id, is_drawn=True), names,
+        ).order_by('-draw_date', '-id').first()
+        if row is not None:
+            results.extend(DRAW_RESOURCE.serialize([row], names))
+    return {'results': results}
+
+
+def _winnings_status_payload(user):
+    """사용자의 당첨 현황 (미확인 당첨, 미수령 상금, 결과 대기 복권)"""
+    tickets = LotteryTicket.objects.filter(user=user)
+    unclaimed = tickets.filter(is_winning=True, is_claimed=False).aggregate(
+        count=Count('id'), amount=Sum('winning_amount'),
+    )
+    return {
+        'new_winning_tickets': tickets.filter(is_winning=True, is_checked=False).count(),
+        'unclaimed_tickets': unclaimed['count'],
+        'unclaimed_amount': unclaimed['amount'] or 0,
+        'pending_tickets': tickets.filter(match_count__isnull=True).count(),
+    }
+
+
+def invalidate_winnings_status(user_id):
+    """당첨 확인·상금 수령 후 당첨 현황 캐시 삭제"""
+    cache.delete(f'{WINNINGS_STATUS_PREFIX}{user_id}')
+
+
+def _cached_latest_results(lottery_type_id):
+    # 회차가 바뀌면 공개 콘텐츠 버전이 올라가므로 이전 결과는 읽히지 않는다
+    key = f'{LATEST_RESULTS_PREFIX}{content_version()}:{lottery_type_id or "all"}'
+    payload = cache.get(key)
+    if payload is None:
+        payload = _latest_results_payload(lottery_type_id)
+        cache.set(key, payload, getattr(settings, 'PUBLIC_PAGE_CACHE_TTL', 300))
+    return payload
+
+
+def _cached_winnings_status(user):
+    key = f'{WINNINGS_STATUS_PREFIX}{user.pk}'
+    payload = cache.get(key)
+    if payload is None:
+        payload = _winnings_status_payload(user)
+        cache.set(key, payload, getattr(settings, 'WINNINGS_STATUS_CACHE_TTL', 5))
+    return payload
+
+
+def _authenticated_user(request):
+    # 세션 조회가 필요하므로 스레드에서 실행한다
+    return request.user if request.user.is_authenticated else None
+
+
+async def latest_results(request):
+    """유형별 최신 추첨 결과 (비동기, ?lottery_type= 로 유형 지정)"""
+    if request.method not in ('GET', 'HEAD'):
+        return _error('GET 요청만 허용됩니다', status=405)
+    lottery_type = request.GET.get('lottery_type')
+    try:
+        lottery_type_id = int(lottery_type) if lottery_type is not None else None
+    except ValueError:
+        return _error('lottery_type 은 정수여야 합니다')
+
+    payload = await sync_to_async(_cached_latest_results)(lottery_type_id)
+    return _json_response(request, payload)
+
+
+async def winnings_status(request):
+    """내 당첨 현황 (비동기, 짧은 시간 캐시)"""
+    if request.method not in ('GET', 'HEAD'):
+        return _error('GET 요청만 허용됩니다', status=405)
+    user = await sync_to_async(_authenticated_user)(request)
+    if user is None:
+        return _error('로그인이 필요합니다', status=401)
+
+    payload = await sync_to_async(_cached_winnings_status)(user)
+    return _json_response(request, payload, public=False)
+
+
+@require_GET
+def draw_events(request):
+    """회차 이벤트 (SSE, `?ids=1,2,3` 으로 여러 회차를 한 스트림에)
+
+    ASGI 배포에서는 lottery.events.with_draw_events 가 이 경로를 먼저 받아
+    연결을 유지한다. 여기까지 온 요청(WSGI)에는 지금까지의 이벤트만 보내고
+    연결을 닫으며, 클라이언트는 retry 간격 뒤 Last-Event-ID 로 다시 연결한다.
+    """
+    try:
+        draw_ids = parse_draw_ids(request.GET.get('ids'))
+    except ValueError as e:
+        return _error(str(e))
+    draw_ids = existing_draw_ids(draw_ids)
+    if not draw_ids:
+        raise Http404
+    last_id = parse_last_event_id(request.META.get('HTTP_LAST_EVENT_ID'))
+    body = f'retry: {retry_ms()}\n\n'.encode()
+    body += b''.join(format_event(row) for row in events_after(draw_ids, last_id))
+    response = HttpResponse(body, content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,14 @@
+from django.urls import path
+from . import api
+
+app_name = 'api_v1'
+
+urlpatterns = [
+    path('lottery-types/', api.lottery_types, name='lottery_types'),
+    path('draws/open/', api.open_draws, name='open_draws'),
+    path('draws/results/', api.draw_results, name='draw_results'),
+    path('draws/latest/', api.latest_results, name='latest_results'),
+    path('draws/events/', api.draw_events, name='draw_events'),
+    path('tickets/', api.my_tickets, name='my_tickets'),
+    path('winnings/status/', api.winnings_status, name='winnings_status'),
+]
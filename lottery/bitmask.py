@@ -0,0 +1,64 @@
+"""번호 비트마스크 인코딩
+
+번호 n 은 (n - 1) 번째 비트로 표현하므로 최대 번호 63 까지 부호 있는
+64비트 정수(BigIntegerField)에 담을 수 있다. NumPy 가 설치되어 있으면
+회차 전체의 마스크 배열을 한 번에 채점한다.
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy 가 없는 환경
+    np = None
+
+
+MAX_MASK_NUMBER = 63
+
+
+def encode_numbers(numbers_text):
+    """쉼표로 구분된 번호 문자열을 비트마스크로 변환
+
+    문자열 비교 결과와 달라질 수 있는 형식(앞자리 0, 공백, 범위 밖 번호,
+    중복 번호)이면 None 을 반환하여 문자열 방식으로 채점하도록 한다.
+    """
+    if not numbers_text:
+        return None
+
+    mask = 0
+    for token in numbers_text.split(','):
+        if not (token.isascii() and token.isdigit()) or str(int(token)) != token:
+            return None
+        number = int(token)
+        if number < 1 or number > MAX_MASK_NUMBER:
+            return None
+        bit = 1 << (number - 1)
+        if mask & bit:
+            return None
+        mask |= bit
+    return mask
+
+
+def decode_mask(mask):
+    """비트마스크를 정렬된 번호 목록으로 변환"""
+    return [bit + 1 for bit in range(MAX_MASK_NUMBER) if mask >> bit & 1]
+
+
+def popcount(value):
+    """정수의 1 비트 수"""
+    return bin(value).count('1')
+
+
+if np is not None:
+    _BYTE_POPCOUNT = np.array([popcount(i) for i in range(256)], dtype=np.uint8)
+
+
+def count_matches(masks, winning_mask):
+    """마스크 목록 각각과 당첨 마스크의 일치 번호 수를 한 번에 계산
+
+    NumPy 가 있으면 uint8 배열을, 없으면 정수 리스트를 반환한다.
+    """
+    if np is None:
+        return [popcount(mask & winning_mask) for mask in masks]
+
+    overlap = np.asarray(masks, dtype=np.uint64) & np.uint64(winning_mask)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(overlap)
+    return _BYTE_POPCOUNT[overlap.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
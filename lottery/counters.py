@@ -0,0 +1,85 @@
+"""관리자 대시보드 카운터 캐시
+
+전체 사용자 수, 복권 수, 판매액, 지급 상금을 캐시에 보관하고 구매·수령·
+가입 시 증가시킨다. 캐시에 값이 없거나 만료되면(TTL) 다시 계산한다.
+금액은 캐시의 정수 증가 연산을 쓰기 위해 전(1/100) 단위 정수로 저장한다.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import DailySalesRollup
+
+
+CACHE_PREFIX = 'dashboard_counter:'
+COUNTER_NAMES = ['total_users', 'total_tickets', 'total_sales', 'total_winnings']
+AMOUNT_COUNTERS = {'total_sales', 'total_winnings'}
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_COUNTERS_TTL', 300)
+
+
+def _to_cents(amount):
+    return int(Decimal(str(amount)) * 100)
+
+
+def compute_counters():
+    """데이터베이스에서 카운터 계산"""
+    totals = DailySalesRollup.objects.aggregate(
+        tickets=Sum('tickets'),
+        sales=Sum('revenue'),
+        winnings=Sum('winnings_paid'),
+    )
+    return {
+        'total_users': User.objects.count(),
+        'total_tickets': totals['tickets'] or 0,
+        'total_sales': totals['sales'] or Decimal('0'),
+        'total_winnings': totals['winnings'] or Decimal('0'),
+    }
+
+
+def get_counters():
+    """캐시된 카운터 (없으면 계산 후 캐시)"""
+    keys = {CACHE_PREFIX + name: name for name in COUNTER_NAMES}
+    cached = cache.get_many(keys)
+    if len(cached) < len(keys):
+        counters = compute_counters()
+        cache.set_many({
+            CACHE_PREFIX + name: _to_cents(value) if name in AMOUNT_COUNTERS else value
+            for name, value in counters.items()
+        }, _timeout())
+        return counters
+
+    counters = {}
+    for key, name in keys.items():
+        value = cached[key]
+        counters[name] = Decimal(value) / 100 if name in AMOUNT_COUNTERS else value
+    return counters
+
+
+def _incr(name, delta):
+    try:
+        cache.incr(CACHE_PREFIX + name, delta)
+    except ValueError:
+        # 캐시에 없으면 다음 조회 때 다시 계산
+        pass
+
+
+def increment(**deltas):
+    """트랜잭션 커밋 후 카운터 증가 (예: increment(total_tickets=1, total_sales=price))"""
+    changes = {
+        name: _to_cents(delta) if name in AMOUNT_COUNTERS else delta
+        for name, delta in deltas.items()
+    }
+
+    def apply():
+        for name, delta in changes.items():
+            if delta:
+                _incr(name, delta)
+
+    transaction.on_commit(apply)
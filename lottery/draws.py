@@ -0,0 +1,105 @@
+"""판매 중인 회차 조회와 회차 생성
+
+복권 유형별 판매 중인 회차를 캐시에 보관하여 구매 화면마다 회차를 조회하지
+않도록 하고, 회차가 저장·삭제되면 커밋 후 캐시를 지운다. 회차 번호는
+"YYYYMMDD-NNN" 형식이며, 동시에 같은 번호를 만들면 다음 번호로 다시 시도한다.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import LotteryDraw
+
+
+CACHE_PREFIX = 'open_draw:'
+NO_OPEN_DRAW = 0
+MAX_CREATE_ATTEMPTS = 5
+
+
+def _cache_key(lottery_type_id):
+    return f'{CACHE_PREFIX}{lottery_type_id}'
+
+
+def _timeout():
+    return getattr(settings, 'OPEN_DRAW_CACHE_TTL', 60)
+
+
+def find_open_draw(lottery_type):
+    """데이터베이스에서 판매 중인 회차 조회"""
+    return LotteryDraw.objects.filter(lottery_type=lottery_type, is_drawn=False).order_by('id').first()
+
+
+def next_draw_number(lottery_type, date=None):
+    """오늘 날짜의 다음 회차 번호"""
+    prefix = (date or timezone.localdate()).strftime('%Y%m%d')
+    last = LotteryDraw.objects.filter(
+        lottery_type=lottery_type,
+        draw_number__startswith=f'{prefix}-',
+    ).order_by('-draw_number').values_list('draw_number', flat=True).first()
+    try:
+        sequence = int(last.rsplit('-', 1)[1]) if last else 0
+    except ValueError:
+        sequence = 0
+    return f'{prefix}-{sequence + 1:03d}'
+
+
+def _create(lottery_type, draw_number, draw_date):
+    with transaction.atomic():
+        return LotteryDraw.objects.create(
+            lottery_type=lottery_type,
+            draw_number=draw_number,
+            draw_date=draw_date,
+        )
+
+
+def create_draw(lottery_type, draw_date=None):
+    """새 회차 생성 (회차 번호가 겹치면 다음 번호로 다시 시도)"""
+    draw_date = draw_date or timezone.now() + timedelta(hours=1)
+    for attempt in range(MAX_CREATE_ATTEMPTS):
+        try:
+            return _create(lottery_type, next_draw_number(lottery_type), draw_date)
+        except IntegrityError:
+            if attempt == MAX_CREATE_ATTEMPTS - 1:
+                raise
+
+
+def ensure_open_draw(lottery_type):
+    """판매 중인 회차 반환 (없으면 하나만 생성)
+
+    회차 번호를 먼저 정한 뒤 판매 중인 회차를 확인하므로, 동시에 생성하는
+    요청은 같은 번호로 충돌하고 진 쪽은 이긴 쪽이 만든 회차를 사용한다.
+    """
+    for attempt in range(MAX_CREATE_ATTEMPTS):
+        draw_number = next_draw_number(lottery_type)
+        draw = find_open_draw(lottery_type)
+        if draw is not None:
+            return draw
+        try:
+            return _create(lottery_type, draw_number, timezone.now() + timedelta(hours=1))
+        except IntegrityError:
+            if attempt == MAX_CREATE_ATTEMPTS - 1:
+                raise
+
+
+def get_open_draw(lottery_type, create=False):
+    """판매 중인 회차 (캐시 사용, create=True 이면 없을 때 생성)"""
+    key = _cache_key(lottery_type.id)
+    draw = cache.get(key)
+    if draw is None:
+        draw = find_open_draw(lottery_type) or NO_OPEN_DRAW
+        cache.set(key, draw, _timeout())
+    if draw == NO_OPEN_DRAW:
+        if not create:
+            return None
+        draw = ensure_open_draw(lottery_type)
+        cache.set(key, draw, _timeout())
+    draw.lottery_type = lottery_type
+    return draw
+
+
+def invalidate_open_draw(lottery_type_id):
+    """판매 중인 회차 캐시 삭제"""
+    cache.delete(_cache_key(lottery_type_id))
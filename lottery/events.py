@@ -0,0 +1,310 @@
+"""추첨 이벤트 발행과 실시간 스트림 (Server-Sent Events)
+
+추첨 작업은 별도 워커 프로세스에서 실행되므로 이벤트는 DrawEvent 테이블에
+기록한다. 이벤트는 추첨·정산 결과를 쓰는 트랜잭션 안에서 함께 기록하므로
+둘 중 하나만 커밋되는 일이 없다. 웹 프로세스마다 하나의 폴러(EventBroker)가 구독 중인 회차의 새
+이벤트를 주기적으로 한 번 조회해 연결된 모든 클라이언트 큐에 나눠 주므로,
+대기 중인 클라이언트 수와 관계없이 데이터베이스 조회는 프로세스당 한 번이다.
+
+Django 3.2 의 ASGI 핸들러는 스트리밍 응답을 이벤트 루프에서 동기로 순회하므로
+스트림은 Django 앞에 두는 ASGI 앱(with_draw_events)이 직접 처리한다. WSGI 로
+배포하면 같은 경로를 Django 뷰가 받아 지금까지의 이벤트와 `retry:` 만 보내고,
+EventSource 가 그 간격으로 다시 연결한다.
+
+브라우저의 호스트당 동시 연결 수는 6개 정도로 제한되므로 한 페이지는 기다리는
+회차들을 하나의 스트림(`?ids=1,2,3`)으로 받는다.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.urls import Resolver404, resolve
+
+from .models import DrawEvent, LotteryDraw
+
+
+logger = logging.getLogger(__name__)
+
+# 정산 완료 이벤트를 보내면 스트림을 닫는다
+FINAL_EVENT = 'settled'
+# 이벤트 id 는 커밋 순서가 아니라 INSERT 순서로 매겨지므로, 폴러는 마지막 id 보다
+# 이만큼 앞에서부터 다시 읽어 늦게 커밋된 다른 회차의 이벤트를 놓치지 않는다
+EVENT_ID_LOOKBACK = 100
+# 스트림 하나로 구독할 수 있는 회차 수
+MAX_STREAM_DRAWS = 50
+# lottery/api_urls.py 의 이벤트 경로 이름 (접두사와 버전은 URLconf 를 따른다)
+EVENTS_VIEW_NAME = 'api_v1:draw_events'
+
+
+def _poll_interval():
+    return getattr(settings, 'DRAW_EVENT_POLL_INTERVAL', 1.0)
+
+
+def _keepalive():
+    return getattr(settings, 'DRAW_EVENT_KEEPALIVE', 15)
+
+
+def retry_ms():
+    return getattr(settings, 'DRAW_EVENT_RETRY_MS', 5000)
+
+
+def publish_draw_event(draw, kind, **payload):
+    """추첨 이벤트 기록 (호출한 트랜잭션과 함께 커밋된다)"""
+    return DrawEvent.objects.create(lottery_draw_id=draw.pk, kind=kind, payload=payload)
+
+
+def publish_drawn(draw):
+    """당첨 번호 발표"""
+    publish_draw_event(
+        draw, 'drawn',
+        draw_id=draw.pk,
+        lottery_type_id=draw.lottery_type_id,
+        draw_number=draw.draw_number,
+        winning_numbers=[int(number) for number in draw.winning_numbers.split(',')],
+    )
+
+
+def publish_settled(draw, processed_tickets, winning_tickets):
+    """정산 완료 (이제 당첨 확인 결과가 확정된다)"""
+    publish_draw_event(
+        draw, FINAL_EVENT,
+        draw_id=draw.pk,
+        processed_tickets=processed_tickets,
+        winning_tickets=winning_tickets,
+    )
+
+
+def format_event(row):
+    """DrawEvent values() 행을 SSE 메시지로 변환"""
+    data = json.dumps(row['payload'], cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return f"id: {row['id']}\nevent: {row['kind']}\ndata: {data}\n\n".encode()
+
+
+def events_after(draw_ids, last_id=0):
+    """회차들의 last_id 이후 이벤트 (재연결 시 Last-Event-ID 이후만 다시 보낸다)"""
+    return list(
+        DrawEvent.objects.filter(lottery_draw_id__in=draw_ids, id__gt=last_id)
+        .order_by('id').values('id', 'lottery_draw_id', 'kind', 'payload')
+    )
+
+
+def parse_draw_ids(value):
+    """`?ids=1,2,3` 을 중복 없는 회차 id 목록으로 변환 (잘못된 값은 ValueError)"""
+    try:
+        draw_ids = sorted({int(part) for part in (value or '').split(',') if part.strip()})
+    except ValueError:
+        raise ValueError('ids 는 쉼표로 구분한 회차 id 여야 합니다') from None
+    if not draw_ids:
+        raise ValueError('ids 가 필요합니다')
+    if len(draw_ids) > MAX_STREAM_DRAWS:
+        raise ValueError(f'ids 는 최대 {MAX_STREAM_DRAWS}개까지 지정할 수 있습니다')
+    return draw_ids
+
+
+def parse_last_event_id(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _in_thread(func):
+    """요청 주기 밖에서 쓰는 데이터베이스 조회를 스레드에서 실행
+
+    스트림과 폴러는 Django 요청 처리를 거치지 않으므로 요청 시작·종료 때처럼
+    조회 전후에 끊어졌거나 오래된 연결을 정리한다. 그렇지 않으면 데이터베이스가
+    재시작된 뒤 죽은 연결로 계속 조회하게 된다.
+    """
+    @wraps(func)
+    def call(*args):
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(call)
+
+
+def _latest_event_id():
+    return DrawEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _new_events(last_id, draw_ids):
+    return list(
+        DrawEvent.objects.filter(id__gt=last_id, lottery_draw_id__in=draw_ids)
+        .order_by('id').values('id', 'lottery_draw_id', 'kind', 'payload')
+    )
+
+
+class EventBroker:
+    """프로세스 안의 구독자에게 새 이벤트를 나눠 주는 발행/구독 허브
+
+    구독자가 있는 동안만 폴링 작업이 돈다. 구독자는 먼저 subscribe 한 뒤
+    events_after 로 지난 이벤트를 읽으므로 그 사이의 이벤트가 빠지지 않고,
+    중복은 구독자가 이벤트 id 로 걸러 낸다. 조회가 실패해도 기록만 하고
+    다음 주기에 다시 조회한다.
+    """
+
+    def __init__(self, poll_interval=None):
+        self.poll_interval = poll_interval
+        self.subscribers = {}
+        self.last_id = None
+        self._dispatched = set()
+        self._task = None
+
+    def subscribe(self, draw_ids):
+        """회차들의 이벤트를 받을 큐 하나를 등록"""
+        queue = asyncio.Queue()
+        for draw_id in draw_ids:
+            self.subscribers.setdefault(draw_id, set()).add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return queue
+
+    def unsubscribe(self, draw_ids, queue):
+        for draw_id in draw_ids:
+            queues = self.subscribers.get(draw_id)
+            if queues is None:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[draw_id]
+
+    def dispatch(self, rows):
+        for row in rows:
+            if row['id'] in self._dispatched:
+                continue
+            self._dispatched.add(row['id'])
+            self.last_id = max(self.last_id or 0, row['id'])
+            for queue in self.subscribers.get(row['lottery_draw_id'], ()):
+                queue.put_nowait(row)
+        floor = (self.last_id or 0) - EVENT_ID_LOOKBACK
+        self._dispatched = {event_id for event_id in self._dispatched if event_id > floor}
+
+    async def _poll(self):
+        if self.last_id is None:
+            self.last_id = await _in_thread(_latest_event_id)()
+        since = max(self.last_id - EVENT_ID_LOOKBACK, 0)
+        self.dispatch(await _in_thread(_new_events)(since, list(self.subscribers)))
+
+    async def _run(self):
+        while self.subscribers:
+            try:
+                await self._poll()
+            except Exception:
+                # 데이터베이스 오류 등으로 폴러가 멈추면 모든 스트림이 더 이상 이벤트를 받지 못한다
+                logger.exception('추첨 이벤트 조회 실패')
+            await asyncio.sleep(self.poll_interval or _poll_interval())
+
+
+broker = EventBroker()
+
+
+def existing_draw_ids(draw_ids):
+    return list(LotteryDraw.objects.filter(pk__in=draw_ids).order_by('pk').values_list('pk', flat=True))
+
+
+async def _send_error(send, status, message):
+    body = json.dumps({'error': message}, ensure_ascii=False).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def stream_draw_events(scope, receive, send, draw_ids, event_broker=None):
+    """회차들의 이벤트를 모두 정산 완료될 때까지 하나의 SSE 로 보내는 ASGI 핸들러"""
+    event_broker = event_broker or broker
+    draw_ids = await _in_thread(existing_draw_ids)(draw_ids)
+    if not draw_ids:
+        await _send_error(send, 404, '추첨 회차를 찾을 수 없습니다')
+        return
+
+    headers = dict(scope.get('headers') or [])
+    last_id = parse_last_event_id(headers.get(b'last-event-id', b'').decode('latin-1'))
+    # 회차별로 마지막으로 보낸 이벤트 id, 정산 완료를 보낸 회차는 뺀다
+    last_ids = dict.fromkeys(draw_ids, last_id)
+    queue = event_broker.subscribe(draw_ids)
+    disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        await send({'type': 'http.response.body', 'body': f'retry: {retry_ms()}\n\n'.encode(), 'more_body': True})
+
+        pending = await _in_thread(events_after)(draw_ids, last_id)
+        while True:
+            for row in pending:
+                draw_id = row['lottery_draw_id']
+                if row['id'] <= last_ids.get(draw_id, row['id']):
+                    continue
+                last_ids[draw_id] = row['id']
+                await send({'type': 'http.response.body', 'body': format_event(row), 'more_body': True})
+                if row['kind'] == FINAL_EVENT:
+                    del last_ids[draw_id]
+                    event_broker.unsubscribe([draw_id], queue)
+                    if not last_ids:
+                        await send({'type': 'http.response.body', 'body': b''})
+                        return
+
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnect}, timeout=_keepalive(), return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter not in done:
+                getter.cancel()
+                if disconnect in done:
+                    return
+                # 프록시가 유휴 연결을 끊지 않도록 주석 줄을 보낸다
+                await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                pending = []
+                continue
+            pending = [getter.result()]
+            while not queue.empty():
+                pending.append(queue.get_nowait())
+    finally:
+        disconnect.cancel()
+        event_broker.unsubscribe(draw_ids, queue)
+
+
+def _is_events_path(scope):
+    """요청 경로가 이벤트 스트림 경로인지 확인
+
+    Django 의 ASGI 요청처럼 root_path(하위 경로 배포)를 떼고 URLconf 로 해석하므로
+    api_urls 의 경로나 API 접두사가 바뀌어도 따로 맞출 필요가 없다.
+    """
+    path = scope['path']
+    root_path = scope.get('root_path', '')
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    try:
+        return resolve(path).view_name == EVENTS_VIEW_NAME
+    except Resolver404:
+        return False
+
+
+def with_draw_events(application):
+    """추첨 이벤트 스트림 경로는 직접 처리하고 나머지는 Django 로 넘기는 ASGI 앱"""
+    async def app(scope, receive, send):
+        if scope['type'] == 'http' and scope.get('method') == 'GET':
+            if _is_events_path(scope):
+                query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+                try:
+                    draw_ids = parse_draw_ids(query.get('ids', [''])[-1])
+                except ValueError as e:
+                    return await _send_error(send, 400, str(e))
+                return await stream_draw_events(scope, receive, send, draw_ids)
+        return await application(scope, receive, send)
+    return app
@@ -35,33 +35,98 @@ class LotteryPurchaseForm(forms.Form):
         
         if is_auto_select:
             # 机选号码
-            numbers = random.sample(range(1, lottery_type.max_number + 1), 
-                                  lottery_type.numbers_count)
-            cleaned_data['selected_numbers'] = ','.join(map(str, sorted(numbers)))
+            cleaned_data['selected_numbers'] = auto_select_numbers(lottery_type)
         else:
             # 手动选择号码
             if not selected_numbers:
                 raise forms.ValidationError("请选择号码或勾选机选")
             
-            try:
-                numbers = [int(x.strip()) for x in selected_numbers.split(',')]
-            except ValueError:
-                raise forms.ValidationError("号码格式不正确，请输入数字")
-            
-            if len(numbers) != lottery_type.numbers_count:
-                raise forms.ValidationError(f"请选择 {lottery_type.numbers_count} 个号码")
-            
-            if any(num < 1 or num > lottery_type.max_number for num in numbers):
-                raise forms.ValidationError(f"号码必须在 1 到 {lottery_type.max_number} 之间")
-            
-            if len(set(numbers)) != len(numbers):
-                raise forms.ValidationError("号码不能重复")
-            
-            cleaned_data['selected_numbers'] = ','.join(map(str, sorted(numbers)))
+            cleaned_data['selected_numbers'] = normalize_numbers(selected_numbers, lottery_type)
+        
+        return cleaned_data
+
+
+class BulkPurchaseForm(forms.Form):
+    MAX_TICKETS = 500
+    
+    is_auto_select = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="机选",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    quantity = forms.IntegerField(
+        min_value=1,
+        max_value=MAX_TICKETS,
+        initial=10,
+        label="机选注数",
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    selected_numbers = forms.CharField(
+        required=False,
+        label="手动选号（每行一注，号码用逗号分隔）",
+        widget=forms.Textarea(attrs={
+            'class': 'form-control',
+            'rows': 6,
+            'placeholder': '1,5,12,23,35,42\n2,8,14,20,31,33'
+        })
+    )
+    
+    def __init__(self, lottery_type, *args, **kwargs):
+        self.lottery_type = lottery_type
+        super().__init__(*args, **kwargs)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        
+        if cleaned_data.get('is_auto_select'):
+            quantity = cleaned_data.get('quantity')
+            if not quantity:
+                return cleaned_data
+            cleaned_data['selections'] = [auto_select_numbers(self.lottery_type) for _ in range(quantity)]
+            return cleaned_data
+        
+        lines = [line.strip() for line in (cleaned_data.get('selected_numbers') or '').splitlines() if line.strip()]
+        if not lines:
+            raise forms.ValidationError("请输入号码或勾选机选")
+        if len(lines) > self.MAX_TICKETS:
+            raise forms.ValidationError(f"一次最多购买 {self.MAX_TICKETS} 注")
         
+        selections = []
+        for index, line in enumerate(lines, start=1):
+            try:
+                selections.append(normalize_numbers(line, self.lottery_type))
+            except forms.ValidationError as error:
+                raise forms.ValidationError(f"第 {index} 行: {error.messages[0]}")
+        cleaned_data['selections'] = selections
         return cleaned_data
 
 
+def auto_select_numbers(lottery_type):
+    """机选一注号码"""
+    numbers = random.sample(range(1, lottery_type.max_number + 1), lottery_type.numbers_count)
+    return ','.join(map(str, sorted(numbers)))
+
+
+def normalize_numbers(selected_numbers, lottery_type):
+    """校验手动选择的号码并转换为排序后的标准格式"""
+    try:
+        numbers = [int(x.strip()) for x in selected_numbers.split(',')]
+    except ValueError:
+        raise forms.ValidationError("号码格式不正确，请输入数字")
+    
+    if len(numbers) != lottery_type.numbers_count:
+        raise forms.ValidationError(f"请选择 {lottery_type.numbers_count} 个号码")
+    
+    if any(num < 1 or num > lottery_type.max_number for num in numbers):
+        raise forms.ValidationError(f"号码必须在 1 到 {lottery_type.max_number} 之间")
+    
+    if len(set(numbers)) != len(numbers):
+        raise forms.ValidationError("号码不能重复")
+    
+    return ','.join(map(str, sorted(numbers)))
+
+
 class NumberSelectionWidget(forms.Widget):
     """自定义号码选择组件"""
     template_name = 'lottery/widgets/number_selection.html'
@@ -0,0 +1,63 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from lottery.ticket_numbers import DEFAULT_BLOCK_SIZE, TicketNumberAllocator
+
+
+def _init_worker():
+    django.setup()
+    connections.close_all()
+
+
+def allocate_in_worker(count, batch_size, block_size):
+    """在工作进程中按批发放号码，返回 (号码列表, 耗时)"""
+    allocator = TicketNumberAllocator(block_size=block_size)
+    numbers = []
+    started = time.monotonic()
+    while len(numbers) < count:
+        numbers.extend(allocator.allocate_numbers(min(batch_size, count - len(numbers))))
+    elapsed = time.monotonic() - started
+    connections.close_all()
+    return numbers, elapsed
+
+
+class Command(BaseCommand):
+    help = '多进程并发发放彩票号码，检查是否重复并统计速率'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='并发进程数')
+        parser.add_argument('--count', type=int, default=100000, help='每个进程发放的号码数量')
+        parser.add_argument('--batch-size', type=int, default=100, help='每次发放的号码数量（模拟一次批量购买）')
+        parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE, help='每次从数据库预留的号码区间大小')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        if processes < 1 or options['count'] < 1 or options['batch_size'] < 1 or options['block_size'] < 1:
+            raise CommandError('参数必须为正整数')
+
+        # 子进程不能继承父进程的数据库连接
+        connections.close_all()
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as executor:
+            futures = [
+                executor.submit(allocate_in_worker, options['count'], options['batch_size'], options['block_size'])
+                for _ in range(processes)
+            ]
+            results = [future.result() for future in futures]
+        wall = time.monotonic() - started
+
+        total = sum(len(numbers) for numbers, _ in results)
+        unique = len(set().union(*(numbers for numbers, _ in results)))
+        busiest = max(elapsed for _, elapsed in results)
+        for index, (numbers, elapsed) in enumerate(results, 1):
+            self.stdout.write(f'  进程 {index}: {len(numbers)} 个，{elapsed:.3f} 秒（{len(numbers) / max(elapsed, 1e-9):.0f} 个/秒）')
+        self.stdout.write(f'合计 {total} 个，重复 {total - unique} 个，总耗时 {wall:.2f} 秒')
+
+        message = f'并发发放速率: {total / max(busiest, 1e-9):.0f} 个/秒'
+        if total != unique:
+            raise CommandError(f'{message}，发现 {total - unique} 个重复号码')
+        self.stdout.write(self.style.SUCCESS(message))
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from lottery.models import LotteryType, LotteryDraw, UserProfile
+from lottery.models import LotteryType, LotteryDraw, PrizeTier, UserProfile
+from lottery.prizes import DEFAULT_PRIZE_TIERS
 from django.utils import timezone
 from datetime import timedelta
 
@@ -71,6 +72,12 @@ class Command(BaseCommand):
             if created:
                 self.stdout.write(f'创建彩票类型: {lottery_type.name}')
                 
+                # 创建默认奖级
+                PrizeTier.objects.bulk_create([
+                    PrizeTier(lottery_type=lottery_type, match_count=match_count, multiplier=multiplier)
+                    for match_count, multiplier in DEFAULT_PRIZE_TIERS
+                ])
+                
                 # 为每个彩票类型创建一个待开奖期次
                 draw_number = f"{timezone.now().strftime('%Y%m%d')}-001"
                 draw_date = timezone.now() + timedelta(hours=2)
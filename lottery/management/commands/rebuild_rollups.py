@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lottery.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = '重新计算每日销售汇总'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='开始日期 (YYYY-MM-DD)，默认全部历史')
+        parser.add_argument('--end', help='结束日期 (YYYY-MM-DD)，默认全部历史')
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+            end = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else None
+        except ValueError:
+            raise CommandError('日期格式应为 YYYY-MM-DD')
+
+        count = rebuild_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f'每日销售汇总已重建: {count} 行'))
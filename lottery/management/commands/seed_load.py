@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from lottery.bitmask import np
+from lottery.models import LotteryType
+from lottery.seeding import DEFAULT_BATCH_SIZE, DEFAULT_PREFIX, clear_seeded, seed_load
+
+
+class Command(BaseCommand):
+    help = '生成压测用的大量用户、期次、彩票和交易数据'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='用户数量')
+        parser.add_argument('--draws', type=int, default=10, help='期次数量（各彩票类型轮流，最后一期保持待开奖）')
+        parser.add_argument('--tickets-per-draw', type=int, default=10000, help='每期彩票数量')
+        parser.add_argument('--seed', type=int, default=0, help='随机种子，相同种子生成相同分布的数据')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每批插入的行数')
+        parser.add_argument('--prefix', default=DEFAULT_PREFIX, help='生成数据的用户名/期次号前缀')
+        parser.add_argument('--reset', action='store_true', help='先删除之前以相同前缀生成的数据')
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('seed_load 需要安装 NumPy')
+        if min(options['users'], options['draws'], options['batch_size']) < 1 or options['tickets_per_draw'] < 0:
+            raise CommandError('数量参数必须为正整数')
+
+        prefix = options['prefix']
+        if options['reset']:
+            clear_seeded(prefix)
+            self.stdout.write(f'已删除前缀为 {prefix} 的数据')
+
+        if not LotteryType.objects.filter(is_active=True).exists():
+            call_command('init_data', stdout=self.stdout)
+        lottery_types = list(LotteryType.objects.filter(is_active=True).order_by('id'))
+
+        def progress(draw, summary):
+            self.stdout.write(f'  {draw.draw_number}: 累计 {summary.tickets} 张，'
+                              f'{summary.tickets_per_second:.0f} 张/秒')
+
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'前缀 {prefix} 的数据已存在，请使用 --reset 或更换 --prefix')
+
+        summary = seed_load(
+            options['users'],
+            options['draws'],
+            options['tickets_per_draw'],
+            lottery_types,
+            seed=options['seed'],
+            prefix=prefix,
+            batch_size=options['batch_size'],
+            progress=progress,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'生成完成: 用户 {summary.users}，期次 {summary.draws}，彩票 {summary.tickets}'
+            f'（中奖 {summary.winning_tickets}），交易 {summary.transactions}，'
+            f'{summary.elapsed:.1f} 秒（{summary.tickets_per_second:.0f} 张/秒）'
+        ))
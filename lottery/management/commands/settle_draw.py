@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lottery.events import publish_settled
+from lottery.models import LotteryDraw
+from lottery.settlement import DEFAULT_CHUNK_SIZE, settle_draw_parallel
+
+
+class Command(BaseCommand):
+    help = '多进程结算指定期次的彩票'
+
+    def add_arguments(self, parser):
+        parser.add_argument('draw_id', type=int, help='期次 ID')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='并行进程数')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每批结算的彩票数量')
+
+    def handle(self, *args, **options):
+        try:
+            draw = LotteryDraw.objects.select_related('lottery_type').get(pk=options['draw_id'])
+        except LotteryDraw.DoesNotExist:
+            raise CommandError(f"期次不存在: {options['draw_id']}")
+
+        if not draw.is_drawn:
+            draw.generate_winning_numbers()
+            self.stdout.write(f'生成中奖号码: {draw.winning_numbers}')
+
+        result = settle_draw_parallel(draw, options['workers'], chunk_size=options['chunk_size'])
+        publish_settled(draw, result.processed, result.winning_count)
+
+        for matches in sorted(result.tier_counts, reverse=True):
+            self.stdout.write(f'  {matches} 个号码匹配: {result.tier_counts[matches]} 张')
+        self.stdout.write(self.style.SUCCESS(
+            f'结算完成: {result.processed} 张，{result.winning_count} 张中奖，'
+            f'{result.elapsed:.2f} 秒（{result.tickets_per_second:.0f} 张/秒）'
+        ))
@@ -0,0 +1,51 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+from lottery.bitmask import encode_numbers
+
+
+BATCH_SIZE = 2000
+
+
+def backfill_masks(apps, schema_editor):
+    LotteryDraw = apps.get_model('lottery', 'LotteryDraw')
+    LotteryTicket = apps.get_model('lottery', 'LotteryTicket')
+
+    draws = []
+    for draw in LotteryDraw.objects.exclude(winning_numbers='').only('id', 'winning_numbers').iterator():
+        draw.winning_mask = encode_numbers(draw.winning_numbers)
+        draws.append(draw)
+    LotteryDraw.objects.bulk_update(draws, ['winning_mask'], batch_size=BATCH_SIZE)
+
+    last_id = 0
+    while True:
+        tickets = list(LotteryTicket.objects.filter(id__gt=last_id)
+                       .order_by('id').only('id', 'selected_numbers')[:BATCH_SIZE])
+        if not tickets:
+            break
+        for ticket in tickets:
+            ticket.selected_mask = encode_numbers(ticket.selected_numbers)
+        LotteryTicket.objects.bulk_update(tickets, ['selected_mask'])
+        last_id = tickets[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lottery', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lotterydraw',
+            name='winning_mask',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='당첨 번호 마스크'),
+        ),
+        migrations.AddField(
+            model_name='lotteryticket',
+            name='selected_mask',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='선택 번호 마스크'),
+        ),
+        migrations.RunPython(backfill_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from lottery.prizes import DEFAULT_PRIZE_TIERS
+
+
+def create_default_tiers(apps, schema_editor):
+    LotteryType = apps.get_model('lottery', 'LotteryType')
+    PrizeTier = apps.get_model('lottery', 'PrizeTier')
+    PrizeTier.objects.bulk_create([
+        PrizeTier(lottery_type=lottery_type, match_count=match_count, multiplier=multiplier)
+        for lottery_type in LotteryType.objects.all()
+        for match_count, multiplier in DEFAULT_PRIZE_TIERS
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lottery', '0002_number_masks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrizeTier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('match_count', models.PositiveSmallIntegerField(verbose_name='일치 번호 수')),
+                ('multiplier', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='상금 배수')),
+                ('lottery_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prize_tiers', to='lottery.lotterytype', verbose_name='복권 유형')),
+            ],
+            options={
+                'verbose_name': '상금 등급',
+                'verbose_name_plural': '상금 등급',
+                'ordering': ['match_count'],
+                'unique_together': {('lottery_type', 'match_count')},
+            },
+        ),
+        migrations.RunPython(create_default_tiers, migrations.RunPython.noop),
+    ]
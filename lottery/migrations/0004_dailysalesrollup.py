@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lottery', '0003_prizetier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lotteryticket',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='수령 시간'),
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='날짜')),
+                ('tickets', models.IntegerField(default=0, verbose_name='판매 수량')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='판매 금액')),
+                ('winnings_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='지급 상금')),
+                ('lottery_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lottery.lotterytype', verbose_name='복권 유형')),
+            ],
+            options={
+                'verbose_name': '일별 판매 집계',
+                'verbose_name_plural': '일별 판매 집계',
+                'ordering': ['-date'],
+                'unique_together': {('date', 'lottery_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lottery', '0004_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='시퀀스 이름')),
+                ('next_value', models.BigIntegerField(default=1, verbose_name='다음 번호')),
+            ],
+            options={
+                'verbose_name': '복권 번호 시퀀스',
+                'verbose_name_plural': '복권 번호 시퀀스',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+def mark_existing_winners_checked(apps, schema_editor):
+    # 기존 당첨 복권은 이전 당첨 확인 페이지에서 이미 안내된 것으로 본다
+    LotteryTicket = apps.get_model('lottery', 'LotteryTicket')
+    LotteryTicket.objects.filter(is_winning=True).update(is_checked=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lottery', '0005_ticketsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lotteryticket',
+            name='match_count',
+            field=models.SmallIntegerField(blank=True, null=True, verbose_name='일치 수량'),
+        ),
+        migrations.AddField(
+            model_name='lotteryticket',
+            name='is_checked',
+            field=models.BooleanField(default=False, verbose_name='당첨 확인 여부'),
+        ),
+        migrations.RunPython(mark_existing_winners_checked, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lotteryticket',
+            index=models.Index(condition=models.Q(('is_checked', False), ('is_winning', True)), fields=['user', 'lottery_draw'], name='ticket_unchecked_win_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotteryticket',
+            index=models.Index(condition=models.Q(('match_count__isnull', True)), fields=['user', 'lottery_draw'], name='ticket_unscored_idx'),
+        ),
+    ]
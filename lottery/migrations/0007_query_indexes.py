@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lottery', '0006_ticket_match_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lotterydraw',
+            index=models.Index(fields=['lottery_type', 'is_drawn', 'draw_date'], name='draw_type_drawn_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotterydraw',
+            index=models.Index(fields=['is_drawn', 'draw_date'], name='draw_drawn_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotteryticket',
+            index=models.Index(fields=['user', '-purchase_time'], name='ticket_user_purchase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotteryticket',
+            index=models.Index(fields=['-purchase_time'], name='ticket_purchase_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotteryticket',
+            index=models.Index(fields=['lottery_draw', 'is_winning'], name='ticket_draw_winning_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotteryticket',
+            index=models.Index(fields=['user', 'is_winning', 'lottery_draw'], name='ticket_user_winning_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotteryticket',
+            index=models.Index(condition=models.Q(('is_claimed', False), ('is_winning', True)), fields=['user', 'lottery_draw'], name='ticket_unclaimed_win_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-created_at'], name='txn_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['transaction_type', 'created_at'], name='txn_type_created_idx'),
+        ),
+    ]
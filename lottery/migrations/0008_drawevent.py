@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lottery', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrawEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('drawn', '당첨 번호 발표'), ('settled', '정산 완료')], max_length=20, verbose_name='이벤트 종류')),
+                ('payload', models.JSONField(default=dict, verbose_name='내용')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='생성 시간')),
+                ('lottery_draw', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lottery.lotterydraw', verbose_name='추첨 회차')),
+            ],
+            options={
+                'verbose_name': '추첨 이벤트',
+                'verbose_name_plural': '추첨 이벤트',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='drawevent',
+            index=models.Index(fields=['lottery_draw', 'id'], name='draw_event_draw_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_transaction_lottery_type(apps, schema_editor):
+    # 설명 "{유형} 복권 구매 - {복권 번호}" 의 복권 번호로 유형을 찾고, 없으면 유형 이름으로 찾는다
+    Transaction = apps.get_model('lottery', 'Transaction')
+    LotteryTicket = apps.get_model('lottery', 'LotteryTicket')
+    LotteryType = apps.get_model('lottery', 'LotteryType')
+    type_ids = dict(LotteryType.objects.values_list('name', 'id'))
+
+    pending = list(Transaction.objects.filter(
+        transaction_type__in=['purchase', 'winning'], lottery_type__isnull=True,
+    ).values_list('id', 'transaction_type', 'description'))
+    for offset in range(0, len(pending), 1000):
+        batch = []
+        for transaction_id, transaction_type, description in pending[offset:offset + 1000]:
+            if transaction_type == 'winning':
+                # "상금 수령 {복권 번호} - {금액}원"
+                ticket_number = description.replace('상금 수령', '', 1).split(' - ')[0].strip()
+            else:
+                ticket_number = description.rsplit(' - ', 1)[-1].split(' ~ ')[0].strip()
+            batch.append((transaction_id, ticket_number, type_ids.get(description.split(' 복권')[0])))
+
+        ticket_types = dict(LotteryTicket.objects.filter(
+            ticket_number__in=[ticket_number for _, ticket_number, _ in batch],
+        ).values_list('ticket_number', 'lottery_draw__lottery_type_id'))
+        updates = {}
+        for transaction_id, ticket_number, named_type_id in batch:
+            lottery_type_id = ticket_types.get(ticket_number) or named_type_id
+            if lottery_type_id is not None:
+                updates.setdefault(lottery_type_id, []).append(transaction_id)
+        for lottery_type_id, transaction_ids in updates.items():
+            Transaction.objects.filter(id__in=transaction_ids).update(lottery_type_id=lottery_type_id)
+
+
+def rebuild_daily_rollups(apps, schema_editor):
+    # 기존 판매·상금 기록으로 일별 판매 집계를 채운다
+    from lottery.rollups import rebuild_rollups
+    rebuild_rollups(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lottery', '0008_drawevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='lottery_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='lottery.lotterytype', verbose_name='복권 유형'),
+        ),
+        migrations.RunPython(fill_transaction_lottery_type, migrations.RunPython.noop),
+        migrations.RunPython(rebuild_daily_rollups, migrations.RunPython.noop),
+    ]
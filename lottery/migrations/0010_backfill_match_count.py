@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 21:40
+
+from django.db import migrations
+
+
+def backfill_match_count(apps, schema_editor):
+    # 일치 수량이 생기기 전에 추첨된 회차의 복권을 정산 규칙으로 한 번에 채점한다
+    # (이미 당첨·수령된 복권의 상금은 바꾸지 않는다)
+    from lottery.settlement import backfill_match_counts
+    backfill_match_counts(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lottery', '0009_transaction_lottery_type'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_match_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lottery', '0010_backfill_match_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='이름')),
+                ('version', models.BigIntegerField(default=0, verbose_name='버전')),
+            ],
+            options={
+                'verbose_name': '공개 콘텐츠 버전',
+                'verbose_name_plural': '공개 콘텐츠 버전',
+            },
+        ),
+    ]
@@ -1,8 +1,17 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 import random
-import string
+
+from .bitmask import encode_numbers
+from .prizes import DEFAULT_PRIZE_TIERS, PayoutTable
+
+
+def _bump_public_pages():
+    # 공개 페이지 캐시는 변경이 커밋된 뒤 버전을 올려 무효화한다
+    from .page_cache import bump_content_version
+    transaction.on_commit(bump_content_version)
 
 
 class LotteryType(models.Model):
@@ -21,6 +30,45 @@ class LotteryType(models.Model):
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        _bump_public_pages()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        _bump_public_pages()
+        return result
+    
+    def get_payout_table(self):
+        """상금 등급표 컴파일 (등급이 없으면 기본 등급 사용)"""
+        tiers = [(tier.match_count, tier.multiplier) for tier in self.prize_tiers.all()]
+        return PayoutTable(self.price, tiers or DEFAULT_PRIZE_TIERS)
+
+
+class PrizeTier(models.Model):
+    """상금 등급"""
+    lottery_type = models.ForeignKey(LotteryType, on_delete=models.CASCADE, related_name='prize_tiers', verbose_name="복권 유형")
+    match_count = models.PositiveSmallIntegerField(verbose_name="일치 번호 수")
+    multiplier = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="상금 배수")
+    
+    class Meta:
+        verbose_name = "상금 등급"
+        verbose_name_plural = "상금 등급"
+        unique_together = ['lottery_type', 'match_count']
+        ordering = ['match_count']
+    
+    def __str__(self):
+        return f"{self.lottery_type.name} - {self.match_count}개 일치 x{self.multiplier}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        _bump_public_pages()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        _bump_public_pages()
+        return result
 
 
 class LotteryDraw(models.Model):
@@ -29,6 +77,7 @@ class LotteryDraw(models.Model):
     draw_number = models.CharField(max_length=50, verbose_name="회차 번호")
     draw_date = models.DateTimeField(verbose_name="추첨 시간")
     winning_numbers = models.CharField(max_length=200, verbose_name="당첨 번호", blank=True)
+    winning_mask = models.BigIntegerField(null=True, blank=True, verbose_name="당첨 번호 마스크")
     is_drawn = models.BooleanField(default=False, verbose_name="추첨 완료 여부")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="생성 시간")
     
@@ -36,18 +85,62 @@ class LotteryDraw(models.Model):
         verbose_name = "추첨 회차"
         verbose_name_plural = "추첨 회차"
         unique_together = ['lottery_type', 'draw_number']
+        indexes = [
+            # 유형별 판매 중 회차, 최근 추첨 결과
+            models.Index(fields=['lottery_type', 'is_drawn', 'draw_date'], name='draw_type_drawn_date_idx'),
+            # 전체 추첨 결과, 추첨 대기 회차
+            models.Index(fields=['is_drawn', 'draw_date'], name='draw_drawn_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.lottery_type.name} - {self.draw_number}"
     
+    def save(self, *args, **kwargs):
+        self.winning_mask = encode_numbers(self.winning_numbers)
+        super().save(*args, **kwargs)
+        self._invalidate_caches()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_caches()
+        return result
+    
+    def _invalidate_caches(self):
+        # 판매 중인 회차 캐시와 공개 페이지 캐시는 변경이 커밋된 뒤 무효화한다
+        from .draws import invalidate_open_draw
+        lottery_type_id = self.lottery_type_id
+        transaction.on_commit(lambda: invalidate_open_draw(lottery_type_id))
+        _bump_public_pages()
+    
     def generate_winning_numbers(self):
-        """당첨 번호 생성"""
-        if not self.is_drawn:
-            numbers = random.sample(range(1, self.lottery_type.max_number + 1), 
-                                  self.lottery_type.numbers_count)
-            self.winning_numbers = ','.join(map(str, sorted(numbers)))
+        """당첨 번호 생성
+
+        조건부 UPDATE 가 회차 행을 잠그므로 진행 중인 구매 트랜잭션이 끝난 뒤에
+        회차가 닫히고, 이후 구매는 회차 행을 잠그며 추첨 완료를 보고 취소된다.
+        """
+        if self.is_drawn:
+            return
+        numbers = random.sample(range(1, self.lottery_type.max_number + 1), 
+                              self.lottery_type.numbers_count)
+        winning_numbers = ','.join(map(str, sorted(numbers)))
+        winning_mask = encode_numbers(winning_numbers)
+        with transaction.atomic():
+            updated = LotteryDraw.objects.filter(pk=self.pk, is_drawn=False).update(
+                winning_numbers=winning_numbers,
+                winning_mask=winning_mask,
+                is_drawn=True,
+            )
+            if not updated:
+                # 다른 작업자가 먼저 추첨한 경우
+                self.refresh_from_db(fields=['winning_numbers', 'winning_mask', 'is_drawn'])
+                return
+            self.winning_numbers = winning_numbers
+            self.winning_mask = winning_mask
             self.is_drawn = True
-            self.save()
+            self._invalidate_caches()
+            # 실시간 결과 스트림에 당첨 번호 발표
+            from .events import publish_drawn
+            publish_drawn(self)
 
 
 class LotteryTicket(models.Model):
@@ -56,15 +149,38 @@ class LotteryTicket(models.Model):
     lottery_draw = models.ForeignKey(LotteryDraw, on_delete=models.CASCADE, verbose_name="추첨 회차")
     ticket_number = models.CharField(max_length=50, unique=True, verbose_name="복권 번호")
     selected_numbers = models.CharField(max_length=200, verbose_name="선택한 번호")
+    selected_mask = models.BigIntegerField(null=True, blank=True, verbose_name="선택 번호 마스크")
     is_auto_select = models.BooleanField(default=False, verbose_name="자동 선택 여부")
     purchase_time = models.DateTimeField(auto_now_add=True, verbose_name="구매 시간")
+    match_count = models.SmallIntegerField(null=True, blank=True, verbose_name="일치 수량")
     is_winning = models.BooleanField(default=False, verbose_name="당첨 여부")
     winning_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="당첨 금액")
+    is_checked = models.BooleanField(default=False, verbose_name="당첨 확인 여부")
     is_claimed = models.BooleanField(default=False, verbose_name="수령 완료 여부")
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="수령 시간")
     
     class Meta:
         verbose_name = "복권"
         verbose_name_plural = "복권"
+        indexes = [
+            # 내 복권, 개인 센터의 최근 구매
+            models.Index(fields=['user', '-purchase_time'], name='ticket_user_purchase_idx'),
+            # 관리자 대시보드의 최근 판매, 기간별 판매 집계
+            models.Index(fields=['-purchase_time'], name='ticket_purchase_time_idx'),
+            # 회차별 당첨 복권
+            models.Index(fields=['lottery_draw', 'is_winning'], name='ticket_draw_winning_idx'),
+            # 사용자별 당첨 복권 (추첨 여부는 회차 조인으로 확인)
+            models.Index(fields=['user', 'is_winning', 'lottery_draw'], name='ticket_user_winning_idx'),
+            # 아직 수령하지 않은 당첨 복권
+            models.Index(fields=['user', 'lottery_draw'], name='ticket_unclaimed_win_idx',
+                         condition=Q(is_winning=True, is_claimed=False)),
+            # 당첨 확인 페이지: 사용자에게 아직 알리지 않은 당첨 복권
+            models.Index(fields=['user', 'lottery_draw'], name='ticket_unchecked_win_idx',
+                         condition=Q(is_winning=True, is_checked=False)),
+            # 아직 채점되지 않은 복권 (정산 전 회차)
+            models.Index(fields=['user', 'lottery_draw'], name='ticket_unscored_idx',
+                         condition=Q(match_count__isnull=True)),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.ticket_number}"
@@ -72,35 +188,41 @@ class LotteryTicket(models.Model):
     def save(self, *args, **kwargs):
         if not self.ticket_number:
             self.ticket_number = self.generate_ticket_number()
+        self.selected_mask = encode_numbers(self.selected_numbers)
         super().save(*args, **kwargs)
     
     def generate_ticket_number(self):
         """복권 번호 생성"""
-        timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-        random_str = ''.join(random.choices(string.digits, k=4))
-        return f"T{timestamp}{random_str}"
+        return self.generate_ticket_numbers(1)[0]
+    
+    @staticmethod
+    def generate_ticket_numbers(count):
+        """서로 다른 복권 번호 여러 개 생성 (bulk_create 용)"""
+        from .ticket_numbers import allocate_ticket_numbers
+        return allocate_ticket_numbers(count)
     
-    def check_winning(self):
-        """당첨 여부 확인"""
-        if self.lottery_draw.is_drawn and not self.is_winning:
+    def check_winning(self, payout_table=None):
+        """당첨 여부 확인 (정산과 같은 규칙으로 채점하고 일치 수량을 기록)
+
+        이미 당첨 또는 수령 처리된 복권은 일치 수량만 기록하고 상금은 그대로 둔다.
+        """
+        if self.lottery_draw.is_drawn and self.match_count is None:
             winning_numbers = set(self.lottery_draw.winning_numbers.split(','))
             selected_numbers = set(self.selected_numbers.split(','))
             
-            # 간단한 당첨 로직: 3개 이상 번호 일치 시 당첨
+            # 일치 수량에 따른 상금은 복권 유형의 상금 등급표에서 조회
             matches = len(winning_numbers.intersection(selected_numbers))
-            if matches >= 3:
+            self.match_count = matches
+            if self.is_winning or self.is_claimed:
+                self.save(update_fields=['match_count'])
+                return
+            if payout_table is None:
+                payout_table = self.lottery_draw.lottery_type.get_payout_table()
+            amount = payout_table.amount_for(matches)
+            if amount is not None:
                 self.is_winning = True
-                # 일치 수량에 따른 상금 계산
-                base_amount = self.lottery_draw.lottery_type.price
-                if matches == 3:
-                    self.winning_amount = base_amount * 10
-                elif matches == 4:
-                    self.winning_amount = base_amount * 50
-                elif matches == 5:
-                    self.winning_amount = base_amount * 200
-                elif matches >= 6:
-                    self.winning_amount = base_amount * 1000
-                self.save()
+                self.winning_amount = amount
+            self.save(update_fields=['match_count', 'is_winning', 'winning_amount'])
 
 
 class UserProfile(models.Model):
@@ -130,6 +252,8 @@ class Transaction(models.Model):
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="사용자")
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES, verbose_name="거래 유형")
+    lottery_type = models.ForeignKey(LotteryType, on_delete=models.SET_NULL, null=True, blank=True,
+                                     verbose_name="복권 유형")
     amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="금액")
     description = models.CharField(max_length=200, verbose_name="설명")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="거래 시간")
@@ -138,6 +262,105 @@ class Transaction(models.Model):
         verbose_name = "거래 기록"
         verbose_name_plural = "거래 기록"
         ordering = ['-created_at']
+        indexes = [
+            # 사용자별 거래 내역
+            models.Index(fields=['user', '-created_at'], name='txn_user_created_idx'),
+            # 거래 유형별 기간 합계
+            models.Index(fields=['transaction_type', 'created_at'], name='txn_type_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.get_transaction_type_display()} - {self.amount}"
+
+
+class TicketSequence(models.Model):
+    """복권 번호 시퀀스 (번호 구간 예약용)"""
+    name = models.CharField(max_length=50, unique=True, verbose_name="시퀀스 이름")
+    next_value = models.BigIntegerField(default=1, verbose_name="다음 번호")
+    
+    class Meta:
+        verbose_name = "복권 번호 시퀀스"
+        verbose_name_plural = "복권 번호 시퀀스"
+    
+    def __str__(self):
+        return f"{self.name} - {self.next_value}"
+
+
+class ContentVersion(models.Model):
+    """공개 콘텐츠 버전 (웹·워커 프로세스가 같은 값을 보도록 데이터베이스에 둔다)"""
+    name = models.CharField(max_length=50, unique=True, verbose_name="이름")
+    version = models.BigIntegerField(default=0, verbose_name="버전")
+    
+    class Meta:
+        verbose_name = "공개 콘텐츠 버전"
+        verbose_name_plural = "공개 콘텐츠 버전"
+    
+    def __str__(self):
+        return f"{self.name} - {self.version}"
+
+
+class DailySalesRollup(models.Model):
+    """일별 판매 집계"""
+    date = models.DateField(verbose_name="날짜")
+    lottery_type = models.ForeignKey(LotteryType, on_delete=models.CASCADE, verbose_name="복권 유형")
+    tickets = models.IntegerField(default=0, verbose_name="판매 수량")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="판매 금액")
+    winnings_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="지급 상금")
+    
+    class Meta:
+        verbose_name = "일별 판매 집계"
+        verbose_name_plural = "일별 판매 집계"
+        unique_together = ['date', 'lottery_type']
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.date} - {self.lottery_type.name}"
+    
+    @classmethod
+    def record(cls, lottery_type_id, tickets=0, revenue=0, winnings_paid=0, date=None):
+        """집계 행을 원자적으로 증가 (행이 없으면 생성)"""
+        date = date or timezone.localdate()
+        rows = cls.objects.filter(date=date, lottery_type_id=lottery_type_id)
+        changes = {
+            'tickets': F('tickets') + tickets,
+            'revenue': F('revenue') + revenue,
+            'winnings_paid': F('winnings_paid') + winnings_paid,
+        }
+        if rows.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    date=date,
+                    lottery_type_id=lottery_type_id,
+                    tickets=tickets,
+                    revenue=revenue,
+                    winnings_paid=winnings_paid,
+                )
+        except IntegrityError:
+            # 동시에 다른 요청이 같은 행을 만든 경우
+            rows.update(**changes)
+
+
+class DrawEvent(models.Model):
+    """추첨 이벤트 (실시간 결과 스트림용 발행 기록)"""
+    KIND_CHOICES = [
+        ('drawn', '당첨 번호 발표'),
+        ('settled', '정산 완료'),
+    ]
+    
+    lottery_draw = models.ForeignKey(LotteryDraw, on_delete=models.CASCADE, verbose_name="추첨 회차")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="이벤트 종류")
+    payload = models.JSONField(default=dict, verbose_name="내용")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="생성 시간")
+    
+    class Meta:
+        verbose_name = "추첨 이벤트"
+        verbose_name_plural = "추첨 이벤트"
+        indexes = [
+            # 회차별 이벤트 재전송 (Last-Event-ID 이후)
+            models.Index(fields=['lottery_draw', 'id'], name='draw_event_draw_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - {self.get_transaction_type_display()} - {self.amount}"
\ No newline at end of file
+        return f"{self.lottery_draw} - {self.get_kind_display()}"
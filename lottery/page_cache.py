@@ -0,0 +1,119 @@
+"""익명 사용자용 공개 페이지 캐시
+
+홈, 복권 홀, 복권 상세, 추첨 결과는 비로그인 방문자 모두에게 같은 내용이므로
+렌더링한 페이지를 캐시한다. 캐시 키에는 공개 콘텐츠 버전이 들어가고, 회차나
+복권 유형·상금 등급이 바뀌면 버전을 올려 이전 키를 모두 무효화한다.
+버전은 밀리초 단위 시각이라 그대로 ETag 와 Last-Modified 로 쓰며, 조건부
+요청은 데이터베이스를 거치지 않고 304 로 응답한다.
+
+버전의 기준 값은 ContentVersion 행이다. 추첨 워커처럼 다른 프로세스에서 올린
+버전도 보이도록 캐시에는 PUBLIC_PAGE_VERSION_TTL 동안만 두므로, 캐시를
+프로세스마다 따로 쓰더라도(LocMemCache) 그 시간이 지나면 새 버전을 읽는다.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import ContentVersion
+
+
+CACHE_PREFIX = 'public_page:'
+VERSION_KEY = 'public_page_version'
+VERSION_NAME = 'public_pages'
+
+
+def _timeout():
+    return getattr(settings, 'PUBLIC_PAGE_CACHE_TTL', 300)
+
+
+def _version_timeout():
+    return min(getattr(settings, 'PUBLIC_PAGE_VERSION_TTL', 5), _timeout())
+
+
+def content_version():
+    """현재 공개 콘텐츠 버전 (데이터베이스에 행이 없으면 현재 시각으로 시작)"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = (ContentVersion.objects.filter(name=VERSION_NAME)
+                   .values_list('version', flat=True).first())
+        if version is None:
+            return bump_content_version()
+        cache.set(VERSION_KEY, version, _version_timeout())
+    return version
+
+
+def bump_content_version():
+    """공개 콘텐츠 버전 올리기 (이전 버전의 페이지·조각 캐시는 더 이상 읽히지 않는다)"""
+    now = int(time.time() * 1000)
+    versions = ContentVersion.objects.filter(name=VERSION_NAME)
+    with transaction.atomic():
+        if not versions.update(version=Greatest(F('version') + 1, now)):
+            try:
+                with transaction.atomic():
+                    ContentVersion.objects.create(name=VERSION_NAME, version=now)
+            except IntegrityError:
+                # 동시에 다른 프로세스가 버전 행을 만든 경우
+                versions.update(version=Greatest(F('version') + 1, now))
+        version = versions.values_list('version', flat=True).get()
+    cache.set(VERSION_KEY, version, _version_timeout())
+    return version
+
+
+def page_context():
+    """조각 캐시 ({% cache %}) 에 쓰는 템플릿 변수"""
+    return {'page_version': content_version(), 'page_cache_ttl': _timeout()}
+
+
+def _is_cacheable(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # 표시할 메시지가 있으면 방문자마다 페이지가 다르다
+    return not len(messages.get_messages(request))
+
+
+def _set_validators(response, version):
+    response['ETag'] = f'"{version}"'
+    response['Last-Modified'] = http_date(version // 1000)
+    patch_cache_control(response, public=True, max_age=0)
+    return response
+
+
+def cache_public_page(view):
+    """익명 방문자의 GET 요청을 버전 키로 캐시하고 조건부 요청을 처리하는 데코레이터"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable(request):
+            return view(request, *args, **kwargs)
+
+        version = content_version()
+        last_modified = datetime.fromtimestamp(version // 1000, dt_timezone.utc)
+        not_modified = get_conditional_response(
+            request, etag=f'"{version}"', last_modified=int(last_modified.timestamp()),
+        )
+        if not_modified is not None:
+            return _set_validators(not_modified, version)
+
+        path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = f'{CACHE_PREFIX}{version}:{path_hash}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return _set_validators(HttpResponse(content, content_type=content_type), version)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            cache.set(key, (response.content, response['Content-Type']), _timeout())
+            _set_validators(response, version)
+        return response
+    return wrapper
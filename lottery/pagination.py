@@ -0,0 +1,177 @@
+"""키셋(커서) 페이지네이션
+
+OFFSET 과 COUNT(*) 없이 정렬 키 (예: (draw_date, id)) 의 마지막 값부터 다음
+페이지를 읽는다. 깊은 페이지도 첫 페이지와 같은 비용으로 인덱스에서 읽힌다.
+페이지 위치는 정렬 키 값을 담은 불투명한 토큰으로 `after` / `before`
+쿼리 파라미터에 전달한다. 정렬 키는 NULL 이 없는 필드여야 하고 마지막 키는
+유일해야 한다 (보통 id).
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.http import urlencode
+
+
+AFTER_PARAM = 'after'
+BEFORE_PARAM = 'before'
+
+
+class InvalidCursor(ValueError):
+    """해석할 수 없는 페이지 토큰"""
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder 는 마이크로초를 밀리초로 자르므로 시각은 그대로 쓴다
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    """정렬 키 값 목록을 URL 에 쓸 수 있는 토큰으로 변환"""
+    data = json.dumps(list(values), cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """토큰을 정렬 키 값 목록으로 변환"""
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(data)
+    except (TypeError, ValueError):
+        raise InvalidCursor(token)
+    if not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values
+
+
+class CursorPage:
+    """커서 페이지 (총 개수와 페이지 번호는 없다)"""
+
+    def __init__(self, object_list, paginator, params, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.params = params
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _querystring(self, name, cursor):
+        return urlencode({**self.params, name: cursor})
+
+    @property
+    def next_querystring(self):
+        return self._querystring(AFTER_PARAM, self.next_cursor) if self.next_cursor else ''
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(BEFORE_PARAM, self.previous_cursor) if self.previous_cursor else ''
+
+    @property
+    def first_querystring(self):
+        return urlencode(self.params)
+
+
+class CursorPaginator:
+    """정렬된 쿼리셋을 정렬 키 기준으로 나누는 페이지네이터
+
+    ordering 은 order_by 와 같은 형식 (예: ('-draw_date', '-id')) 이다.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    def cursor_for(self, obj):
+        """객체 (또는 values() 딕셔너리) 다음 / 이전 페이지를 가리키는 토큰"""
+        if isinstance(obj, dict):
+            return encode_cursor(obj[name] for name in self.fields)
+        return encode_cursor(getattr(obj, name) for name in self.fields)
+
+    def _parse(self, token):
+        values = decode_cursor(token)
+        if len(values) != len(self.fields):
+            raise InvalidCursor(token)
+        model = self.queryset.model
+        try:
+            return [model._meta.get_field(name).to_python(value) for name, value in zip(self.fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor(token)
+
+    def _seek(self, queryset, values, forward):
+        # (a, b) < (x, y) 를 a < x OR (a = x AND b < y) 로 펼친다
+        condition = Q()
+        for index, (name, value) in enumerate(zip(self.fields, values)):
+            lookup = 'lt' if self.descending[index] == forward else 'gt'
+            equal = {field: values[position] for position, field in enumerate(self.fields[:index])}
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        return queryset.filter(condition)
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def page(self, after=None, before=None, params=None):
+        """after 토큰 다음 또는 before 토큰 이전의 한 페이지 (토큰이 없으면 첫 페이지)"""
+        params = params or {}
+        if before is not None:
+            rows = list(self._seek(self.queryset.order_by(*self._reversed_ordering()), self._parse(before),
+                                   forward=False)[:self.per_page + 1])
+            if not rows:
+                return self.page(params=params)
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(
+                rows, self, params,
+                next_cursor=self.cursor_for(rows[-1]),
+                previous_cursor=self.cursor_for(rows[0]) if has_more else None,
+            )
+
+        queryset = self.queryset.order_by(*self.ordering)
+        if after is not None:
+            queryset = self._seek(queryset, self._parse(after), forward=True)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows, self, params,
+            next_cursor=self.cursor_for(rows[-1]) if has_more else None,
+            previous_cursor=self.cursor_for(rows[0]) if after is not None and rows else None,
+        )
+
+    def get_page(self, query, strict=False):
+        """요청 쿼리 파라미터로 페이지 읽기 (잘못된 토큰이면 첫 페이지, strict 면 InvalidCursor)
+
+        after / before 외의 파라미터 (검색어 등) 는 이전 / 다음 링크에 유지한다.
+        """
+        params = {key: value for key, value in query.items() if key not in (AFTER_PARAM, BEFORE_PARAM, 'page')}
+        try:
+            return self.page(query.get(AFTER_PARAM), query.get(BEFORE_PARAM), params)
+        except InvalidCursor:
+            if strict:
+                raise
+            return self.page(params=params)
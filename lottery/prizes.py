@@ -0,0 +1,52 @@
+"""상금 등급표
+
+복권 유형의 등급(일치 수량 → 배수)을 회차마다 한 번 일치 수량별 상금
+배열로 컴파일하여, 복권 한 장의 상금 계산을 배열 조회 한 번으로 만든다.
+"""
+from decimal import Decimal
+
+
+# 등급이 설정되지 않은 복권 유형에 적용하는 기본 등급 (일치 수량, 배수)
+DEFAULT_PRIZE_TIERS = [
+    (3, 10),
+    (4, 50),
+    (5, 200),
+    (6, 1000),
+]
+
+
+class PayoutTable:
+    """일치 수량별 상금 조회표
+
+    각 일치 수량에는 그 이하 중 가장 높은 등급의 상금이 적용되므로,
+    가장 높은 등급은 "N개 이상 일치" 를 뜻한다.
+    """
+
+    def __init__(self, price, tiers):
+        price = Decimal(str(price))
+        tiers = sorted((int(matches), Decimal(multiplier)) for matches, multiplier in tiers)
+        self.tiers = tiers
+        self.min_matches = tiers[0][0] if tiers else None
+
+        top = tiers[-1][0] if tiers else 0
+        self.amounts = [None] * (top + 1)
+        for matches, multiplier in tiers:
+            for index in range(matches, top + 1):
+                self.amounts[index] = price * multiplier
+
+    def amount_for(self, matches):
+        """일치 수량에 따른 상금 (당첨이 아니면 None)"""
+        if not self.amounts:
+            return None
+        return self.amounts[min(matches, len(self.amounts) - 1)]
+
+    def rows(self):
+        """화면 표시용 등급 목록 [(일치 수량, 배수, 상금, 이상 여부)]"""
+        last = len(self.tiers) - 1
+        return [
+            (matches, multiplier, self.amount_for(matches), index == last)
+            for index, (matches, multiplier) in enumerate(self.tiers)
+        ]
+
+    def __iter__(self):
+        return iter(self.tiers)
@@ -0,0 +1,161 @@
+"""복권 구매와 상금 수령 처리
+
+잔액 확인과 차감을 `balance >= 가격` 조건이 붙은 UPDATE 한 번으로 처리하여,
+같은 사용자의 동시 구매가 잔액을 덮어쓰거나 음수로 만들지 않도록 한다.
+상금 수령도 `is_claimed=False` 조건이 붙은 UPDATE 로 수령 표시를 먼저 하므로
+같은 복권을 동시에 수령해도 한 번만 지급된다.
+잠금 충돌로 트랜잭션이 실패하면 (SQLite 의 "database is locked" 등) 잠시 뒤
+다시 시도하고, 그래도 실패하면 PurchaseBusy 로 알린다.
+"""
+import time
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import counters
+from .bitmask import encode_numbers
+from .models import DailySalesRollup, LotteryDraw, LotteryTicket, Transaction, UserProfile
+
+
+class InsufficientBalance(Exception):
+    """잔액 부족"""
+
+
+class DrawClosed(Exception):
+    """판매가 끝난 회차"""
+
+
+class PurchaseBusy(Exception):
+    """동시 요청이 몰려 구매를 처리하지 못함 (잠시 후 다시 시도)"""
+
+
+PURCHASE_ATTEMPTS = 3
+RETRY_DELAY = 0.05
+
+
+def debit_balance(user, amount):
+    """잔액이 충분할 때만 원자적으로 차감"""
+    updated = UserProfile.objects.filter(user=user, balance__gte=amount).update(
+        balance=F('balance') - amount,
+        total_spent=F('total_spent') + amount,
+    )
+    if not updated:
+        raise InsufficientBalance
+
+
+def purchase_ticket(user, draw, selected_numbers, is_auto_select=False):
+    """복권 한 장 구매"""
+    return purchase_tickets(user, draw, [selected_numbers], is_auto_select)[0]
+
+
+def purchase_tickets(user, draw, selections, is_auto_select=False):
+    """복권 여러 장 구매
+
+    잔액을 한 번 차감하고, 복권은 bulk_create 로 한 번에 만들며, 거래 기록은
+    한 건으로 요약한다. 전체를 하나의 짧은 트랜잭션으로 처리한다.
+    """
+    # 번호 구간 예약이 구매 트랜잭션과 별도로 커밋되도록 트랜잭션 밖에서 발급한다
+    ticket_numbers = LotteryTicket.generate_ticket_numbers(len(selections))
+
+    # 바깥 트랜잭션 안에서는 재시도할 수 없다 (실패한 트랜잭션은 호출 측이 되돌린다)
+    attempts = 1 if connection.in_atomic_block else PURCHASE_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        try:
+            return _purchase(user, draw, selections, ticket_numbers, is_auto_select)
+        except OperationalError:
+            if attempt == attempts:
+                raise PurchaseBusy
+            time.sleep(RETRY_DELAY * attempt)
+
+
+def _purchase(user, draw, selections, ticket_numbers, is_auto_select):
+    lottery_type = draw.lottery_type
+    total = lottery_type.price * len(selections)
+
+    with transaction.atomic():
+        # 첫 문장을 쓰기로 시작해야 SQLite 가 읽기 잠금을 쓰기 잠금으로 올리다 바로 실패하지 않고
+        # 다른 쓰기가 끝나기를 기다린다
+        debit_balance(user, total)
+
+        # bulk_create 는 save() 를 호출하지 않으므로 복권 번호와 마스크를 직접 채운다
+        tickets = LotteryTicket.objects.bulk_create([
+            LotteryTicket(
+                user=user,
+                lottery_draw=draw,
+                ticket_number=ticket_number,
+                selected_numbers=selected_numbers,
+                selected_mask=encode_numbers(selected_numbers),
+                is_auto_select=is_auto_select,
+            )
+            for ticket_number, selected_numbers in zip(ticket_numbers, selections)
+        ])
+
+        if len(tickets) == 1:
+            description = f'{lottery_type.name} 복권 구매 - {tickets[0].ticket_number}'
+        else:
+            description = (f'{lottery_type.name} 복권 {len(tickets)}장 일괄 구매 - '
+                           f'{tickets[0].ticket_number} ~ {tickets[-1].ticket_number}')
+        Transaction.objects.create(
+            user=user,
+            transaction_type='purchase',
+            lottery_type=lottery_type,
+            amount=total,
+            description=description,
+        )
+
+        # 회차는 캐시에서 가져오므로 행을 잠그고 추첨 전인지 확인한다. 추첨은 같은 행을 잠근 뒤
+        # 닫으므로, 여기를 통과한 구매는 추첨보다 먼저 커밋되어 정산에 포함된다.
+        # 잠금은 커밋 직전에 잡아 같은 회차의 구매끼리 기다리는 시간을 줄인다
+        is_drawn = (LotteryDraw.objects.select_for_update().filter(pk=draw.pk)
+                    .values_list('is_drawn', flat=True).first())
+        if is_drawn is not False:
+            raise DrawClosed
+
+        # 여러 사용자가 함께 갱신하는 집계 행은 잠금 시간을 줄이기 위해 마지막에 갱신
+        DailySalesRollup.record(lottery_type.id, tickets=len(tickets), revenue=total)
+        counters.increment(total_tickets=len(tickets), total_sales=total)
+    return tickets
+
+
+def claim_ticket(user, ticket):
+    """당첨 복권의 상금 수령 (이미 수령된 복권이면 False)"""
+    attempts = 1 if connection.in_atomic_block else PURCHASE_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        try:
+            return _claim(user, ticket)
+        except OperationalError:
+            if attempt == attempts:
+                raise PurchaseBusy
+            time.sleep(RETRY_DELAY * attempt)
+
+
+def _claim(user, ticket):
+    amount = ticket.winning_amount
+    lottery_type_id = ticket.lottery_draw.lottery_type_id
+
+    with transaction.atomic():
+        claimed = LotteryTicket.objects.filter(
+            pk=ticket.pk, user=user, is_winning=True, is_claimed=False,
+        ).update(is_claimed=True, is_checked=True, claimed_at=timezone.now())
+        if not claimed:
+            return False
+
+        credited = UserProfile.objects.filter(user=user).update(
+            balance=F('balance') + amount,
+            total_won=F('total_won') + amount,
+        )
+        if not credited:
+            UserProfile.objects.create(user=user, balance=amount, total_won=amount)
+
+        Transaction.objects.create(
+            user=user,
+            transaction_type='winning',
+            lottery_type_id=lottery_type_id,
+            amount=amount,
+            description=f'상금 수령 {ticket.ticket_number} - {amount}원',
+        )
+
+        DailySalesRollup.record(lottery_type_id, winnings_paid=amount)
+        counters.increment(total_winnings=amount)
+    return True
@@ -0,0 +1,86 @@
+"""일별 판매 집계 재계산"""
+from datetime import datetime, time, timedelta
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+
+def _day_bounds(start, end):
+    tz = timezone.get_current_timezone()
+    start_at = timezone.make_aware(datetime.combine(start, time.min), tz) if start else None
+    end_at = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz) if end else None
+    return start_at, end_at
+
+
+def rebuild_rollups(start=None, end=None, apps=global_apps):
+    """구매 거래와 상금 수령 기록으로 [start, end] 기간의 집계를 다시 계산 (기간이 없으면 전체)
+
+    판매 금액은 구매 당시 결제한 거래 금액의 합이므로 이후 복권 가격이 바뀌어도
+    달라지지 않는다. 마이그레이션에서는 apps 로 그 시점의 모델을 넘긴다.
+    """
+    DailySalesRollup = apps.get_model('lottery', 'DailySalesRollup')
+    LotteryTicket = apps.get_model('lottery', 'LotteryTicket')
+    Transaction = apps.get_model('lottery', 'Transaction')
+    start_at, end_at = _day_bounds(start, end)
+
+    sales = LotteryTicket.objects.all()
+    payments = Transaction.objects.filter(transaction_type='purchase', lottery_type__isnull=False)
+    claims = LotteryTicket.objects.filter(is_claimed=True).annotate(
+        # 수령 시간이 없는 과거 기록은 추첨 시간 기준으로 집계
+        paid_at=Coalesce('claimed_at', 'lottery_draw__draw_date'),
+    )
+    if start_at:
+        sales = sales.filter(purchase_time__gte=start_at)
+        payments = payments.filter(created_at__gte=start_at)
+        claims = claims.filter(paid_at__gte=start_at)
+    if end_at:
+        sales = sales.filter(purchase_time__lt=end_at)
+        payments = payments.filter(created_at__lt=end_at)
+        claims = claims.filter(paid_at__lt=end_at)
+
+    totals = {}
+    sales = sales.annotate(date=TruncDate('purchase_time')).values(
+        'date', 'lottery_draw__lottery_type',
+    ).annotate(
+        tickets=Count('id'),
+    ).order_by()
+    for row in sales:
+        rollup = totals.setdefault((row['date'], row['lottery_draw__lottery_type']), DailySalesRollup(
+            date=row['date'], lottery_type_id=row['lottery_draw__lottery_type'],
+        ))
+        rollup.tickets = row['tickets']
+
+    payments = payments.annotate(date=TruncDate('created_at')).values(
+        'date', 'lottery_type',
+    ).annotate(
+        revenue=Sum('amount'),
+    ).order_by()
+    for row in payments:
+        rollup = totals.setdefault((row['date'], row['lottery_type']), DailySalesRollup(
+            date=row['date'], lottery_type_id=row['lottery_type'],
+        ))
+        rollup.revenue = row['revenue'] or 0
+
+    claims = claims.annotate(date=TruncDate('paid_at')).values(
+        'date', 'lottery_draw__lottery_type',
+    ).annotate(
+        winnings_paid=Sum('winning_amount'),
+    ).order_by()
+    for row in claims:
+        rollup = totals.setdefault((row['date'], row['lottery_draw__lottery_type']), DailySalesRollup(
+            date=row['date'], lottery_type_id=row['lottery_draw__lottery_type'],
+        ))
+        rollup.winnings_paid = row['winnings_paid'] or 0
+
+    with transaction.atomic():
+        existing = DailySalesRollup.objects.all()
+        if start:
+            existing = existing.filter(date__gte=start)
+        if end:
+            existing = existing.filter(date__lte=end)
+        existing.delete()
+        DailySalesRollup.objects.bulk_create(totals.values(), batch_size=1000)
+    return len(totals)
@@ -0,0 +1,263 @@
+"""부하 테스트용 대량 데이터 생성
+
+사용자, 회차, 복권, 거래 기록을 bulk_create 로 배치 단위로 만든다. 선택 번호와
+구매자는 NumPy 로 배치마다 한 번에 뽑고, 복권 번호는 번호 시퀀스에서 배치
+단위로 구간을 예약해 만든다. 같은 seed 면 같은 분포의 데이터가 만들어진다.
+"""
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import counters
+from .bitmask import MAX_MASK_NUMBER, np
+from .draws import invalidate_open_draw
+from .page_cache import bump_content_version
+from .models import LotteryDraw, LotteryTicket, Transaction, UserProfile
+from .rollups import rebuild_rollups
+from .settlement import settle_draw
+from .ticket_numbers import format_ticket_number, reserve_block
+
+
+DEFAULT_PREFIX = 'load'
+DEFAULT_BATCH_SIZE = 5000
+SEED_PASSWORD = 'load123'
+
+
+class SeedSummary:
+    """생성 결과 요약"""
+
+    def __init__(self):
+        self.users = 0
+        self.draws = 0
+        self.tickets = 0
+        self.winning_tickets = 0
+        self.transactions = 0
+        self.elapsed = 0.0
+
+    @property
+    def tickets_per_second(self):
+        if self.elapsed <= 0:
+            return float(self.tickets)
+        return self.tickets / self.elapsed
+
+
+def random_selections(rng, count, max_number, numbers_count):
+    """count 장의 자동 선택 번호 (행마다 정렬된 정수 배열)"""
+    picks = rng.random((count, max_number)).argsort(axis=1)[:, :numbers_count] + 1
+    picks.sort(axis=1)
+    return picks
+
+
+def selection_masks(picks, max_number):
+    """선택 번호 배열의 비트마스크 (마스크 범위를 넘는 번호면 None)"""
+    if max_number > MAX_MASK_NUMBER:
+        return [None] * len(picks)
+    bits = np.left_shift(np.int64(1), picks.astype(np.int64) - 1)
+    return np.bitwise_or.reduce(bits, axis=1).tolist()
+
+
+def clear_seeded(prefix=DEFAULT_PREFIX):
+    """이전에 생성한 데이터 삭제 (복권과 거래 기록은 함께 삭제된다)"""
+    draws = LotteryDraw.objects.filter(draw_number__startswith=f'{prefix.upper()}-')
+    lottery_type_ids = set(draws.values_list('lottery_type_id', flat=True))
+    draws.delete()
+    User.objects.filter(username__startswith=f'{prefix}_').delete()
+    for lottery_type_id in lottery_type_ids:
+        invalidate_open_draw(lottery_type_id)
+    bump_content_version()
+
+
+def seed_users(count, prefix=DEFAULT_PREFIX, batch_size=DEFAULT_BATCH_SIZE):
+    """사용자와 프로필 생성 후 사용자 id 배열 반환"""
+    password = make_password(SEED_PASSWORD)
+    User.objects.bulk_create([
+        User(username=f'{prefix}_{index:07d}', email=f'{prefix}_{index:07d}@example.com', password=password)
+        for index in range(count)
+    ], batch_size=batch_size)
+    # SQLite 에서는 bulk_create 가 id 를 돌려주지 않으므로 다시 조회한다
+    user_ids = list(User.objects.filter(username__startswith=f'{prefix}_')
+                    .order_by('id').values_list('id', flat=True))
+    UserProfile.objects.bulk_create([
+        UserProfile(user_id=user_id, balance=1000) for user_id in user_ids
+    ], batch_size=batch_size)
+    return np.asarray(user_ids, dtype=np.int64)
+
+
+def seed_draws(count, lottery_types, rng, prefix=DEFAULT_PREFIX):
+    """하루 간격의 회차 생성 (유형별 마지막 회차는 판매 중으로 둔다)"""
+    now = timezone.now()
+    draws = []
+    for index in range(count):
+        lottery_type = lottery_types[index % len(lottery_types)]
+        is_drawn = index < count - len(lottery_types)
+        draw = LotteryDraw(
+            lottery_type=lottery_type,
+            draw_number=f'{prefix.upper()}-{index + 1:06d}',
+            draw_date=now - timedelta(days=count - index) if is_drawn else now + timedelta(days=1),
+            is_drawn=is_drawn,
+        )
+        if is_drawn:
+            picks = random_selections(rng, 1, lottery_type.max_number, lottery_type.numbers_count)
+            draw.winning_numbers = ','.join(map(str, picks[0].tolist()))
+            # bulk_create 는 save() 를 호출하지 않으므로 마스크를 직접 채운다
+            draw.winning_mask = selection_masks(picks, lottery_type.max_number)[0]
+        draws.append(draw)
+    LotteryDraw.objects.bulk_create(draws)
+    for lottery_type in lottery_types:
+        invalidate_open_draw(lottery_type.id)
+    bump_content_version()
+    return list(LotteryDraw.objects.filter(draw_number__startswith=f'{prefix.upper()}-')
+                .select_related('lottery_type').order_by('draw_date', 'id'))
+
+
+def add_to_profiles(totals, batch_size=DEFAULT_BATCH_SIZE, **signs):
+    """사용자별 금액 {user_id: 금액} 을 프로필 필드에 F() 로 반영
+
+    signs 는 필드별 부호(예: balance=-1, total_spent=1)다. 금액이 같은 사용자끼리
+    UPDATE 한 번으로 처리하므로 프로필을 읽어 오지 않는다.
+    """
+    by_amount = {}
+    for user_id, amount in totals.items():
+        by_amount.setdefault(amount, []).append(user_id)
+    for amount, user_ids in by_amount.items():
+        changes = {field: F(field) + sign * amount for field, sign in signs.items()}
+        for offset in range(0, len(user_ids), batch_size):
+            UserProfile.objects.filter(user_id__in=user_ids[offset:offset + batch_size]).update(**changes)
+
+
+def seed_tickets(draw, user_ids, weights, count, rng, batch_size=DEFAULT_BATCH_SIZE):
+    """회차 하나의 복권과 사용자별 구매 거래 기록 생성, (복권 수, 거래 수) 반환
+
+    purchase_tickets 와 같이 구매자 프로필의 잔액을 차감하고 누적 구매액을 올린다.
+    """
+    lottery_type = draw.lottery_type
+    purchase_time = min(draw.draw_date - timedelta(hours=1), timezone.now())
+    buyers = rng.choice(user_ids, size=count, p=weights)
+
+    for offset in range(0, count, batch_size):
+        batch_buyers = buyers[offset:offset + batch_size]
+        picks = random_selections(rng, len(batch_buyers), lottery_type.max_number, lottery_type.numbers_count)
+        masks = selection_masks(picks, lottery_type.max_number)
+        first, _ = reserve_block(len(batch_buyers))
+        LotteryTicket.objects.bulk_create([
+            LotteryTicket(
+                user_id=user_id,
+                lottery_draw=draw,
+                ticket_number=format_ticket_number(first + index, purchase_time.date()),
+                selected_numbers=','.join(map(str, numbers)),
+                selected_mask=mask,
+                is_auto_select=True,
+            )
+            for index, (user_id, numbers, mask) in enumerate(zip(batch_buyers.tolist(), picks.tolist(), masks))
+        ], batch_size=batch_size)
+
+    # purchase_time 은 auto_now_add 라 생성 후 회차 시간에 맞춘다
+    LotteryTicket.objects.filter(lottery_draw=draw).update(purchase_time=purchase_time)
+
+    buyer_ids, ticket_counts = np.unique(buyers, return_counts=True)
+    last_transaction_id = Transaction.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    Transaction.objects.bulk_create([
+        Transaction(
+            user_id=user_id,
+            transaction_type='purchase',
+            lottery_type=lottery_type,
+            amount=lottery_type.price * tickets,
+            description=f'{lottery_type.name} 복권 {tickets}장 일괄 구매 - {draw.draw_number}',
+        )
+        for user_id, tickets in zip(buyer_ids.tolist(), ticket_counts.tolist())
+    ], batch_size=batch_size)
+    Transaction.objects.filter(id__gt=last_transaction_id).update(created_at=purchase_time)
+
+    spent = {
+        user_id: lottery_type.price * tickets
+        for user_id, tickets in zip(buyer_ids.tolist(), ticket_counts.tolist())
+    }
+    add_to_profiles(spent, batch_size, balance=-1, total_spent=1)
+    return count, len(buyer_ids)
+
+
+def seed_claims(draw, batch_size=DEFAULT_BATCH_SIZE):
+    """정산된 회차의 당첨 복권 수령 처리, 생성한 거래 수 반환
+
+    claim_prize 와 같이 복권마다 'winning' 거래를 남기고 당첨자 프로필의
+    잔액과 누적 당첨금을 올린다.
+    """
+    claimed_at = draw.draw_date + timedelta(hours=1)
+    winners = list(
+        LotteryTicket.objects.filter(lottery_draw=draw, is_winning=True, is_claimed=False)
+        .values_list('user_id', 'ticket_number', 'winning_amount')
+    )
+    if not winners:
+        return 0
+
+    LotteryTicket.objects.filter(lottery_draw=draw, is_winning=True, is_claimed=False).update(
+        is_checked=True,
+        is_claimed=True,
+        claimed_at=claimed_at,
+    )
+
+    last_transaction_id = Transaction.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    Transaction.objects.bulk_create([
+        Transaction(
+            user_id=user_id,
+            transaction_type='winning',
+            lottery_type_id=draw.lottery_type_id,
+            amount=amount,
+            description=f'상금 수령 {ticket_number} - {amount}원',
+        )
+        for user_id, ticket_number, amount in winners
+    ], batch_size=batch_size)
+    Transaction.objects.filter(id__gt=last_transaction_id).update(created_at=claimed_at)
+
+    won = {}
+    for user_id, _, amount in winners:
+        won[user_id] = won.get(user_id, 0) + amount
+    add_to_profiles(won, batch_size, balance=1, total_won=1)
+    return len(winners)
+
+
+def seed_load(users, draws, tickets_per_draw, lottery_types, seed=0,
+              prefix=DEFAULT_PREFIX, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """부하 테스트용 데이터 생성
+
+    구매는 거래 기록과 함께 프로필 잔액·누적 구매액에 반영하고, 추첨이 끝난
+    회차는 정산 후 당첨 복권을 모두 수령 처리(거래 기록과 프로필
+    반영 포함)하고, 마지막에
+    일별 판매 집계와 대시보드 카운터를 다시 계산한다.
+    """
+    summary = SeedSummary()
+    started = time.monotonic()
+    rng = np.random.default_rng(seed)
+
+    with transaction.atomic():
+        user_ids = seed_users(users, prefix, batch_size)
+        draw_list = seed_draws(draws, lottery_types, rng, prefix)
+    summary.users = len(user_ids)
+    summary.draws = len(draw_list)
+
+    # 소수의 사용자가 많이 사는 실제 분포를 흉내 낸다
+    weights = rng.pareto(1.5, len(user_ids)) + 1
+    weights /= weights.sum()
+
+    for draw in draw_list:
+        with transaction.atomic():
+            tickets, transactions = seed_tickets(draw, user_ids, weights, tickets_per_draw, rng, batch_size)
+            summary.tickets += tickets
+            summary.transactions += transactions
+            if draw.is_drawn:
+                summary.winning_tickets += settle_draw(draw, chunk_size=batch_size).winning_count
+                summary.transactions += seed_claims(draw, batch_size)
+        summary.elapsed = time.monotonic() - started
+        if progress is not None:
+            progress(draw, summary)
+
+    rebuild_rollups()
+    cache.delete_many([counters.CACHE_PREFIX + name for name in counters.COUNTER_NAMES])
+    summary.elapsed = time.monotonic() - started
+    return summary
@@ -0,0 +1,253 @@
+"""추첨 회차 일괄 정산 엔진
+
+`LotteryTicket.check_winning` 과 동일한 규칙으로 회차의 모든 복권을
+청크 단위로 읽어 메모리에서 채점하고, 일치 수량별로 한 번의 UPDATE 로
+결과를 기록한다. 낙첨 복권도 일치 수량을 기록하므로 당첨 확인 페이지는
+복권을 다시 채점하지 않는다. 번호 마스크가 있는 복권은 청크 전체를 한 번에
+비트 연산으로 채점한다. 이미 당첨·수령 처리된 복권은 일치 수량만 기록하고
+상금은 바꾸지 않는다.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps as global_apps
+from django.db import connections, transaction
+from django.db.models import Q
+
+from .bitmask import count_matches, encode_numbers, np
+from .models import LotteryDraw, LotteryTicket
+from .prizes import DEFAULT_PRIZE_TIERS, PayoutTable
+
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class SettlementResult:
+    """정산 결과 요약"""
+
+    def __init__(self, draw):
+        self.draw = draw
+        self.processed = 0
+        self.winning_count = 0
+        self.tier_counts = {}
+        self.elapsed = 0.0
+
+    @property
+    def tickets_per_second(self):
+        if self.elapsed <= 0:
+            return float(self.processed)
+        return self.processed / self.elapsed
+
+    def add_tier(self, matches, count):
+        self.tier_counts[matches] = self.tier_counts.get(matches, 0) + count
+        self.winning_count += count
+
+    def merge(self, other):
+        """다른 샤드의 정산 결과 합치기"""
+        self.processed += other.processed
+        for matches, count in other.tier_counts.items():
+            self.add_tier(matches, count)
+
+    def __str__(self):
+        return (f"{self.draw} - {self.processed}장 정산, {self.winning_count}장 당첨, "
+                f"{self.tickets_per_second:.0f}장/초")
+
+
+def iter_ticket_chunks(draw, chunk_size=DEFAULT_CHUNK_SIZE, start_after=0, stop_at=None, ticket_model=LotteryTicket):
+    """아직 채점되지 않은 복권을 id 순서로 청크 단위로 읽기"""
+    queryset = ticket_model.objects.filter(
+        lottery_draw=draw,
+        match_count__isnull=True,
+    ).order_by('id')
+    if stop_at is not None:
+        queryset = queryset.filter(id__lte=stop_at)
+
+    last_id = start_after
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)
+                     .values_list('id', 'selected_mask', 'selected_numbers')[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1][0]
+
+
+def score_chunk(chunk, winning_numbers, winning_mask=None, min_matches=3):
+    """청크를 채점하여 min_matches 이상 일치한 복권을 {일치 수량: [복권 id]} 로 반환"""
+    tiers = {}
+    masked_ids = []
+    masks = []
+    for ticket_id, selected_mask, selected_numbers in chunk:
+        if winning_mask is not None and selected_mask is not None:
+            masked_ids.append(ticket_id)
+            masks.append(selected_mask)
+            continue
+        matches = len(winning_numbers.intersection(selected_numbers.split(',')))
+        if matches >= min_matches:
+            tiers.setdefault(matches, []).append(ticket_id)
+
+    if masks and np is not None:
+        ids = np.asarray(masked_ids, dtype=np.int64)
+        counts = count_matches(masks, winning_mask)
+        for matches in np.unique(counts[counts >= min_matches]):
+            tiers.setdefault(int(matches), []).extend(ids[counts == matches].tolist())
+    elif masks:
+        for ticket_id, matches in zip(masked_ids, count_matches(masks, winning_mask)):
+            if matches >= min_matches:
+                tiers.setdefault(matches, []).append(ticket_id)
+    return tiers
+
+
+def record_tiers(tickets, tiers, payout_table):
+    """채점 결과 {일치 수량: [복권 id]} 기록 후 등급별로 새로 당첨 처리된 복권 수 반환
+
+    이미 당첨 또는 수령 처리된 복권은 일치 수량만 기록하므로, 그 사이 상금
+    등급이 바뀌어도 확정된 상금이 다시 계산되지 않고 당첨 수에도 다시 세지 않는다.
+    """
+    winners = {}
+    for matches, ticket_ids in tiers.items():
+        scored = tickets.filter(id__in=ticket_ids)
+        amount = payout_table.amount_for(matches)
+        if amount is None:
+            scored.update(match_count=matches)
+            continue
+        scored.filter(Q(is_winning=True) | Q(is_claimed=True)).update(match_count=matches)
+        updated = scored.filter(is_winning=False, is_claimed=False).update(
+            match_count=matches,
+            is_winning=True,
+            winning_amount=amount,
+        )
+        if updated:
+            winners[matches] = updated
+    return winners
+
+
+def settle_draw(draw, chunk_size=DEFAULT_CHUNK_SIZE, start_after=0, on_chunk=None, stop_at=None):
+    """추첨 완료된 회차의 복권을 일괄 정산
+
+    start_after 보다 크고 stop_at 이하인 id 의 복권을 정산한다. on_chunk(result, last_id) 는
+    청크 결과를 기록하는 트랜잭션 안에서 호출되므로, 호출 측이 진행 위치를
+    함께 저장하면 중단 후에도 정확히 이어서 정산할 수 있다.
+    """
+    result = SettlementResult(draw)
+    if not draw.is_drawn:
+        return result
+
+    started = time.monotonic()
+    winning_numbers = set(draw.winning_numbers.split(','))
+    winning_mask = draw.winning_mask
+    if winning_mask is None:
+        winning_mask = encode_numbers(draw.winning_numbers)
+    payout_table = draw.lottery_type.get_payout_table()
+
+    for chunk in iter_ticket_chunks(draw, chunk_size, start_after, stop_at):
+        tiers = score_chunk(chunk, winning_numbers, winning_mask, min_matches=0)
+        with transaction.atomic():
+            for matches, count in record_tiers(LotteryTicket.objects, tiers, payout_table).items():
+                result.add_tier(matches, count)
+            result.processed += len(chunk)
+            result.elapsed = time.monotonic() - started
+            if on_chunk is not None:
+                on_chunk(result, chunk[-1][0])
+
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def backfill_match_counts(apps=global_apps, chunk_size=DEFAULT_CHUNK_SIZE):
+    """추첨이 끝난 회차 중 일치 수량이 비어 있는 복권을 정산과 같은 규칙으로 채점
+
+    마이그레이션에서도 쓰도록 모델은 apps 에서 가져오고, 상금 등급표는
+    PrizeTier 행으로 직접 만든다. 채점한 복권 수를 반환한다.
+    """
+    LotteryDraw = apps.get_model('lottery', 'LotteryDraw')
+    LotteryTicket = apps.get_model('lottery', 'LotteryTicket')
+    PrizeTier = apps.get_model('lottery', 'PrizeTier')
+
+    draw_ids = (LotteryTicket.objects.filter(lottery_draw__is_drawn=True, match_count__isnull=True)
+                .values_list('lottery_draw_id', flat=True).distinct().order_by())
+    processed = 0
+    for draw in LotteryDraw.objects.filter(id__in=list(draw_ids)).select_related('lottery_type'):
+        if not draw.winning_numbers:
+            continue
+        tiers = PrizeTier.objects.filter(lottery_type_id=draw.lottery_type_id).values_list('match_count', 'multiplier')
+        payout_table = PayoutTable(draw.lottery_type.price, list(tiers) or DEFAULT_PRIZE_TIERS)
+        winning_numbers = set(draw.winning_numbers.split(','))
+        winning_mask = draw.winning_mask
+        if winning_mask is None:
+            winning_mask = encode_numbers(draw.winning_numbers)
+
+        for chunk in iter_ticket_chunks(draw, chunk_size, ticket_model=LotteryTicket):
+            tiers = score_chunk(chunk, winning_numbers, winning_mask, min_matches=0)
+            with transaction.atomic():
+                record_tiers(LotteryTicket.objects, tiers, payout_table)
+            processed += len(chunk)
+    return processed
+
+
+def shard_bounds(draw, shards):
+    """회차의 복권을 수량이 고른 id 구간 [(start_after, stop_at)] 으로 나누기"""
+    queryset = LotteryTicket.objects.filter(lottery_draw=draw, match_count__isnull=True).order_by('id')
+    total = queryset.count()
+    if total == 0:
+        return []
+
+    shards = max(1, min(shards, total))
+    # 구간 끝이 되는 순번, id 는 한 번의 쿼리로 순서대로 읽으며 해당 순번에서만 기록한다
+    stops = [(index + 1) * total // shards - 1 for index in range(shards)]
+    bounds = []
+    start_after = 0
+    next_stop = iter(stops)
+    target = next(next_stop)
+    ids = queryset.values_list('id', flat=True).iterator(chunk_size=DEFAULT_CHUNK_SIZE)
+    for position, ticket_id in enumerate(ids):
+        if position != target:
+            continue
+        bounds.append((start_after, ticket_id))
+        start_after = ticket_id
+        target = next(next_stop, None)
+        if target is None:
+            break
+    return bounds
+
+
+def _init_worker():
+    # spawn 방식으로 시작된 프로세스에서도 Django 를 사용할 수 있도록 초기화
+    django.setup()
+    connections.close_all()
+
+
+def settle_shard(draw_id, start_after, stop_at, chunk_size=DEFAULT_CHUNK_SIZE):
+    """하나의 id 구간 정산 (작업 프로세스에서 실행)"""
+    draw = LotteryDraw.objects.select_related('lottery_type').get(pk=draw_id)
+    try:
+        return settle_draw(draw, chunk_size=chunk_size, start_after=start_after, stop_at=stop_at)
+    finally:
+        connections.close_all()
+
+
+def settle_draw_parallel(draw, workers, chunk_size=DEFAULT_CHUNK_SIZE):
+    """id 구간별로 여러 프로세스에서 동시에 정산하고 결과를 합치기"""
+    result = SettlementResult(draw)
+    if not draw.is_drawn:
+        return result
+
+    started = time.monotonic()
+    bounds = shard_bounds(draw, workers)
+    if workers <= 1 or len(bounds) <= 1:
+        for start_after, stop_at in bounds:
+            result.merge(settle_draw(draw, chunk_size=chunk_size, start_after=start_after, stop_at=stop_at))
+    else:
+        # 자식 프로세스가 부모의 DB 연결을 물려받지 않도록 먼저 닫는다
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=len(bounds), initializer=_init_worker) as executor:
+            futures = [
+                executor.submit(settle_shard, draw.pk, start_after, stop_at, chunk_size)
+                for start_after, stop_at in bounds
+            ]
+            for future in futures:
+                result.merge(future.result())
+
+    result.elapsed = time.monotonic() - started
+    return result
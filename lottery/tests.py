@@ -1,9 +1,21 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
-from .models import LotteryType, LotteryDraw, LotteryTicket, UserProfile, Transaction
+from .models import LotteryType, LotteryDraw, LotteryTicket, UserProfile, Transaction, DrawEvent
+
+
+def require_file_database(test):
+    """跳过需要多个连接并发写入的测试，除非测试数据库是文件
+
+    SQLite 的内存测试数据库（共享缓存）只有表锁且不等待，其他线程/进程无法并发写入；
+    用 lottery_project.test_runner.FileDatabaseTestRunner 运行时测试数据库是文件。
+    """
+    from django.db import connection
+
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        test.skipTest('内存数据库不支持多个连接并发写入')
 
 
 class LotteryModelTests(TestCase):
@@ -100,6 +112,9 @@ class LotteryModelTests(TestCase):
 class LotteryViewTests(TestCase):
     def setUp(self):
         """设置测试数据"""
+        from django.core.cache import cache
+
+        cache.clear()
         self.client = Client()
         self.user = User.objects.create_user(
             username='testuser',
@@ -131,6 +146,13 @@ class LotteryViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, '测试彩票')
 
+    def test_lottery_detail_shows_prize_tiers(self):
+        """测试彩票详情页显示奖级"""
+        response = self.client.get(reverse('lottery:lottery_detail', args=[self.lottery_type.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '6개 이상')
+        self.assertContains(response, '₩2000')
+
     def test_user_registration(self):
         """测试用户注册"""
         response = self.client.post(reverse('accounts:register'), {
@@ -261,4 +283,1705 @@ class TransactionTests(TestCase):
         )
         
         self.assertEqual(transaction.transaction_type, 'winning')
-        self.assertEqual(transaction.amount, 20.00)
\ No newline at end of file
+        self.assertEqual(transaction.amount, 20.00)
+
+
+class SettlementTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票',
+            description='测试用彩票',
+            price=2.00,
+            max_number=10,
+            numbers_count=6
+        )
+
+    def _create_draw(self, draw_number):
+        draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type,
+            draw_number=draw_number,
+            draw_date=timezone.now() + timedelta(hours=1)
+        )
+        selections = [
+            '1,2,3,4,5,6', '1,2,3,4,5,7', '1,2,3,4,8,9', '1,2,3,7,8,9',
+            '1,2,7,8,9,10', '5,6,7,8,9,10', '2,4,6,8,9,10', '1,3,5,7,9,10', '01,2,3,4,5,6',
+        ]
+        for selected in selections:
+            LotteryTicket.objects.create(user=self.user, lottery_draw=draw, selected_numbers=selected)
+        draw.winning_numbers = '1,2,3,4,5,6'
+        draw.is_drawn = True
+        draw.save()
+        return draw
+
+    def test_settle_draw_matches_check_winning(self):
+        """测试批量结算与逐张检查结果一致"""
+        from .settlement import settle_draw
+
+        reference_draw = self._create_draw('REF-001')
+        for ticket in LotteryTicket.objects.filter(lottery_draw=reference_draw):
+            ticket.check_winning()
+        expected = list(LotteryTicket.objects.filter(lottery_draw=reference_draw)
+                        .order_by('id').values_list('selected_numbers', 'is_winning', 'winning_amount'))
+
+        draw = self._create_draw('BULK-001')
+        result = settle_draw(draw, chunk_size=3)
+        actual = list(LotteryTicket.objects.filter(lottery_draw=draw)
+                      .order_by('id').values_list('selected_numbers', 'is_winning', 'winning_amount'))
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(result.processed, 9)
+        self.assertEqual(result.winning_count, sum(1 for row in expected if row[1]))
+        self.assertEqual(result.tier_counts, {6: 1, 5: 2, 4: 1, 3: 3})
+
+    def test_settle_records_match_count_for_all_tickets(self):
+        """测试结算为未中奖彩票也记录匹配数量"""
+        from .settlement import settle_draw
+
+        draw = self._create_draw('COUNT-001')
+        settle_draw(draw, chunk_size=4)
+
+        counts = dict(LotteryTicket.objects.filter(lottery_draw=draw).values_list('selected_numbers', 'match_count'))
+        self.assertEqual(counts['1,2,3,4,5,6'], 6)
+        self.assertEqual(counts['1,2,7,8,9,10'], 2)
+        self.assertEqual(counts['5,6,7,8,9,10'], 2)
+        self.assertFalse(LotteryTicket.objects.filter(lottery_draw=draw, match_count__isnull=True).exists())
+        self.assertEqual(settle_draw(draw).processed, 0)
+
+    def test_settle_undrawn_draw_is_noop(self):
+        """测试未开奖期次不结算"""
+        from .settlement import settle_draw
+
+        draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type,
+            draw_number='OPEN-001',
+            draw_date=timezone.now() + timedelta(hours=1)
+        )
+        LotteryTicket.objects.create(user=self.user, lottery_draw=draw, selected_numbers='1,2,3,4,5,6')
+
+        result = settle_draw(draw)
+
+        self.assertEqual(result.processed, 0)
+        self.assertFalse(LotteryTicket.objects.filter(lottery_draw=draw, is_winning=True).exists())
+
+    def test_sharded_settlement_matches_single_run(self):
+        """测试分片结算与单进程结算结果一致"""
+        from .settlement import settle_draw, settle_draw_parallel, shard_bounds
+
+        reference_draw = self._create_draw('REF-001')
+        reference = settle_draw(reference_draw)
+
+        draw = self._create_draw('SHARD-001')
+        bounds = shard_bounds(draw, 4)
+        self.assertEqual(len(bounds), 4)
+        self.assertEqual(bounds[0][0], 0)
+        for (_, stop_at), (start_after, _) in zip(bounds, bounds[1:]):
+            self.assertEqual(stop_at, start_after)
+
+        with self.assertNumQueries(2):
+            shard_bounds(draw, 4)
+
+        result = settle_draw_parallel(draw, 1, chunk_size=2)
+        self.assertEqual(result.tier_counts, reference.tier_counts)
+        self.assertEqual(result.processed, reference.processed)
+
+    def test_settle_uses_configured_prize_tiers(self):
+        """测试结算使用彩票类型配置的奖级"""
+        from .models import PrizeTier
+        from .settlement import settle_draw
+
+        PrizeTier.objects.create(lottery_type=self.lottery_type, match_count=2, multiplier=1)
+        PrizeTier.objects.create(lottery_type=self.lottery_type, match_count=5, multiplier=100)
+        draw = self._create_draw('TIER-001')
+
+        result = settle_draw(draw)
+
+        amounts = dict(LotteryTicket.objects.filter(lottery_draw=draw).values_list('selected_numbers', 'winning_amount'))
+        self.assertEqual(amounts['1,2,3,4,5,6'], 200)
+        self.assertEqual(amounts['1,2,3,4,8,9'], 2)
+        self.assertEqual(amounts['1,2,7,8,9,10'], 2)
+        self.assertEqual(amounts['5,6,7,8,9,10'], 2)
+        self.assertEqual(result.tier_counts[6], 1)
+
+
+class ParallelSettlementTests(TransactionTestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=6
+        )
+
+    def _create_draw(self, draw_number):
+        draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type, draw_number=draw_number, draw_date=timezone.now()
+        )
+        selections = ['1,2,3,4,5,6', '1,2,3,4,5,7', '1,2,3,4,8,9', '1,2,3,7,8,9', '5,6,7,8,9,10', '2,4,6,8,9,10']
+        LotteryTicket.objects.bulk_create([
+            LotteryTicket(user=self.user, lottery_draw=draw, selected_numbers=selections[index % len(selections)],
+                          ticket_number=f'{draw_number}-{index}')
+            for index in range(60)
+        ])
+        draw.winning_numbers = '1,2,3,4,5,6'
+        draw.is_drawn = True
+        draw.save()
+        return draw
+
+    def test_process_pool_matches_single_run(self):
+        """测试多进程分片结算与单进程结算结果一致"""
+        from .settlement import settle_draw, settle_draw_parallel
+
+        require_file_database(self)
+
+        reference = settle_draw(self._create_draw('REF-001'))
+        draw = self._create_draw('POOL-001')
+
+        result = settle_draw_parallel(draw, 3, chunk_size=7)
+
+        self.assertEqual(result.processed, 60)
+        self.assertEqual(result.tier_counts, reference.tier_counts)
+        self.assertFalse(LotteryTicket.objects.filter(lottery_draw=draw, match_count__isnull=True).exists())
+        self.assertEqual(
+            list(LotteryTicket.objects.filter(lottery_draw=draw).order_by('id').values_list('winning_amount', flat=True)),
+            list(LotteryTicket.objects.filter(lottery_draw=reference.draw).order_by('id')
+                 .values_list('winning_amount', flat=True)),
+        )
+
+
+class BitmaskTests(TestCase):
+    def test_encode_and_decode(self):
+        """测试号码掩码编码与解码"""
+        from .bitmask import encode_numbers, decode_mask
+
+        mask = encode_numbers('1,5,12,63')
+        self.assertEqual(mask, (1 << 0) | (1 << 4) | (1 << 11) | (1 << 62))
+        self.assertEqual(decode_mask(mask), [1, 5, 12, 63])
+
+    def test_encode_rejects_non_canonical(self):
+        """测试非规范号码不编码"""
+        from .bitmask import encode_numbers
+
+        self.assertIsNone(encode_numbers(''))
+        self.assertIsNone(encode_numbers('01,2,3'))
+        self.assertIsNone(encode_numbers('1, 2,3'))
+        self.assertIsNone(encode_numbers('1,2,64'))
+        self.assertIsNone(encode_numbers('0,2,3'))
+
+    def test_count_matches(self):
+        """测试批量计算匹配数量"""
+        from .bitmask import encode_numbers, count_matches
+
+        winning_mask = encode_numbers('1,2,3,4,5,6')
+        masks = [encode_numbers(text) for text in ('1,2,3,4,5,6', '1,2,3,7,8,9', '7,8,9,10,11,12')]
+        self.assertEqual([int(count) for count in count_matches(masks, winning_mask)], [6, 3, 0])
+
+    def test_masks_filled_on_save(self):
+        """测试保存时填充掩码"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3
+        )
+        draw = LotteryDraw.objects.create(
+            lottery_type=lottery_type, draw_number='TEST-001', draw_date=timezone.now()
+        )
+        ticket = LotteryTicket.objects.create(user=user, lottery_draw=draw, selected_numbers='1,2,3')
+        self.assertEqual(ticket.selected_mask, 0b111)
+
+        draw.generate_winning_numbers()
+        draw.refresh_from_db()
+        self.assertIsNotNone(draw.winning_mask)
+
+
+class PayoutTableTests(TestCase):
+    def test_default_tiers(self):
+        """测试默认奖级与原规则一致"""
+        from .prizes import DEFAULT_PRIZE_TIERS, PayoutTable
+
+        table = PayoutTable('2.00', DEFAULT_PRIZE_TIERS)
+        self.assertIsNone(table.amount_for(2))
+        self.assertEqual(table.amount_for(3), 20)
+        self.assertEqual(table.amount_for(4), 100)
+        self.assertEqual(table.amount_for(5), 400)
+        self.assertEqual(table.amount_for(6), 2000)
+        self.assertEqual(table.amount_for(7), 2000)
+        self.assertEqual(table.min_matches, 3)
+
+    def test_missing_tier_falls_back_to_lower_tier(self):
+        """测试未配置的匹配数使用较低奖级"""
+        from .prizes import PayoutTable
+
+        table = PayoutTable(2, [(4, 50), (2, 1)])
+        self.assertEqual(table.amount_for(3), 2)
+        self.assertEqual(table.amount_for(5), 100)
+        self.assertEqual([row[0] for row in table.rows()], [2, 4])
+
+
+class QueryCountTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123',
+            is_staff=True
+        )
+        UserProfile.objects.create(user=self.user, balance=100.00)
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票',
+            description='测试用彩票',
+            price=2.00,
+            max_number=10,
+            numbers_count=3
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def _create_tickets(self, count):
+        for index in range(count):
+            draw = LotteryDraw.objects.create(
+                lottery_type=self.lottery_type,
+                draw_number=f'TEST-{LotteryDraw.objects.count() + 1:03d}',
+                draw_date=timezone.now(),
+                winning_numbers='1,2,3',
+                is_drawn=index % 2 == 0
+            )
+            LotteryTicket.objects.create(user=self.user, lottery_draw=draw, selected_numbers='1,2,3')
+
+    def _count_queries(self, url):
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertQueriesIndependentOfRows(self, url):
+        self._create_tickets(2)
+        small = self._count_queries(url)
+        self._create_tickets(8)
+        large = self._count_queries(url)
+        self.assertEqual(small, large, f'{url} 的查询数随行数增长: {small} -> {large}')
+
+    def test_my_tickets_queries(self):
+        """测试我的彩票页查询数不随彩票数量增长"""
+        self.assertQueriesIndependentOfRows(reverse('lottery:my_tickets'))
+
+    def test_profile_queries(self):
+        """测试个人中心查询数不随彩票数量增长"""
+        self.assertQueriesIndependentOfRows(reverse('accounts:profile'))
+
+    def test_admin_dashboard_queries(self):
+        """测试管理后台查询数不随彩票数量增长"""
+        self.assertQueriesIndependentOfRows(reverse('management:admin_dashboard'))
+
+
+class CheckWinningsTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        UserProfile.objects.create(user=self.user, balance=100.00)
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def _drawn_draw(self, draw_number, selections):
+        draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type, draw_number=draw_number, draw_date=timezone.now()
+        )
+        for selected in selections:
+            LotteryTicket.objects.create(user=self.user, lottery_draw=draw, selected_numbers=selected)
+        draw.winning_numbers = '1,2,3'
+        draw.is_drawn = True
+        draw.save()
+        return draw
+
+    def _visit(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('lottery:check_winnings'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_winners_announced_once(self):
+        """测试已提示过的中奖彩票不会重复提示"""
+        from .settlement import settle_draw
+
+        settle_draw(self._drawn_draw('TEST-001', ['1,2,3', '4,5,6']))
+
+        response, _ = self._visit()
+        self.assertEqual(len(response.context['winning_tickets']), 1)
+        self.assertTrue(LotteryTicket.objects.get(selected_numbers='1,2,3').is_checked)
+
+        response, _ = self._visit()
+        self.assertEqual(response.context['winning_tickets'], [])
+
+    def test_unsettled_draw_scored_on_visit(self):
+        """测试结算完成前访问时为该用户的彩票评分"""
+        self._drawn_draw('TEST-001', ['1,2,3', '4,5,6'])
+
+        response, _ = self._visit()
+
+        self.assertEqual(len(response.context['winning_tickets']), 1)
+        self.assertEqual(LotteryTicket.objects.get(selected_numbers='4,5,6').match_count, 0)
+
+    def test_queries_independent_of_losing_tickets(self):
+        """测试已结算的未中奖彩票不增加查询数"""
+        from .settlement import settle_draw
+
+        settle_draw(self._drawn_draw('TEST-001', ['4,5,6'] * 2))
+        self._visit()
+        _, small = self._visit()
+
+        settle_draw(self._drawn_draw('TEST-002', ['4,5,6'] * 20))
+        _, large = self._visit()
+
+        self.assertEqual(small, large)
+
+    def _paid_ticket(self, draw):
+        # 旧版本兑奖时按当时的奖级记录了奖金，但没有命中数量
+        ticket = LotteryTicket.objects.get(lottery_draw=draw, selected_numbers='1,2,3')
+        LotteryTicket.objects.filter(pk=ticket.pk).update(
+            is_winning=True, is_claimed=True, winning_amount=999, match_count=None,
+        )
+        return ticket
+
+    def test_paid_winner_amount_kept_on_visit(self):
+        """测试评分已中奖或已兑奖的彩票时不改写奖金"""
+        ticket = self._paid_ticket(self._drawn_draw('TEST-001', ['1,2,3']))
+
+        self._visit()
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.match_count, 3)
+        self.assertEqual(ticket.winning_amount, 999)
+
+    def test_paid_winner_amount_kept_on_settle(self):
+        """测试结算时不改写已兑奖彩票的奖金，也不把它计入新的中奖数"""
+        from .settlement import settle_draw
+
+        draw = self._drawn_draw('TEST-001', ['1,2,3', '1,2,4'])
+        ticket = self._paid_ticket(draw)
+
+        result = settle_draw(draw)
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.match_count, 3)
+        self.assertEqual(ticket.winning_amount, 999)
+        self.assertEqual(result.processed, 2)
+        self.assertNotIn(3, result.tier_counts)
+        self.assertEqual(result.winning_count, sum(result.tier_counts.values()))
+
+    def test_backfill_scores_drawn_tickets(self):
+        """测试迁移回填已开奖期次的命中数量，不改写已兑奖彩票的奖金"""
+        from .settlement import backfill_match_counts
+
+        draw = self._drawn_draw('TEST-001', ['1,2,3', '1,2,4', '4,5,6'])
+        ticket = self._paid_ticket(draw)
+        LotteryTicket.objects.filter(lottery_draw=draw).update(match_count=None)
+        pending = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type, draw_number='TEST-002', draw_date=timezone.now()
+        )
+        LotteryTicket.objects.create(user=self.user, lottery_draw=pending, selected_numbers='1,2,3')
+
+        self.assertEqual(backfill_match_counts(), 3)
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.winning_amount, 999)
+        self.assertEqual(
+            dict(LotteryTicket.objects.filter(lottery_draw=draw).values_list('selected_numbers', 'match_count')),
+            {'1,2,3': 3, '1,2,4': 2, '4,5,6': 0},
+        )
+        self.assertFalse(LotteryTicket.objects.get(selected_numbers='4,5,6').is_winning)
+        self.assertIsNone(LotteryTicket.objects.get(lottery_draw=pending).match_count)
+        # 已开奖期次不再有未评分的彩票
+        self.assertFalse(LotteryTicket.objects.filter(lottery_draw=draw, match_count__isnull=True).exists())
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        UserProfile.objects.create(user=self.user)
+        self.client.login(username='testuser', password='testpass123')
+        lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3
+        )
+        self.draw = LotteryDraw.objects.create(
+            lottery_type=lottery_type, draw_number='TEST-001', draw_date=timezone.now()
+        )
+
+    def _create_tickets(self, count):
+        for _ in range(count):
+            LotteryTicket.objects.create(user=self.user, lottery_draw=self.draw, selected_numbers='1,2,3')
+        # 购买时间相同时按 id 区分先后
+        LotteryTicket.objects.update(purchase_time=timezone.now())
+
+    def test_walk_forward_and_back(self):
+        """测试按游标向后、向前翻页且不重复不遗漏"""
+        from .pagination import CursorPaginator
+
+        self._create_tickets(7)
+        paginator = CursorPaginator(LotteryTicket.objects.all(), ('-purchase_time', '-id'), 3)
+        expected = list(LotteryTicket.objects.order_by('-purchase_time', '-id').values_list('id', flat=True))
+
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(after=pages[-1].next_cursor))
+        self.assertEqual([ticket.id for page in pages for ticket in page], expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.page(before=pages[-1].previous_cursor)
+        self.assertEqual([ticket.id for ticket in back], expected[3:6])
+        self.assertTrue(back.has_previous())
+        first = paginator.page(before=back.previous_cursor)
+        self.assertEqual([ticket.id for ticket in first], expected[:3])
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """测试无法解析的游标返回第一页"""
+        self._create_tickets(12)
+
+        response = self.client.get(reverse('lottery:my_tickets'), {'after': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['tickets'].has_previous())
+        self.assertEqual(len(response.context['tickets']), 10)
+
+    def test_deep_pages_skip_offset_and_count(self):
+        """测试翻页查询不使用 OFFSET 和 COUNT"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._create_tickets(25)
+        first = self.client.get(reverse('lottery:my_tickets'))
+        second = self.client.get(reverse('lottery:my_tickets'), {'after': first.context['tickets'].next_cursor})
+        with CaptureQueriesContext(connection) as context:
+            third = self.client.get(reverse('lottery:my_tickets'), {'after': second.context['tickets'].next_cursor})
+
+        self.assertEqual(len(third.context['tickets']), 5)
+        self.assertFalse(third.context['tickets'].has_next())
+        for query in context.captured_queries:
+            self.assertNotIn('OFFSET', query['sql'])
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_transaction_history(self):
+        """测试交易记录页分页"""
+        from accounts.views import TRANSACTION_PAGE_SIZE
+
+        for index in range(TRANSACTION_PAGE_SIZE + 1):
+            Transaction.objects.create(user=self.user, transaction_type='recharge', amount=index, description='충전')
+
+        first = self.client.get(reverse('accounts:transactions'))
+        second = self.client.get(reverse('accounts:transactions'), {'after': first.context['transactions'].next_cursor})
+
+        self.assertEqual(len(first.context['transactions']), TRANSACTION_PAGE_SIZE)
+        self.assertEqual([transaction.amount for transaction in second.context['transactions']], [0])
+
+
+class PublicPageCacheTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = Client()
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3
+        )
+
+    def _conduct_draw(self, draw_number):
+        draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type, draw_number=draw_number, draw_date=timezone.now()
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            draw.generate_winning_numbers()
+        return draw
+
+    def test_anonymous_pages_served_from_cache(self):
+        """测试匿名访问的公开页面第二次不查询数据库"""
+        urls = [
+            reverse('lottery:home'),
+            reverse('lottery:lottery_list'),
+            reverse('lottery:lottery_detail', args=[self.lottery_type.id]),
+            reverse('lottery:draw_results'),
+        ]
+        for url in urls:
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.content, first.content)
+            self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_conditional_get_returns_304(self):
+        """测试 ETag 和 Last-Modified 未变化时返回 304"""
+        url = reverse('lottery:draw_results')
+        response = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_conducting_draw_bumps_version(self):
+        """测试开奖后缓存版本变化，页面显示新的开奖结果"""
+        url = reverse('lottery:home')
+        before = self.client.get(url)
+
+        self._conduct_draw('TEST-001')
+
+        after = self.client.get(url)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=before['ETag']).status_code, 200)
+        self.assertContains(after, 'TEST-001')
+
+    def test_version_shared_through_database(self):
+        """测试其他进程只写入数据库的版本在版本缓存到期后生效"""
+        from django.core.cache import cache
+        from django.db.models import F
+        from .models import ContentVersion
+        from .page_cache import VERSION_KEY
+
+        url = reverse('lottery:home')
+        before = self.client.get(url)
+
+        # 模拟开奖工作进程：缓存不共享，只有数据库中的版本行可见
+        ContentVersion.objects.update(version=F('version') + 1000)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=before['ETag']).status_code, 304)
+
+        cache.delete(VERSION_KEY)
+        after = self.client.get(url)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=before['ETag']).status_code, 200)
+
+    def test_version_cache_ttl_capped(self):
+        """测试版本缓存时间不超过页面缓存时间"""
+        from django.test import override_settings
+        from .page_cache import _version_timeout
+
+        with override_settings(PUBLIC_PAGE_CACHE_TTL=2, PUBLIC_PAGE_VERSION_TTL=60):
+            self.assertEqual(_version_timeout(), 2)
+        with override_settings(PUBLIC_PAGE_CACHE_TTL=300, PUBLIC_PAGE_VERSION_TTL=5):
+            self.assertEqual(_version_timeout(), 5)
+
+    def test_logged_in_users_bypass_page_cache(self):
+        """测试登录用户不使用整页缓存"""
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get(reverse('lottery:home'))
+
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'testuser')
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3
+        )
+        self.draws = []
+        for index in range(5):
+            self.draws.append(LotteryDraw.objects.create(
+                lottery_type=self.lottery_type,
+                draw_number=f'TEST-{index + 1:03d}',
+                draw_date=timezone.now() - timedelta(days=5 - index),
+                winning_numbers='1,2,3',
+                is_drawn=index < 4,
+            ))
+
+    def test_lottery_types_field_selection(self):
+        """测试彩票类型接口只返回选择的字段"""
+        response = self.client.get(reverse('api_v1:lottery_types'), {'fields': 'id,name'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'results': [{'id': self.lottery_type.id, 'name': '测试彩票'}]})
+
+    def test_unknown_field_rejected(self):
+        """测试未知字段返回 400"""
+        response = self.client.get(reverse('api_v1:draw_results'), {'fields': 'id,password'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_draw_results_cursor_pagination(self):
+        """测试开奖结果接口按游标分页且号码为整数列表"""
+        url = reverse('api_v1:draw_results')
+        first = self.client.get(url, {'limit': 3, 'fields': 'draw_number,winning_numbers'}).json()
+        second = self.client.get(url, {'limit': 3, 'fields': 'draw_number', 'after': first['next']}).json()
+
+        self.assertEqual([row['draw_number'] for row in first['results']], ['TEST-004', 'TEST-003', 'TEST-002'])
+        self.assertEqual(first['results'][0], {'draw_number': 'TEST-004', 'winning_numbers': [1, 2, 3]})
+        self.assertEqual(second['results'], [{'draw_number': 'TEST-001'}])
+        self.assertIsNone(second['next'])
+
+    def test_open_draws(self):
+        """测试在售期次接口"""
+        response = self.client.get(reverse('api_v1:open_draws'), {'lottery_type': self.lottery_type.id})
+
+        self.assertEqual([row['draw_number'] for row in response.json()['results']], ['TEST-005'])
+
+    def test_etag_revalidation(self):
+        """测试 If-None-Match 一致时返回 304"""
+        url = reverse('api_v1:draw_results')
+        response = self.client.get(url)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.draws[4].winning_numbers = '4,5,6'
+        self.draws[4].is_drawn = True
+        self.draws[4].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_invalid_cursor_rejected(self):
+        """测试无法解析的游标返回 400，错误信息与正常响应一样不转义非 ASCII 字符"""
+        from .pagination import encode_cursor
+
+        url = reverse('api_v1:draw_results')
+        for params in ({'after': 'not-a-cursor'}, {'before': encode_cursor([1])},
+                       {'after': encode_cursor(['not-a-date', 'x'])}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('커서'.encode(), response.content)
+
+    def test_tickets_require_login(self):
+        """测试我的彩票接口需要登录，且只返回本人的彩票"""
+        url = reverse('api_v1:my_tickets')
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        other = User.objects.create_user(username='other', password='testpass123')
+        LotteryTicket.objects.create(user=self.user, lottery_draw=self.draws[0], selected_numbers='1,2,3')
+        LotteryTicket.objects.create(user=other, lottery_draw=self.draws[0], selected_numbers='4,5,6')
+        self.client.login(username='testuser', password='testpass123')
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'fields': 'selected_numbers,draw_number,is_drawn'})
+
+        self.assertEqual(response.json()['results'], [
+            {'selected_numbers': [1, 2, 3], 'draw_number': 'TEST-001', 'is_drawn': True},
+        ])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_latest_results(self):
+        """测试最新开奖接口返回每种彩票最近一期，开奖后缓存失效"""
+        from django.core.cache import cache
+        cache.clear()
+        url = reverse('api_v1:latest_results')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['draw_number'] for row in response.json()['results']], ['TEST-004'])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.draws[4].is_drawn = True
+            self.draws[4].save()
+        self.assertEqual(self.client.get(url).json()['results'][0]['draw_number'], 'TEST-005')
+        self.assertEqual(self.client.post(url).status_code, 405)
+
+    def test_winnings_status(self):
+        """测试中奖状态接口需要登录，并在兑奖后更新"""
+        from django.core.cache import cache
+        cache.clear()
+        url = reverse('api_v1:winnings_status')
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        LotteryTicket.objects.create(
+            user=self.user, lottery_draw=self.draws[0], selected_numbers='1,2,3',
+            match_count=3, is_winning=True, winning_amount=100,
+        )
+        LotteryTicket.objects.create(user=self.user, lottery_draw=self.draws[4], selected_numbers='4,5,6')
+        self.client.login(username='testuser', password='testpass123')
+
+        status = self.client.get(url).json()
+        self.assertEqual(float(status.pop('unclaimed_amount')), 100)
+        self.assertEqual(status, {'new_winning_tickets': 1, 'unclaimed_tickets': 1, 'pending_tickets': 1})
+        self.client.get(reverse('lottery:check_winnings'))
+        self.assertEqual(self.client.get(url).json()['new_winning_tickets'], 0)
+
+    def test_async_views_keep_cache_off_event_loop(self):
+        """测试异步接口不在事件循环线程上调用同步缓存"""
+        import asyncio
+        from unittest import mock
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client.login(username='testuser', password='testpass123')
+        on_loop = []
+        real_get = cache.get
+
+        def get(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(args[0])
+            except RuntimeError:
+                pass
+            return real_get(*args, **kwargs)
+
+        with mock.patch.object(cache, 'get', side_effect=get) as patched:
+            self.client.get(reverse('api_v1:latest_results'))
+            self.client.get(reverse('api_v1:winnings_status'))
+
+        self.assertTrue(patched.called)
+        self.assertEqual(on_loop, [])
+
+
+class DrawEventTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3
+        )
+        self.draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type, draw_number='TEST-001', draw_date=timezone.now()
+        )
+
+    def _stream(self, scenario, close_old_connections=None):
+        from unittest import mock
+        from asgiref.sync import async_to_sync
+        # async_to_sync 让 sync_to_async 回到测试线程，使用同一个数据库连接；
+        # TestCase 在事务中运行，真正的 close_old_connections 会关闭这个连接
+        with mock.patch('lottery.events.close_old_connections', close_old_connections or mock.Mock()):
+            return async_to_sync(scenario)()
+
+    def test_generate_winning_numbers_publishes_event(self):
+        """测试开奖时在同一事务中发布中奖号码事件"""
+        self.draw.generate_winning_numbers()
+
+        event = DrawEvent.objects.get(lottery_draw=self.draw)
+        self.assertEqual(event.kind, 'drawn')
+        self.assertEqual(event.payload['winning_numbers'], [int(n) for n in self.draw.winning_numbers.split(',')])
+
+    def test_event_rolls_back_with_draw(self):
+        """测试开奖事务回滚时事件一起回滚"""
+        from django.db import transaction
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.draw.generate_winning_numbers()
+                self.assertTrue(DrawEvent.objects.filter(lottery_draw=self.draw).exists())
+                raise RuntimeError('crash')
+
+        self.assertFalse(DrawEvent.objects.exists())
+        self.draw.refresh_from_db()
+        self.assertFalse(self.draw.is_drawn)
+
+    def test_broker_survives_poll_errors(self):
+        """测试轮询遇到断开的连接时记录日志、清理连接并在下次轮询恢复"""
+        import asyncio
+        from unittest import mock
+
+        from asgiref.sync import sync_to_async
+        from django.db import OperationalError
+
+        from . import events
+
+        real_new_events = events._new_events
+        close_old_connections = mock.Mock()
+        calls = []
+
+        def flaky_new_events(*args):
+            calls.append(close_old_connections.call_count)
+            if len(calls) == 1:
+                raise OperationalError('server closed the connection unexpectedly')
+            return real_new_events(*args)
+
+        broker = events.EventBroker(poll_interval=0.01)
+
+        async def scenario():
+            queue = broker.subscribe([self.draw.id])
+            await asyncio.sleep(0.05)
+            event = await sync_to_async(DrawEvent.objects.create)(
+                lottery_draw=self.draw, kind='settled', payload={'winning_tickets': 0},
+            )
+            row = await asyncio.wait_for(queue.get(), 5)
+            broker.unsubscribe([self.draw.id], queue)
+            await asyncio.wait_for(broker._task, 5)
+            return event, row
+
+        with mock.patch.object(events, '_new_events', side_effect=flaky_new_events), \
+                self.assertLogs('lottery.events', 'ERROR'):
+            event, row = self._stream(scenario, close_old_connections)
+
+        self.assertGreater(len(calls), 1)
+        self.assertEqual(row['id'], event.id)
+        # 每次查询前都清理过连接，失败的查询之后也会清理，下一次轮询用的是新连接
+        self.assertGreater(calls[0], 0)
+        self.assertGreater(calls[1], calls[0] + 1)
+
+    def test_broker_delivers_late_committed_events(self):
+        """测试 id 较小但较晚提交的事件仍会分发，且同一事件只分发一次"""
+        import asyncio
+
+        from .events import EventBroker
+
+        other = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type, draw_number='TEST-002', draw_date=timezone.now()
+        )
+        # 模拟另一期的事务先提交了更大的 id
+        late = DrawEvent.objects.create(lottery_draw=self.draw, kind='drawn', payload={})
+        newer = DrawEvent.objects.create(lottery_draw=other, kind='drawn', payload={})
+        broker = EventBroker(poll_interval=0.01)
+        broker.last_id = newer.id
+
+        async def scenario():
+            queue = broker.subscribe([self.draw.id])
+            await asyncio.sleep(0.05)
+            rows = []
+            while not queue.empty():
+                rows.append(queue.get_nowait())
+            broker.unsubscribe([self.draw.id], queue)
+            await asyncio.wait_for(broker._task, 5)
+            return rows
+
+        rows = self._stream(scenario)
+
+        self.assertEqual([row['id'] for row in rows], [late.id])
+
+    def test_stream_replays_and_pushes_until_settled(self):
+        """测试事件流先补发已有事件，再推送新事件，结算完成后关闭"""
+        import asyncio
+
+        from asgiref.sync import sync_to_async
+
+        from .events import EventBroker, stream_draw_events
+
+        drawn = DrawEvent.objects.create(lottery_draw=self.draw, kind='drawn', payload={'winning_numbers': [1, 2, 3]})
+        broker = EventBroker(poll_interval=0.01)
+        messages = []
+
+        async def receive():
+            await asyncio.sleep(60)
+
+        async def send(message):
+            messages.append(message)
+
+        async def scenario():
+            scope = {'type': 'http', 'path': '/api/v1/draws/events/', 'headers': []}
+            stream = asyncio.ensure_future(stream_draw_events(scope, receive, send, [self.draw.id], broker))
+            await asyncio.sleep(0.05)
+            self.assertEqual(list(broker.subscribers), [self.draw.id])
+            await sync_to_async(DrawEvent.objects.create)(
+                lottery_draw=self.draw, kind='settled', payload={'winning_tickets': 0},
+            )
+            await asyncio.wait_for(stream, 5)
+
+        self._stream(scenario)
+
+        self.assertEqual(messages[0]['status'], 200)
+        body = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+        self.assertTrue(body.startswith('retry: '))
+        self.assertIn(f'id: {drawn.id}\nevent: drawn\ndata: {{"winning_numbers":[1,2,3]}}\n\n', body)
+        self.assertIn('event: settled', body)
+        self.assertFalse(messages[-1].get('more_body', False))
+        self.assertEqual(broker.subscribers, {})
+
+    def test_stream_resumes_after_last_event_id(self):
+        """测试重连时只补发 Last-Event-ID 之后的事件，客户端断开后取消订阅"""
+        import asyncio
+
+        from .events import EventBroker, stream_draw_events
+
+        drawn = DrawEvent.objects.create(lottery_draw=self.draw, kind='drawn', payload={'winning_numbers': [1, 2, 3]})
+        broker = EventBroker(poll_interval=0.01)
+        messages = []
+
+        async def receive():
+            await asyncio.sleep(0.05)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        async def scenario():
+            scope = {'type': 'http', 'headers': [(b'last-event-id', str(drawn.id).encode())]}
+            await asyncio.wait_for(stream_draw_events(scope, receive, send, [self.draw.id], broker), 5)
+
+        self._stream(scenario)
+
+        body = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+        self.assertNotIn('event: drawn', body)
+        self.assertEqual(broker.subscribers, {})
+
+    def test_stream_multiplexes_draws_until_all_settled(self):
+        """测试一个事件流同时推送多期事件，所有期结算完成后才关闭"""
+        import asyncio
+
+        from asgiref.sync import sync_to_async
+
+        from .events import EventBroker, stream_draw_events
+
+        other = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type, draw_number='TEST-002', draw_date=timezone.now()
+        )
+        unrelated = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type, draw_number='TEST-003', draw_date=timezone.now()
+        )
+        DrawEvent.objects.create(lottery_draw=self.draw, kind='settled', payload={'draw_id': self.draw.id})
+        broker = EventBroker(poll_interval=0.01)
+        messages = []
+
+        async def receive():
+            await asyncio.sleep(60)
+
+        async def send(message):
+            messages.append(message)
+
+        async def scenario():
+            scope = {'type': 'http', 'headers': []}
+            stream = asyncio.ensure_future(
+                stream_draw_events(scope, receive, send, [self.draw.id, other.id, 999999], broker)
+            )
+            await asyncio.sleep(0.05)
+            # 已结算的期不再订阅，不存在的期被忽略
+            self.assertEqual(list(broker.subscribers), [other.id])
+            self.assertFalse(stream.done())
+            await sync_to_async(DrawEvent.objects.create)(
+                lottery_draw=unrelated, kind='settled', payload={'draw_id': unrelated.id},
+            )
+            await sync_to_async(DrawEvent.objects.create)(
+                lottery_draw=other, kind='settled', payload={'draw_id': other.id},
+            )
+            await asyncio.wait_for(stream, 5)
+
+        self._stream(scenario)
+
+        body = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+        self.assertIn(f'"draw_id":{self.draw.id}', body)
+        self.assertIn(f'"draw_id":{other.id}', body)
+        self.assertNotIn(f'"draw_id":{unrelated.id}', body)
+        self.assertFalse(messages[-1].get('more_body', False))
+        self.assertEqual(broker.subscribers, {})
+
+    def test_asgi_routing(self):
+        """测试事件流路径由 ASGI 包装直接处理，其他路径交给 Django"""
+        from .events import with_draw_events
+
+        handled = []
+
+        async def django_app(scope, receive, send):
+            handled.append(scope['path'])
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        app = with_draw_events(django_app)
+
+        async def scenario():
+            await app({'type': 'http', 'method': 'GET', 'path': '/api/v1/draws/latest/', 'headers': []}, receive, send)
+            await app({'type': 'http', 'method': 'GET', 'path': '/api/v1/draws/events/',
+                       'query_string': b'ids=999999', 'headers': []}, receive, send)
+            # 部署在子路径下时先去掉 root_path 再匹配
+            await app({'type': 'http', 'method': 'GET', 'root_path': '/lotto', 'path': '/lotto/api/v1/draws/events/',
+                       'query_string': b'ids=999999', 'headers': []}, receive, send)
+            await app({'type': 'http', 'method': 'GET', 'root_path': '/lotto',
+                       'path': '/lotto/api/v1/draws/latest/', 'headers': []}, receive, send)
+            await app({'type': 'http', 'method': 'GET', 'path': '/api/v1/draws/events/',
+                       'query_string': b'ids=1,x', 'headers': []}, receive, send)
+
+        self._stream(scenario)
+
+        self.assertEqual(handled, ['/api/v1/draws/latest/', '/lotto/api/v1/draws/latest/'])
+        self.assertEqual([message['status'] for message in messages if 'status' in message], [404, 404, 400])
+
+    def test_my_tickets_subscribes_until_settled(self):
+        """测试页面用一个事件流订阅所有未结算的期，已开奖未结算的仍订阅，结算后不再订阅"""
+        from .settlement import settle_draw
+
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        other = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type, draw_number='TEST-002', draw_date=timezone.now()
+        )
+        LotteryTicket.objects.create(user=user, lottery_draw=self.draw, selected_numbers='1,2,3')
+        LotteryTicket.objects.create(user=user, lottery_draw=other, selected_numbers='1,2,3')
+        LotteryTicket.objects.create(user=user, lottery_draw=other, selected_numbers='4,5,6')
+        url = reverse('api_v1:draw_events')
+
+        with self.settings(DRAW_EVENT_STREAM=True):
+            response = self.client.get(reverse('lottery:my_tickets'))
+            self.assertContains(response, f'data-draw-events="{url}?ids={self.draw.id},{other.id}"')
+            self.assertContains(response, 'new EventSource', count=1)
+            self.draw.generate_winning_numbers()
+            response = self.client.get(reverse('lottery:my_tickets'))
+            self.assertContains(response, f'data-draw-events="{url}?ids={self.draw.id},{other.id}"')
+            self.assertContains(response, '정산 중')
+
+            settle_draw(self.draw)
+            response = self.client.get(reverse('lottery:my_tickets'))
+            self.assertContains(response, f'data-draw-events="{url}?ids={other.id}"')
+            self.assertNotContains(response, f'data-draw-id="{self.draw.id}"')
+
+    def test_my_tickets_does_not_subscribe_without_stream(self):
+        """测试未部署 ASGI 事件流时页面不订阅（避免在 WSGI 下轮询）"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        LotteryTicket.objects.create(user=user, lottery_draw=self.draw, selected_numbers='1,2,3')
+
+        with self.settings(DRAW_EVENT_STREAM=False):
+            response = self.client.get(reverse('lottery:my_tickets'))
+        self.assertNotContains(response, 'data-draw-events')
+        self.assertNotContains(response, 'EventSource')
+
+    def test_wsgi_fallback(self):
+        """测试 WSGI 下的事件接口返回已有事件和重连间隔"""
+        drawn = DrawEvent.objects.create(lottery_draw=self.draw, kind='drawn', payload={'winning_numbers': [1, 2, 3]})
+        settled = DrawEvent.objects.create(lottery_draw=self.draw, kind='settled', payload={'winning_tickets': 0})
+        url = reverse('api_v1:draw_events')
+
+        response = self.client.get(url, {'ids': f'{self.draw.id},999999'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream; charset=utf-8')
+        self.assertIn(b'retry: ', response.content)
+        self.assertIn(f'id: {drawn.id}\n'.encode(), response.content)
+
+        response = self.client.get(url, {'ids': self.draw.id}, HTTP_LAST_EVENT_ID=str(drawn.id))
+        self.assertNotIn(f'id: {drawn.id}\n'.encode(), response.content)
+        self.assertIn(f'id: {settled.id}\n'.encode(), response.content)
+        self.assertEqual(self.client.get(url, {'ids': 999999}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'ids': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+class DailySalesRollupTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        UserProfile.objects.create(user=self.user, balance=100.00)
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票',
+            description='测试用彩票',
+            price=2.00,
+            max_number=10,
+            numbers_count=3
+        )
+        self.draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type,
+            draw_number='TEST-001',
+            draw_date=timezone.now() + timedelta(hours=1)
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def _rollup_values(self):
+        from .models import DailySalesRollup
+
+        return list(DailySalesRollup.objects.order_by('date', 'lottery_type')
+                    .values_list('date', 'lottery_type', 'tickets', 'revenue', 'winnings_paid'))
+
+    def test_purchase_and_claim_update_rollup(self):
+        """测试购买和兑奖增量更新汇总"""
+        from .rollups import rebuild_rollups
+
+        for _ in range(2):
+            self.client.post(reverse('lottery:purchase_lottery', args=[self.lottery_type.id]), {
+                'lottery_type': self.lottery_type.id,
+                'selected_numbers': '1,2,3',
+                'is_auto_select': False,
+            })
+        ticket = LotteryTicket.objects.filter(user=self.user).first()
+        LotteryTicket.objects.filter(pk=ticket.pk).update(is_winning=True, winning_amount=20)
+        self.client.get(reverse('lottery:claim_prize', args=[ticket.id]))
+
+        incremental = self._rollup_values()
+        self.assertEqual(incremental, [(timezone.localdate(), self.lottery_type.id, 2, 4, 20)])
+
+        # 重建结果与增量结果一致
+        rebuild_rollups()
+        self.assertEqual(self._rollup_values(), incremental)
+
+    def test_rebuild_window_keeps_other_days(self):
+        """测试按日期区间重建只影响该区间"""
+        from .models import DailySalesRollup
+        from .purchasing import purchase_ticket
+        from .rollups import rebuild_rollups
+
+        old_date = timezone.localdate() - timedelta(days=10)
+        DailySalesRollup.record(self.lottery_type.id, tickets=5, revenue=10, date=old_date)
+        purchase_ticket(self.user, self.draw, '1,2,3')
+        DailySalesRollup.objects.filter(date=timezone.localdate()).delete()
+
+        rebuild_rollups(start=timezone.localdate(), end=timezone.localdate())
+
+        self.assertEqual(self._rollup_values(), [
+            (old_date, self.lottery_type.id, 5, 10, 0),
+            (timezone.localdate(), self.lottery_type.id, 1, 2, 0),
+        ])
+
+    def test_rebuild_uses_paid_amounts_after_price_change(self):
+        """测试价格调整后重建汇总仍使用购买时支付的金额"""
+        from .purchasing import purchase_ticket
+        from .rollups import rebuild_rollups
+
+        purchase_ticket(self.user, self.draw, '1,2,3')
+        self.lottery_type.price = 5.00
+        self.lottery_type.save()
+        self.draw.lottery_type.refresh_from_db()
+        purchase_ticket(self.user, self.draw, '4,5,6')
+
+        incremental = self._rollup_values()
+        self.assertEqual(incremental, [(timezone.localdate(), self.lottery_type.id, 2, 7, 0)])
+        rebuild_rollups()
+        self.assertEqual(self._rollup_values(), incremental)
+
+
+class DashboardCounterTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        UserProfile.objects.create(user=self.user, balance=100.00)
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票',
+            description='测试用彩票',
+            price=2.00,
+            max_number=10,
+            numbers_count=3
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_counters_cached_and_incremented(self):
+        """测试计数器缓存及写入时增量更新"""
+        from . import counters
+
+        self.assertEqual(counters.get_counters()['total_users'], 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.get_counters()['total_tickets'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('lottery:purchase_lottery', args=[self.lottery_type.id]), {
+                'lottery_type': self.lottery_type.id,
+                'selected_numbers': '1,2,3',
+                'is_auto_select': False,
+            })
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('accounts:register'), {
+                'username': 'newuser',
+                'email': 'new@example.com',
+                'password1': 'testpass123',
+                'password2': 'testpass123',
+            })
+
+        with self.assertNumQueries(0):
+            values = counters.get_counters()
+        self.assertEqual(values['total_tickets'], 1)
+        self.assertEqual(values['total_sales'], 2)
+        self.assertEqual(values['total_users'], 2)
+        self.assertEqual(values, counters.compute_counters())
+
+
+class PurchaseConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        UserProfile.objects.create(user=self.user, balance=20.00)
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票',
+            description='测试用彩票',
+            price=2.00,
+            max_number=10,
+            numbers_count=3
+        )
+        self.draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type,
+            draw_number='TEST-001',
+            draw_date=timezone.now() + timedelta(hours=1)
+        )
+
+    def test_insufficient_balance(self):
+        """测试余额不足时不扣款也不出票"""
+        from .purchasing import InsufficientBalance, purchase_ticket
+
+        for _ in range(10):
+            purchase_ticket(self.user, self.draw, '1,2,3')
+        with self.assertRaises(InsufficientBalance):
+            purchase_ticket(self.user, self.draw, '1,2,3')
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.balance, 0)
+        self.assertEqual(profile.total_spent, 20)
+        self.assertEqual(LotteryTicket.objects.count(), 10)
+
+    def test_parallel_purchases_never_overspend(self):
+        """测试同一用户并发购买时余额、彩票与交易记录保持一致"""
+        import threading
+        from django.db import connections
+        from .purchasing import InsufficientBalance, purchase_ticket
+
+        require_file_database(self)
+        outcomes = []
+        start = threading.Barrier(20)
+
+        def buy():
+            try:
+                start.wait()
+                purchase_ticket(self.user, self.draw, '1,2,3')
+                outcomes.append('ok')
+            except InsufficientBalance:
+                outcomes.append('insufficient')
+            except Exception as e:
+                outcomes.append(repr(e))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buy) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 余额 20、单价 2：恰好 10 次购买成功，其余全部因余额不足失败
+        succeeded = outcomes.count('ok')
+        self.assertEqual(sorted(outcomes), ['insufficient'] * 10 + ['ok'] * 10)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(succeeded, 20 // 2)
+        self.assertGreaterEqual(profile.balance, 0)
+        self.assertEqual(profile.balance, 20 - 2 * succeeded)
+        self.assertEqual(profile.total_spent, 2 * succeeded)
+        self.assertEqual(LotteryTicket.objects.count(), succeeded)
+        self.assertEqual(Transaction.objects.filter(transaction_type='purchase').count(), succeeded)
+
+    def test_parallel_claims_pay_once(self):
+        """测试同一张中奖彩票并发兑奖只支付一次，并发购买的扣款不被覆盖"""
+        import threading
+        from django.db import connections
+        from .models import DailySalesRollup
+        from .purchasing import InsufficientBalance, claim_ticket, purchase_ticket
+
+        require_file_database(self)
+
+        ticket = LotteryTicket.objects.create(
+            user=self.user, lottery_draw=self.draw, selected_numbers='1,2,3',
+            match_count=3, is_winning=True, winning_amount=100,
+        )
+        outcomes = []
+        start = threading.Barrier(10)
+
+        def claim():
+            try:
+                start.wait()
+                outcomes.append('claimed' if claim_ticket(self.user, ticket) else 'already')
+            except Exception as e:
+                outcomes.append(repr(e))
+            finally:
+                connections.close_all()
+
+        def buy():
+            try:
+                start.wait()
+                purchase_ticket(self.user, self.draw, '4,5,6')
+                outcomes.append('bought')
+            except InsufficientBalance:
+                outcomes.append('insufficient')
+            except Exception as e:
+                outcomes.append(repr(e))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=claim) for _ in range(8)] + [threading.Thread(target=buy) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count('claimed'), 1)
+        self.assertEqual(outcomes.count('already'), 7)
+        bought = outcomes.count('bought')
+        self.assertEqual(bought + outcomes.count('insufficient'), 2)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.total_won, 100)
+        self.assertEqual(profile.balance, 20 + 100 - 2 * bought)
+        self.assertEqual(Transaction.objects.filter(transaction_type='winning').count(), 1)
+        self.assertEqual(sum(DailySalesRollup.objects.values_list('winnings_paid', flat=True)), 100)
+
+    def _interleave(self, first, second, pause_target):
+        """first 在 pause_target 处暂停时启动 second，返回两者的结果或异常"""
+        import threading
+        import time
+        from unittest import mock
+        from django.db import connections
+
+        require_file_database(self)
+        paused = threading.Event()
+        results = {}
+        original = pause_target[1]
+
+        def slow(*args, **kwargs):
+            if threading.current_thread().name == 'first':
+                paused.set()
+                time.sleep(0.3)
+            return original(*args, **kwargs)
+
+        def run(name, target):
+            try:
+                results[name] = target()
+            except Exception as e:
+                results[name] = e
+            finally:
+                connections.close_all()
+
+        with mock.patch(pause_target[0], slow):
+            first_thread = threading.Thread(target=run, args=('first', first), name='first')
+            first_thread.start()
+            self.assertTrue(paused.wait(5))
+            second_thread = threading.Thread(target=run, args=('second', second), name='second')
+            second_thread.start()
+            first_thread.join()
+            second_thread.join()
+        return results['first'], results['second']
+
+    def test_purchase_committed_before_draw_is_settled(self):
+        """测试开奖在进行中的购买提交后才关闭期次，该彩票参与结算"""
+        from . import purchasing
+        from .settlement import settle_draw
+
+        ticket, _ = self._interleave(
+            lambda: purchasing.purchase_ticket(self.user, self.draw, '1,2,3'),
+            lambda: self.draw.generate_winning_numbers(),
+            ('lottery.purchasing.encode_numbers', purchasing.encode_numbers),
+        )
+
+        self.assertIsInstance(ticket, LotteryTicket)
+        draw = LotteryDraw.objects.get(pk=self.draw.pk)
+        self.assertTrue(draw.is_drawn)
+        settle_draw(draw)
+        self.assertIsNotNone(LotteryTicket.objects.get(ticket_number=ticket.ticket_number).match_count)
+
+    def test_purchase_during_draw_is_rejected(self):
+        """测试开奖进行中发起的购买被拒绝并回滚扣款"""
+        from . import events
+        from .purchasing import DrawClosed, purchase_ticket
+
+        draw_copy = LotteryDraw.objects.select_related('lottery_type').get(pk=self.draw.pk)
+        _, outcome = self._interleave(
+            lambda: draw_copy.generate_winning_numbers(),
+            lambda: purchase_ticket(self.user, self.draw, '1,2,3'),
+            ('lottery.events.publish_drawn', events.publish_drawn),
+        )
+
+        self.assertIsInstance(outcome, DrawClosed)
+        self.assertFalse(LotteryTicket.objects.exists())
+        self.assertEqual(UserProfile.objects.get(user=self.user).balance, 20)
+
+
+class BulkPurchaseTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        UserProfile.objects.create(user=self.user, balance=100.00)
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票',
+            description='测试用彩票',
+            price=2.00,
+            max_number=10,
+            numbers_count=3
+        )
+        self.draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type,
+            draw_number='TEST-001',
+            draw_date=timezone.now() + timedelta(hours=1)
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.url = reverse('lottery:bulk_purchase_lottery', args=[self.lottery_type.id])
+
+    def test_bulk_auto_purchase(self):
+        """测试批量机选购买"""
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        response = self.client.post(self.url, {'is_auto_select': True, 'quantity': 30})
+
+        self.assertRedirects(response, reverse('lottery:my_tickets'))
+        tickets = LotteryTicket.objects.filter(user=self.user)
+        self.assertEqual(tickets.count(), 30)
+        self.assertFalse(tickets.filter(selected_mask__isnull=True).exists())
+        self.assertEqual(len(set(tickets.values_list('ticket_number', flat=True))), 30)
+        self.assertEqual(UserProfile.objects.get(user=self.user).balance, 40)
+        transactions = Transaction.objects.filter(user=self.user, transaction_type='purchase')
+        self.assertEqual(transactions.count(), 1)
+        self.assertEqual(transactions.get().amount, 60)
+
+    def test_bulk_manual_purchase(self):
+        """测试批量手动选号购买"""
+        response = self.client.post(self.url, {'quantity': 1, 'selected_numbers': '3,2,1\n4,5,6\n'})
+
+        self.assertRedirects(response, reverse('lottery:my_tickets'))
+        self.assertEqual(sorted(LotteryTicket.objects.values_list('selected_numbers', flat=True)), ['1,2,3', '4,5,6'])
+
+    def test_bulk_purchase_invalid_line(self):
+        """测试手动选号有误时不购买"""
+        response = self.client.post(self.url, {'quantity': 1, 'selected_numbers': '1,2,3\n1,2,11'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(LotteryTicket.objects.exists())
+
+    def test_bulk_purchase_insufficient_balance(self):
+        """测试余额不足时整体不购买"""
+        response = self.client.post(self.url, {'is_auto_select': True, 'quantity': 51})
+
+        self.assertRedirects(response, reverse('accounts:recharge'))
+        self.assertFalse(LotteryTicket.objects.exists())
+        self.assertEqual(UserProfile.objects.get(user=self.user).balance, 100)
+
+
+class TicketNumberTests(TestCase):
+    def setUp(self):
+        from .ticket_numbers import reset_allocator
+
+        # 之前的测试回滚了数据库，丢弃已预留的区间
+        reset_allocator()
+
+    def test_numbers_unique_and_sorted(self):
+        """测试号码唯一且按发放顺序排序"""
+        from .ticket_numbers import TicketNumberAllocator
+
+        allocator = TicketNumberAllocator(block_size=10)
+        numbers = []
+        for count in (1, 7, 25, 3):
+            numbers.extend(allocator.allocate_numbers(count))
+        self.assertEqual(len(set(numbers)), 36)
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertTrue(all(number.startswith('T') and len(number) == 21 for number in numbers))
+
+    def test_allocators_reserve_disjoint_blocks(self):
+        """测试多个发放器（模拟多进程）交替发放不重复"""
+        from .ticket_numbers import TicketNumberAllocator
+
+        allocators = [TicketNumberAllocator(block_size=5) for _ in range(3)]
+        numbers = []
+        for _ in range(10):
+            for allocator in allocators:
+                numbers.extend(allocator.allocate(4))
+        self.assertEqual(len(set(numbers)), 120)
+
+    def test_rolled_back_block_discarded(self):
+        """测试事务回滚后不再使用其中预留的号码区间"""
+        from django.db import transaction
+        from .ticket_numbers import TicketNumberAllocator, reserve_block
+
+        allocator = TicketNumberAllocator(block_size=100)
+        try:
+            with transaction.atomic():
+                first = allocator.allocate(1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        # 回滚后其他进程会重新预留同一区间
+        start, end = reserve_block(100)
+        self.assertEqual(start, first[0])
+        self.assertNotIn(allocator.allocate(1)[0], range(start, end))
+
+    def test_allocate_in_transaction_keeps_no_block(self):
+        """测试事务内只预留本次需要的号码，不保留剩余区间"""
+        from django.db import transaction
+        from .ticket_numbers import TicketNumberAllocator, reserve_block
+
+        allocator = TicketNumberAllocator(block_size=100)
+        with transaction.atomic():
+            numbers = allocator.allocate(3)
+
+        start, _ = reserve_block(1)
+        self.assertEqual(start, numbers[-1] + 1)
+        self.assertEqual(allocator.next_value, allocator.end_value)
+
+    def test_bulk_create_uses_generated_numbers(self):
+        """测试批量创建的彩票号码不重复"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3
+        )
+        draw = LotteryDraw.objects.create(
+            lottery_type=lottery_type, draw_number='TEST-001', draw_date=timezone.now()
+        )
+        LotteryTicket.objects.create(user=user, lottery_draw=draw, selected_numbers='1,2,3')
+        LotteryTicket.objects.bulk_create([
+            LotteryTicket(user=user, lottery_draw=draw, ticket_number=number, selected_numbers='4,5,6')
+            for number in LotteryTicket.generate_ticket_numbers(2000)
+        ])
+        self.assertEqual(LotteryTicket.objects.values('ticket_number').distinct().count(), 2001)
+
+
+class OpenDrawTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        UserProfile.objects.create(user=self.user, balance=100.00)
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.url = reverse('lottery:purchase_lottery', args=[self.lottery_type.id])
+
+    def test_open_draw_cached(self):
+        """测试当前期次查询走缓存"""
+        self.client.get(self.url)
+        self.assertEqual(LotteryDraw.objects.filter(lottery_type=self.lottery_type).count(), 1)
+
+        with self.assertNumQueries(0):
+            from .draws import get_open_draw
+            draw = get_open_draw(self.lottery_type)
+        self.assertFalse(draw.is_drawn)
+
+    def test_auto_create_skips_existing_draw_number(self):
+        """测试当天已有期次号时自动创建使用下一个期次号"""
+        today = timezone.localdate().strftime('%Y%m%d')
+        LotteryDraw.objects.create(
+            lottery_type=self.lottery_type, draw_number=f'{today}-001', draw_date=timezone.now(), is_drawn=True
+        )
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(LotteryDraw.objects.filter(draw_number=f'{today}-002', is_drawn=False).exists())
+
+    def test_ensure_open_draw_is_idempotent(self):
+        """测试重复调用不会创建多个期次"""
+        from .draws import ensure_open_draw
+
+        first = ensure_open_draw(self.lottery_type)
+        second = ensure_open_draw(self.lottery_type)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(LotteryDraw.objects.count(), 1)
+
+    def test_create_draw_retries_on_conflict(self):
+        """测试期次号冲突时使用下一个期次号"""
+        from unittest import mock
+        from . import draws
+
+        today = timezone.localdate().strftime('%Y%m%d')
+        LotteryDraw.objects.create(lottery_type=self.lottery_type, draw_number=f'{today}-001', draw_date=timezone.now())
+        # 模拟并发：第一次计算出的期次号已被其他请求占用
+        with mock.patch.object(draws, 'next_draw_number', side_effect=[f'{today}-001', f'{today}-002']):
+            draw = draws.create_draw(self.lottery_type)
+        self.assertEqual(draw.draw_number, f'{today}-002')
+
+    def test_drawn_draw_invalidates_cache(self):
+        """测试开奖后不再向已开奖期次售票"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(self.url)
+        draw = LotteryDraw.objects.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            draw.generate_winning_numbers()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'lottery_type': self.lottery_type.id, 'selected_numbers': '1,2,3'})
+
+        ticket = LotteryTicket.objects.get()
+        self.assertNotEqual(ticket.lottery_draw_id, draw.pk)
+        self.assertFalse(ticket.lottery_draw.is_drawn)
+
+    def test_stale_cache_rejected_at_purchase(self):
+        """测试缓存中的期次已开奖时拒绝购买"""
+        self.client.get(self.url)
+        draw = LotteryDraw.objects.get()
+        # 绕过 save()，模拟缓存尚未失效
+        LotteryDraw.objects.filter(pk=draw.pk).update(is_drawn=True, winning_numbers='1,2,3')
+
+        response = self.client.post(self.url, {'lottery_type': self.lottery_type.id, 'selected_numbers': '1,2,3'})
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertFalse(LotteryTicket.objects.exists())
+
+
+class SeedLoadTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        from .ticket_numbers import reset_allocator
+
+        reset_allocator()
+        LotteryType.objects.create(name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3)
+        LotteryType.objects.create(name='其他彩票', description='测试用彩票', price=5.00, max_number=35, numbers_count=5)
+
+    def test_seed_load_generates_volumes(self):
+        """测试批量生成用户、期次、彩票和汇总"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import DailySalesRollup, PrizeTier
+
+        # 命中 1 个号码即中奖，保证已开奖期次一定有中奖彩票
+        PrizeTier.objects.create(lottery_type=LotteryType.objects.get(name='测试彩票'), match_count=1, multiplier=1)
+        call_command('seed_load', users=20, draws=4, tickets_per_draw=50, batch_size=30, stdout=StringIO())
+
+        self.assertEqual(User.objects.filter(username__startswith='load_').count(), 20)
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='load_').count(), 20)
+        draws = LotteryDraw.objects.filter(draw_number__startswith='LOAD-')
+        self.assertEqual(draws.count(), 4)
+        # 每种彩票类型的最后一期保持待开奖
+        self.assertEqual(draws.filter(is_drawn=False).count(), 2)
+        self.assertFalse(draws.filter(is_drawn=True, winning_mask__isnull=True).exists())
+
+        tickets = LotteryTicket.objects.all()
+        self.assertEqual(tickets.count(), 200)
+        self.assertEqual(tickets.values('ticket_number').distinct().count(), 200)
+        self.assertFalse(tickets.filter(selected_mask__isnull=True).exists())
+        self.assertEqual(
+            tickets.filter(lottery_draw__is_drawn=True, is_winning=True).count(),
+            tickets.filter(is_claimed=True).count(),
+        )
+        self.assertEqual(sum(DailySalesRollup.objects.values_list('tickets', flat=True)), 200)
+        purchases = Transaction.objects.filter(transaction_type='purchase')
+        self.assertEqual(purchases.count(), purchases.values('user', 'description').distinct().count())
+
+        # 购买金额从余额扣除并计入累计消费
+        total_spent = sum(purchases.values_list('amount', flat=True))
+        self.assertEqual(total_spent, sum(tickets.values_list('lottery_draw__lottery_type__price', flat=True)))
+
+        # 已兑奖的中奖彩票都有对应的中奖交易记录，并计入用户余额和累计奖金
+        claimed = tickets.filter(is_claimed=True)
+        self.assertTrue(claimed.exists())
+        winnings = Transaction.objects.filter(transaction_type='winning')
+        self.assertEqual(winnings.count(), claimed.count())
+        total_won = sum(claimed.values_list('winning_amount', flat=True))
+        self.assertEqual(sum(winnings.values_list('amount', flat=True)), total_won)
+        profiles = UserProfile.objects.filter(user__username__startswith='load_')
+        self.assertEqual(sum(profiles.values_list('total_won', flat=True)), total_won)
+        self.assertEqual(sum(profiles.values_list('total_spent', flat=True)), total_spent)
+        self.assertEqual(sum(profiles.values_list('balance', flat=True)), 20 * 1000 - total_spent + total_won)
+        for profile in profiles:
+            spent = sum(purchases.filter(user_id=profile.user_id).values_list('amount', flat=True))
+            self.assertEqual(profile.total_spent, spent)
+
+    def test_seed_is_deterministic(self):
+        """测试相同种子生成相同的选号"""
+        from .seeding import seed_load
+
+        lottery_types = list(LotteryType.objects.order_by('id'))
+        seed_load(5, 2, 30, lottery_types, seed=7, prefix='first')
+        seed_load(5, 2, 30, lottery_types, seed=7, prefix='second')
+
+        def selections(prefix):
+            return list(LotteryTicket.objects.filter(user__username__startswith=f'{prefix}_')
+                        .order_by('id').values_list('selected_numbers', flat=True))
+
+        self.assertEqual(selections('first'), selections('second'))
+        self.assertTrue(all(len(numbers.split(',')) in (3, 5) for numbers in selections('first')))
@@ -0,0 +1,98 @@
+"""복권 번호 발급기
+
+DB 의 시퀀스 행에서 번호 구간(블록)을 원자적으로 예약하고, 예약한 구간은
+메모리에서 차례로 나눠 준다. 구간이 겹치지 않으므로 여러 프로세스가 동시에
+발급해도 번호가 중복되지 않으며, DB 왕복은 구간을 다 쓸 때 한 번뿐이다.
+번호는 "T" + 발급 날짜 + 12자리 일련번호 형식이라 문자열 순서로 정렬된다.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TicketSequence
+
+
+SEQUENCE_NAME = 'ticket_number'
+DEFAULT_BLOCK_SIZE = 1000
+
+
+def format_ticket_number(value, date=None):
+    """일련번호를 복권 번호 문자열로 변환"""
+    date = date or timezone.localdate()
+    return f"T{date:%Y%m%d}{value:012d}"
+
+
+def reserve_block(size, name=SEQUENCE_NAME, using=DEFAULT_DB_ALIAS):
+    """시퀀스에서 size 개의 번호 구간을 예약하여 (시작, 끝) 을 반환 (끝은 미포함)"""
+    sequences = TicketSequence.objects.using(using).filter(name=name)
+    with transaction.atomic(using=using):
+        if not sequences.update(next_value=F('next_value') + size):
+            try:
+                with transaction.atomic(using=using):
+                    TicketSequence.objects.using(using).create(name=name, next_value=1 + size)
+            except IntegrityError:
+                # 동시에 다른 프로세스가 시퀀스 행을 만든 경우
+                sequences.update(next_value=F('next_value') + size)
+        end = sequences.values_list('next_value', flat=True).get()
+    return end - size, end
+
+
+class TicketNumberAllocator:
+    """예약한 번호 구간을 나눠 주는 발급기 (스레드마다 하나씩 사용)
+
+    구간을 바깥 트랜잭션 안에서 예약하면 그 트랜잭션이 롤백될 때 예약도
+    취소되므로, 트랜잭션 안에서는 이번에 필요한 만큼만 예약하고 남은 구간을
+    보관하지 않는다. 보관하는 구간은 항상 트랜잭션 밖에서 커밋된 것이다.
+    """
+
+    def __init__(self, block_size=DEFAULT_BLOCK_SIZE, name=SEQUENCE_NAME, using=DEFAULT_DB_ALIAS):
+        self.block_size = block_size
+        self.name = name
+        self.using = using
+        self.next_value = 0
+        self.end_value = 0
+
+    def allocate(self, count):
+        """서로 다른 일련번호 count 개"""
+        values = []
+        while len(values) < count:
+            if self.next_value >= self.end_value:
+                if connections[self.using].in_atomic_block:
+                    start, end = reserve_block(count - len(values), self.name, self.using)
+                    values.extend(range(start, end))
+                    break
+                self.next_value, self.end_value = reserve_block(
+                    max(self.block_size, count - len(values)), self.name, self.using,
+                )
+            take = min(count - len(values), self.end_value - self.next_value)
+            values.extend(range(self.next_value, self.next_value + take))
+            self.next_value += take
+        return values
+
+    def allocate_numbers(self, count):
+        """서로 다른 복권 번호 count 개"""
+        prefix = format_ticket_number(0)[:-12]
+        return [f"{prefix}{value:012d}" for value in self.allocate(count)]
+
+
+_local = threading.local()
+
+
+def get_allocator():
+    """현재 스레드의 발급기"""
+    allocator = getattr(_local, 'allocator', None)
+    if allocator is None:
+        allocator = _local.allocator = TicketNumberAllocator()
+    return allocator
+
+
+def reset_allocator():
+    """현재 스레드의 발급기가 예약해 둔 구간 버리기 (테스트에서 DB 를 되돌린 뒤 사용)"""
+    _local.allocator = None
+
+
+def allocate_ticket_numbers(count):
+    """서로 다른 복권 번호 count 개 발급"""
+    return get_allocator().allocate_numbers(count)
@@ -1,25 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
-from django.utils import timezone
-from django.core.paginator import Paginator
-from .models import LotteryType, LotteryDraw, LotteryTicket, UserProfile, Transaction
-from .forms import LotteryPurchaseForm
-
-
+from django.conf import settings
+from django.urls import reverse
+from .models import LotteryType, LotteryDraw, LotteryTicket, UserProfile
+from .forms import LotteryPurchaseForm, BulkPurchaseForm
+from .purchasing import DrawClosed, InsufficientBalance, PurchaseBusy, claim_ticket, purchase_ticket, purchase_tickets
+from .api import invalidate_winnings_status
+from .draws import get_open_draw, invalidate_open_draw
+from .page_cache import cache_public_page, page_context
+from .pagination import CursorPaginator
+
+
+@cache_public_page
 def home(request):
     """홈페이지"""
     lottery_types = LotteryType.objects.filter(is_active=True)
-    recent_draws = LotteryDraw.objects.filter(is_drawn=True).order_by('-draw_date')[:5]
+    # 최신 추첨 목록은 템플릿 조각 캐시에 없을 때만 조회된다
+    recent_draws = LotteryDraw.objects.filter(is_drawn=True).select_related('lottery_type').order_by('-draw_date')[:5]
     
     context = {
         'lottery_types': lottery_types,
         'recent_draws': recent_draws,
+        **page_context(),
     }
     return render(request, 'lottery/home.html', context)
 
 
+@cache_public_page
 def lottery_list(request):
     """복권 목록"""
     lottery_types = LotteryType.objects.filter(is_active=True)
@@ -37,50 +45,30 @@ def purchase_lottery(request, lottery_type_id):
     except UserProfile.DoesNotExist:
         user_profile = UserProfile.objects.create(user=request.user)
     
-    # 현재 회차 가져오기
-    current_draw = LotteryDraw.objects.filter(
-        lottery_type=lottery_type,
-        is_drawn=False
-    ).first()
-    
-    if not current_draw:
-        # 새로운 회차 생성
-        draw_number = f"{timezone.now().strftime('%Y%m%d')}-001"
-        current_draw = LotteryDraw.objects.create(
-            lottery_type=lottery_type,
-            draw_number=draw_number,
-            draw_date=timezone.now() + timezone.timedelta(hours=1)
-        )
+    # 현재 회차 가져오기 (캐시 사용, 없으면 새로운 회차 생성)
+    current_draw = get_open_draw(lottery_type, create=True)
     
     if request.method == 'POST':
         form = LotteryPurchaseForm(request.POST)
         if form.is_valid():
-            # 잔액 확인
-            if user_profile.balance < lottery_type.price:
+            # 잔액 확인과 차감은 조건부 UPDATE 로 한 번에 처리
+            try:
+                ticket = purchase_ticket(
+                    request.user,
+                    current_draw,
+                    form.cleaned_data['selected_numbers'],
+                    form.cleaned_data['is_auto_select'],
+                )
+            except InsufficientBalance:
                 messages.error(request, '잔액이 부족합니다. 먼저 충전해주세요!')
                 return redirect('accounts:recharge')
-            
-            with transaction.atomic():
-                # 복권 생성
-                ticket = LotteryTicket.objects.create(
-                    user=request.user,
-                    lottery_draw=current_draw,
-                    selected_numbers=form.cleaned_data['selected_numbers'],
-                    is_auto_select=form.cleaned_data['is_auto_select']
-                )
-                
-                # 잔액 차감
-                user_profile.balance -= lottery_type.price
-                user_profile.total_spent += lottery_type.price
-                user_profile.save()
-                
-                # 거래 기록 생성
-                Transaction.objects.create(
-                    user=request.user,
-                    transaction_type='purchase',
-                    amount=lottery_type.price,
-                    description=f'{lottery_type.name} 복권 구매 - {ticket.ticket_number}'
-                )
+            except DrawClosed:
+                invalidate_open_draw(lottery_type.id)
+                messages.error(request, '해당 회차의 판매가 종료되었습니다. 다시 시도해주세요.')
+                return redirect('lottery:purchase_lottery', lottery_type_id=lottery_type.id)
+            except PurchaseBusy:
+                messages.error(request, '구매 요청이 많아 처리하지 못했습니다. 잠시 후 다시 시도해주세요.')
+                return redirect('lottery:purchase_lottery', lottery_type_id=lottery_type.id)
             
             messages.success(request, f'구매 성공! 복권 번호: {ticket.ticket_number}')
             return redirect('lottery:my_tickets')
@@ -96,29 +84,89 @@ def purchase_lottery(request, lottery_type_id):
     return render(request, 'lottery/purchase.html', context)
 
 
+@login_required
+def bulk_purchase_lottery(request, lottery_type_id):
+    """복권 대량 구매"""
+    lottery_type = get_object_or_404(LotteryType, id=lottery_type_id, is_active=True)
+    
+    try:
+        user_profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        user_profile = UserProfile.objects.create(user=request.user)
+    
+    current_draw = get_open_draw(lottery_type)
+    if not current_draw:
+        messages.error(request, '구매 가능한 회차가 없습니다.')
+        return redirect('lottery:purchase_lottery', lottery_type_id=lottery_type.id)
+    
+    if request.method == 'POST':
+        form = BulkPurchaseForm(lottery_type, request.POST)
+        if form.is_valid():
+            selections = form.cleaned_data['selections']
+            try:
+                tickets = purchase_tickets(
+                    request.user,
+                    current_draw,
+                    selections,
+                    form.cleaned_data['is_auto_select'],
+                )
+            except InsufficientBalance:
+                messages.error(request, f'잔액이 부족합니다. {len(selections)}장 구매에는 ₩{lottery_type.price * len(selections)}이 필요합니다.')
+                return redirect('accounts:recharge')
+            except DrawClosed:
+                invalidate_open_draw(lottery_type.id)
+                messages.error(request, '해당 회차의 판매가 종료되었습니다. 다시 시도해주세요.')
+                return redirect('lottery:bulk_purchase_lottery', lottery_type_id=lottery_type.id)
+            except PurchaseBusy:
+                messages.error(request, '구매 요청이 많아 처리하지 못했습니다. 잠시 후 다시 시도해주세요.')
+                return redirect('lottery:bulk_purchase_lottery', lottery_type_id=lottery_type.id)
+            
+            messages.success(request, f'구매 성공! 복권 {len(tickets)}장을 구매했습니다.')
+            return redirect('lottery:my_tickets')
+    else:
+        form = BulkPurchaseForm(lottery_type)
+    
+    context = {
+        'form': form,
+        'lottery_type': lottery_type,
+        'current_draw': current_draw,
+        'user_profile': user_profile,
+        'max_tickets': BulkPurchaseForm.MAX_TICKETS,
+    }
+    return render(request, 'lottery/bulk_purchase.html', context)
+
+
 @login_required
 def my_tickets(request):
     """내 복권"""
-    tickets_list = LotteryTicket.objects.filter(user=request.user).order_by('-purchase_time')
+    tickets_list = LotteryTicket.objects.filter(user=request.user).select_related(
+        'lottery_draw__lottery_type'
+    )
     
-    paginator = Paginator(tickets_list, 10)
-    page_number = request.GET.get('page')
-    tickets = paginator.get_page(page_number)
+    paginator = CursorPaginator(tickets_list, ('-purchase_time', '-id'), 10)
+    tickets = paginator.get_page(request.GET)
+
+    # 정산 결과가 없는 회차(추첨 대기·정산 중)를 페이지당 하나의 스트림으로 구독
+    draw_events_url = None
+    pending_draw_ids = sorted({ticket.lottery_draw_id for ticket in tickets if ticket.match_count is None})
+    if settings.DRAW_EVENT_STREAM and pending_draw_ids:
+        draw_events_url = reverse('api_v1:draw_events') + '?ids=' + ','.join(map(str, pending_draw_ids))
     
-    return render(request, 'lottery/my_tickets.html', {'tickets': tickets})
+    return render(request, 'lottery/my_tickets.html', {'tickets': tickets, 'draw_events_url': draw_events_url})
 
 
+@cache_public_page
 def draw_results(request):
     """추첨 결과"""
-    draws_list = LotteryDraw.objects.filter(is_drawn=True).order_by('-draw_date')
+    draws_list = LotteryDraw.objects.filter(is_drawn=True).select_related('lottery_type')
     
-    paginator = Paginator(draws_list, 10)
-    page_number = request.GET.get('page')
-    draws = paginator.get_page(page_number)
+    paginator = CursorPaginator(draws_list, ('-draw_date', '-id'), 10)
+    draws = paginator.get_page(request.GET)
     
     return render(request, 'lottery/draw_results.html', {'draws': draws})
 
 
+@cache_public_page
 def lottery_detail(request, lottery_type_id):
     """복권 상세"""
     lottery_type = get_object_or_404(LotteryType, id=lottery_type_id)
@@ -130,6 +178,8 @@ def lottery_detail(request, lottery_type_id):
     context = {
         'lottery_type': lottery_type,
         'recent_draws': recent_draws,
+        'payout_table': lottery_type.get_payout_table(),
+        **page_context(),
     }
     return render(request, 'lottery/lottery_detail.html', context)
 
@@ -137,21 +187,30 @@ def lottery_detail(request, lottery_type_id):
 @login_required
 def check_winnings(request):
     """당첨 확인"""
-    # 사용자의 아직 확인하지 않은 복권을 확인
-    tickets = LotteryTicket.objects.filter(
+    # 정산이 끝나지 않은 회차의 복권만 여기서 채점 (정산이 끝나면 대상이 없다)
+    unscored = LotteryTicket.objects.filter(
         user=request.user,
         lottery_draw__is_drawn=True,
-        is_winning=False
-    )
-    
-    winning_tickets = []
-    total_winnings = 0
-    
-    for ticket in tickets:
-        ticket.check_winning()
-        if ticket.is_winning:
-            winning_tickets.append(ticket)
-            total_winnings += ticket.winning_amount
+        match_count__isnull=True
+    ).select_related('lottery_draw__lottery_type')
+    
+    payout_tables = {}
+    for ticket in unscored:
+        lottery_type = ticket.lottery_draw.lottery_type
+        if lottery_type.id not in payout_tables:
+            payout_tables[lottery_type.id] = lottery_type.get_payout_table()
+        ticket.check_winning(payout_tables[lottery_type.id])
+    
+    # 정산 결과 중 아직 알리지 않은 당첨 복권만 읽고 확인 처리
+    winning_tickets = list(LotteryTicket.objects.filter(
+        user=request.user,
+        is_winning=True,
+        is_checked=False
+    ).select_related('lottery_draw__lottery_type').order_by('id'))
+    total_winnings = sum(ticket.winning_amount for ticket in winning_tickets)
+    if winning_tickets:
+        LotteryTicket.objects.filter(id__in=[ticket.id for ticket in winning_tickets]).update(is_checked=True)
+        invalidate_winnings_status(request.user.pk)
     
     if winning_tickets:
         messages.success(request, f'축하합니다! {len(winning_tickets)}장의 복권이 당첨되었고, 총 상금은 {total_winnings}원입니다!')
@@ -167,34 +226,19 @@ def check_winnings(request):
 @login_required
 def claim_prize(request, ticket_id):
     """상금 수령"""
-    ticket = get_object_or_404(LotteryTicket, id=ticket_id, user=request.user, is_winning=True)
-    
-    if ticket.is_claimed:
-        messages.warning(request, '이 복권은 이미 상금이 수령되었습니다!')
-        return redirect('lottery:my_tickets')
+    ticket = get_object_or_404(LotteryTicket.objects.select_related('lottery_draw'),
+                               id=ticket_id, user=request.user, is_winning=True)
     
     try:
-        user_profile = request.user.userprofile
-    except UserProfile.DoesNotExist:
-        user_profile = UserProfile.objects.create(user=request.user)
+        claimed = claim_ticket(request.user, ticket)
+    except PurchaseBusy:
+        messages.error(request, '요청이 많아 처리하지 못했습니다. 잠시 후 다시 시도해주세요.')
+        return redirect('lottery:my_tickets')
     
-    with transaction.atomic():
-        # 사용자 잔액 업데이트
-        user_profile.balance += ticket.winning_amount
-        user_profile.total_won += ticket.winning_amount
-        user_profile.save()
-        
-        # 상금 수령 처리
-        ticket.is_claimed = True
-        ticket.save()
-        
-        # 거래 기록 생성
-        Transaction.objects.create(
-            user=request.user,
-            transaction_type='winning',
-            amount=ticket.winning_amount,
-            description=f'상금 수령 {ticket.ticket_number} - {ticket.winning_amount}원'
-        )
+    if not claimed:
+        messages.warning(request, '이 복권은 이미 상금이 수령되었습니다!')
+        return redirect('lottery:my_tickets')
     
+    invalidate_winnings_status(request.user.pk)
     messages.success(request, f'상금 수령이 완료되었습니다! 당첨금 {ticket.winning_amount}원이 지급되었습니다.')
     return redirect('lottery:my_tickets')
\ No newline at end of file
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lottery_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# 추첨 이벤트 스트림(SSE)은 Django 앞에서 직접 처리한다 (설정 로드 후 import)
+from lottery.events import with_draw_events  # noqa: E402
+
+application = with_draw_events(django_application)
@@ -47,7 +47,13 @@ INSTALLED_APPS = [
     'management',
 ]
 
+# 성능 기준 측정 앱 (manage.py bench) 은 개발 환경에서만 설치한다
+BENCH_ENABLED = config('BENCH_ENABLED', default=DEBUG, cast=bool)
+if BENCH_ENABLED:
+    INSTALLED_APPS.append('bench')
+
 MIDDLEWARE = [
+    'management.instrumentation.query_instrumentation_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,6 +95,48 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+# 여러 프로세스로 운영할 때는 공유 캐시(파일, memcached 등)를 지정해야 카운터가 일치합니다
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='lottery'),
+    }
+}
+
+# 관리자 대시보드 카운터 캐시 유효 시간(초)
+DASHBOARD_COUNTERS_TTL = 300
+
+# 복권 유형별 판매 중인 회차 캐시 유효 시간(초)
+OPEN_DRAW_CACHE_TTL = 60
+
+# 비로그인 방문자용 공개 페이지·템플릿 조각 캐시 유효 시간(초)
+PUBLIC_PAGE_CACHE_TTL = 300
+# 데이터베이스의 공개 콘텐츠 버전을 캐시에 두는 시간(초), 다른 프로세스의 변경은 이 시간 안에 반영된다
+# (PUBLIC_PAGE_CACHE_TTL 보다 길게 잡아도 그 값으로 제한된다)
+PUBLIC_PAGE_VERSION_TTL = 5
+
+# 당첨 현황 API 의 사용자별 캐시 유효 시간(초), 추첨 직후 폴링을 흡수한다
+WINNINGS_STATUS_CACHE_TTL = 5
+
+# 추첨 이벤트 스트림(SSE): 프로세스별 새 이벤트 조회 간격과 연결 유지 주석 간격(초)
+DRAW_EVENT_POLL_INTERVAL = 1.0
+DRAW_EVENT_KEEPALIVE = 15
+# WSGI 로 배포되어 스트림을 유지할 수 없을 때 클라이언트의 재연결 간격(밀리초)
+DRAW_EVENT_RETRY_MS = 5000
+# 이벤트 스트림 경로를 ASGI 서비스로 보내도록 배포했을 때만 켠다 (내 복권 페이지가 구독한다)
+# WSGI 만 있으면 스트림이 유지되지 않아 페이지마다 DRAW_EVENT_RETRY_MS 간격으로 폴링하게 된다
+DRAW_EVENT_STREAM = config('DRAW_EVENT_STREAM', default=False, cast=bool)
+
+# 요청별 처리 시간·SQL 쿼리 통계 (DEBUG 없이 동작, Server-Timing 헤더 포함, 기본 꺼짐)
+# 뷰가 응답을 돌려준 뒤에 실행되는 쿼리(스트리밍 응답을 내보내는 동안의 쿼리)는 집계되지 않는다
+QUERY_INSTRUMENTATION = config('QUERY_INSTRUMENTATION', default=False, cast=bool)
+# 뷰별로 보관하는 최근 요청 수
+QUERY_STATS_WINDOW = 500
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
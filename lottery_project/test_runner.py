@@ -0,0 +1,31 @@
+"""SQLite 테스트 데이터베이스를 임시 파일로 만드는 테스트 러너
+
+기본 테스트 데이터베이스는 메모리에 있어 여러 연결이 동시에 쓸 수 없으므로
+동시 구매·수령 테스트(PurchaseConcurrencyTests)와 다중 프로세스 정산 테스트
+(ParallelSettlementTests)는 건너뛴다. 그 테스트들은 이 러너로 실행한다.
+
+    python manage.py test lottery.tests.PurchaseConcurrencyTests lottery.tests.ParallelSettlementTests \\
+        --testrunner lottery_project.test_runner.FileDatabaseTestRunner
+"""
+import os
+import shutil
+import tempfile
+
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+
+class FileDatabaseTestRunner(DiscoverRunner):
+    def setup_databases(self, **kwargs):
+        self.database_dir = tempfile.mkdtemp(prefix='lottery-test-')
+        for alias in connections:
+            connection = connections[alias]
+            if connection.vendor == 'sqlite':
+                connection.settings_dict['TEST']['NAME'] = os.path.join(self.database_dir, f'{alias}.sqlite3')
+        return super().setup_databases(**kwargs)
+
+    def teardown_databases(self, old_config, **kwargs):
+        try:
+            super().teardown_databases(old_config, **kwargs)
+        finally:
+            shutil.rmtree(self.database_dir, ignore_errors=True)
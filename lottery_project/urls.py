@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('lottery.urls')),
+    path('api/v1/', include('lottery.api_urls')),
     path('accounts/', include('accounts.urls')),
     path('management/', include('management.urls')),
 ]
@@ -1,3 +1,11 @@
 from django.contrib import admin
+from .models import DrawJob
 
-# Register your models here.
+
+@admin.register(DrawJob)
+class DrawJobAdmin(admin.ModelAdmin):
+    list_display = ['lottery_draw', 'status', 'processed_tickets', 'total_tickets', 'winning_tickets', 'worker', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['lottery_draw__draw_number', 'worker']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'started_at', 'heartbeat_at', 'finished_at', 'last_ticket_id']
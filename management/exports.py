@@ -0,0 +1,167 @@
+"""彩票和交易记录的流式导出
+
+按主键键集分页读取（每页固定行数，只取 values_list 元组），边读边写，
+因此无论导出多少行，内存占用都保持不变。支持 CSV，安装了 pyarrow 时
+还支持 Parquet（每页写成一个行组）。
+"""
+import csv
+import io
+
+from lottery.models import LotteryTicket, Transaction
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - 未安装 pyarrow 的环境
+    pa = pq = None
+
+
+EXPORT_BATCH_SIZE = 5000
+
+
+class ExportSpec:
+    """导出的数据来源与列定义，columns 为 [(字段路径, 列名, 类型)]"""
+
+    def __init__(self, name, model, date_field, columns):
+        self.name = name
+        self.model = model
+        self.date_field = date_field
+        self.columns = columns
+
+    @property
+    def header(self):
+        return [column for _, column, _ in self.columns]
+
+    @property
+    def fields(self):
+        return [field for field, _, _ in self.columns]
+
+
+TICKET_EXPORT = ExportSpec('tickets', LotteryTicket, 'purchase_time', [
+    ('id', 'id', 'int'),
+    ('ticket_number', 'ticket_number', 'str'),
+    ('user__username', 'username', 'str'),
+    ('lottery_draw__lottery_type__name', 'lottery_type', 'str'),
+    ('lottery_draw__draw_number', 'draw_number', 'str'),
+    ('selected_numbers', 'selected_numbers', 'str'),
+    ('is_auto_select', 'is_auto_select', 'bool'),
+    ('is_winning', 'is_winning', 'bool'),
+    ('winning_amount', 'winning_amount', 'decimal'),
+    ('purchase_time', 'purchase_time', 'datetime'),
+    ('claimed_at', 'claimed_at', 'datetime'),
+])
+
+TRANSACTION_EXPORT = ExportSpec('transactions', Transaction, 'created_at', [
+    ('id', 'id', 'int'),
+    ('user__username', 'username', 'str'),
+    ('transaction_type', 'transaction_type', 'str'),
+    ('amount', 'amount', 'decimal'),
+    ('description', 'description', 'str'),
+    ('created_at', 'created_at', 'datetime'),
+])
+
+EXPORTS = {spec.name: spec for spec in (TICKET_EXPORT, TRANSACTION_EXPORT)}
+
+
+def parquet_available():
+    return pq is not None
+
+
+def iter_batches(spec, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    """按主键顺序分页读取，每次产出一页 values_list 元组"""
+    queryset = spec.model.objects.order_by('pk')
+    if start:
+        queryset = queryset.filter(**{f'{spec.date_field}__date__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{spec.date_field}__date__lte': end})
+
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).values_list(*spec.fields)[:batch_size].iterator())
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1][0]
+
+
+def _format_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(spec, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    """逐页产出 CSV 文本"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(spec.header)
+    for batch in iter_batches(spec, start, end, batch_size):
+        writer.writerows([_format_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _arrow_schema(spec):
+    types = {
+        'int': pa.int64(),
+        'str': pa.string(),
+        'bool': pa.bool_(),
+        'decimal': pa.decimal128(14, 2),
+        'datetime': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([(column, types[kind]) for _, column, kind in spec.columns])
+
+
+class _ChunkSink(io.RawIOBase):
+    """收集 ParquetWriter 写出的字节，由生成器逐块取走"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(spec, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    """逐页产出 Parquet 字节，每页一个行组"""
+    if pq is None:
+        raise RuntimeError('导出 Parquet 需要安装 pyarrow')
+
+    schema = _arrow_schema(spec)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for batch in iter_batches(spec, start, end, batch_size):
+        columns = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        ))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export(spec, export_format='csv', start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    if export_format == 'parquet':
+        return iter_parquet(spec, start, end, batch_size)
+    return iter_csv(spec, start, end, batch_size)
@@ -0,0 +1,184 @@
+"""请求耗时与 SQL 查询统计
+
+中间件为每个请求在 ContextVar 中放一个记录器；每个数据库连接建立时都会
+挂上 execute_wrapper，把查询次数、耗时和重复语句记到当前请求的记录器中。
+ContextVar 会随 sync_to_async 传递到执行 ORM 的线程，因此同步和异步视图都能统计。
+每个视图保留最近 QUERY_STATS_WINDOW 次请求的样本，在内存中计算分位数
+（多进程部署时每个进程各自统计）。
+
+默认关闭，通过 QUERY_INSTRUMENTATION 开启。统计在视图返回响应时结束，
+StreamingHttpResponse 在发送过程中执行的查询（例如 CSV 导出逐行读取）不计入。
+"""
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.decorators import sync_and_async_middleware
+
+
+DEFAULT_WINDOW = 500
+
+_current_recorder = contextvars.ContextVar('query_recorder', default=None)
+
+
+class QueryRecorder:
+    """单个请求的查询统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def add(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[sql] += 1
+
+    @property
+    def most_repeated(self):
+        """重复次数最多的语句 (语句, 次数)，同一语句执行多次通常意味着 N+1 查询"""
+        if not self.statements:
+            return '', 0
+        return self.statements.most_common(1)[0]
+
+
+def record_query(execute, sql, params, many, context):
+    """数据库连接的 execute_wrapper，只在请求统计期间记录"""
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add(sql, time.perf_counter() - started)
+
+
+def install_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _percentile(values, percent):
+    """最近秩分位数"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]
+
+
+class ViewStats:
+    """各视图最近请求的滚动统计"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._totals = Counter()
+        self._worst_repeats = {}
+
+    def record(self, view_name, wall_ms, recorder):
+        sql, repeats = recorder.most_repeated
+        with self._lock:
+            samples = self._samples.get(view_name)
+            if samples is None:
+                samples = self._samples[view_name] = deque(maxlen=self.window)
+            samples.append((wall_ms, recorder.duration * 1000, recorder.count, repeats))
+            self._totals[view_name] += 1
+            if repeats > self._worst_repeats.get(view_name, (0, ''))[0]:
+                self._worst_repeats[view_name] = (repeats, sql)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._worst_repeats.clear()
+
+    def summary(self):
+        """每个视图一行的统计 (按 p95 耗时降序)"""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+            totals = dict(self._totals)
+            worst = dict(self._worst_repeats)
+
+        rows = []
+        for name, samples in snapshot.items():
+            walls = [sample[0] for sample in samples]
+            queries = [sample[2] for sample in samples]
+            repeats, sql = worst.get(name, (0, ''))
+            rows.append({
+                'view': name,
+                'requests': totals[name],
+                'samples': len(samples),
+                'p50_ms': round(_percentile(walls, 50), 1),
+                'p95_ms': round(_percentile(walls, 95), 1),
+                'p99_ms': round(_percentile(walls, 99), 1),
+                'db_ms': round(sum(sample[1] for sample in samples) / len(samples), 1),
+                'avg_queries': round(sum(queries) / len(queries), 1),
+                'max_queries': max(queries),
+                'max_repeats': repeats,
+                'repeated_sql': sql,
+            })
+        rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return rows
+
+
+view_stats = ViewStats(getattr(settings, 'QUERY_STATS_WINDOW', DEFAULT_WINDOW))
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name
+
+
+def _finish(request, response, recorder, started):
+    wall_ms = (time.perf_counter() - started) * 1000
+    view_stats.record(_view_name(request), wall_ms, recorder)
+    response['Server-Timing'] = (
+        f'app;dur={wall_ms:.1f}, '
+        f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+    )
+    return response
+
+
+@sync_and_async_middleware
+def query_instrumentation_middleware(get_response):
+    """统计每个请求的耗时和查询，并添加 Server-Timing 响应头"""
+    if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+        raise MiddlewareNotUsed
+
+    connection_created.connect(install_wrapper)
+    for connection in connections.all():
+        install_wrapper(connection)
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            recorder = QueryRecorder()
+            token = _current_recorder.set(recorder)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current_recorder.reset(token)
+            return _finish(request, response, recorder, started)
+    else:
+        def middleware(request):
+            recorder = QueryRecorder()
+            token = _current_recorder.set(recorder)
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current_recorder.reset(token)
+            return _finish(request, response, recorder, started)
+
+    return middleware
@@ -0,0 +1,100 @@
+"""数据库队列驱动的后台开奖任务"""
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from lottery.events import publish_settled
+from lottery.models import LotteryDraw, LotteryTicket
+from lottery.settlement import DEFAULT_CHUNK_SIZE, settle_draw
+from .models import DrawJob
+
+
+STALE_AFTER = timedelta(minutes=5)
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_draw(draw):
+    """为期次创建开奖任务，已有未完成任务时直接返回该任务"""
+    with transaction.atomic():
+        LotteryDraw.objects.select_for_update().filter(pk=draw.pk).first()
+        job = DrawJob.objects.filter(
+            lottery_draw=draw,
+            status__in=['pending', 'running'],
+        ).first()
+        if job is None:
+            job = DrawJob.objects.create(lottery_draw=draw)
+    return job
+
+
+def claim_next_job(worker, stale_after=STALE_AFTER):
+    """领取下一个待处理任务，包括心跳超时（工作进程已退出）的任务"""
+    now = timezone.now()
+    stale_before = now - stale_after
+    candidates = DrawJob.objects.filter(
+        status='pending',
+    ) | DrawJob.objects.filter(
+        status='running',
+        heartbeat_at__lt=stale_before,
+    )
+
+    for job in candidates.order_by('created_at', 'id')[:10]:
+        # 条件更新保证同一任务只被一个工作进程领取
+        claimed = DrawJob.objects.filter(
+            pk=job.pk,
+            status=job.status,
+            heartbeat_at=job.heartbeat_at,
+        ).update(
+            status='running',
+            worker=worker,
+            heartbeat_at=now,
+            started_at=job.started_at or now,
+        )
+        if claimed:
+            return DrawJob.objects.get(pk=job.pk)
+    return None
+
+
+def run_job(job, chunk_size=DEFAULT_CHUNK_SIZE):
+    """执行开奖任务，从上次记录的位置继续结算"""
+    try:
+        draw = LotteryDraw.objects.select_related('lottery_type').get(pk=job.lottery_draw_id)
+        # 生成中奖号码（已开奖则保持原号码）
+        draw.generate_winning_numbers()
+
+        if not job.total_tickets:
+            job.total_tickets = LotteryTicket.objects.filter(lottery_draw=draw).count()
+            job.save(update_fields=['total_tickets'])
+
+        base_processed = job.processed_tickets
+        base_winning = job.winning_tickets
+
+        def record_progress(result, last_id):
+            job.processed_tickets = base_processed + result.processed
+            job.winning_tickets = base_winning + result.winning_count
+            job.last_ticket_id = last_id
+            job.heartbeat_at = timezone.now()
+            job.save(update_fields=['processed_tickets', 'winning_tickets', 'last_ticket_id', 'heartbeat_at'])
+
+        settle_draw(draw, chunk_size=chunk_size, start_after=job.last_ticket_id, on_chunk=record_progress)
+    except Exception:
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        raise
+
+    # 任务完成状态与结算完成事件在同一事务中提交，中途崩溃时任务会被重新执行并补发事件
+    with transaction.atomic():
+        job.status = 'done'
+        job.processed_tickets = max(job.processed_tickets, job.total_tickets)
+        job.finished_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=['status', 'processed_tickets', 'finished_at', 'heartbeat_at'])
+        publish_settled(draw, job.processed_tickets, job.winning_tickets)
+    return job
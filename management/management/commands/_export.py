@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from management.exports import EXPORT_BATCH_SIZE, iter_export, parquet_available
+
+
+class ExportCommand(BaseCommand):
+    """导出命令基类，子类指定 spec"""
+    spec = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help='输出文件路径，默认输出到标准输出')
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='导出格式')
+        parser.add_argument('--start', help='开始日期 (YYYY-MM-DD)')
+        parser.add_argument('--end', help='结束日期 (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE, help='每次读取的行数')
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+            end = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else None
+        except ValueError:
+            raise CommandError('日期格式应为 YYYY-MM-DD')
+
+        export_format = options['format']
+        if export_format == 'parquet':
+            if not parquet_available():
+                raise CommandError('导出 Parquet 需要安装 pyarrow')
+            if options['output'] == '-':
+                raise CommandError('Parquet 格式需要指定 --output 文件')
+
+        chunks = iter_export(self.spec, export_format, start, end, options['batch_size'])
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        if export_format == 'parquet':
+            output = open(options['output'], 'wb')
+        else:
+            output = open(options['output'], 'w', encoding='utf-8', newline='')
+        with output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f'已导出到 {options["output"]}'))
@@ -0,0 +1,8 @@
+from management.exports import TICKET_EXPORT
+
+from ._export import ExportCommand
+
+
+class Command(ExportCommand):
+    help = '流式导出全部彩票记录'
+    spec = TICKET_EXPORT
@@ -0,0 +1,8 @@
+from management.exports import TRANSACTION_EXPORT
+
+from ._export import ExportCommand
+
+
+class Command(ExportCommand):
+    help = '流式导出全部交易记录'
+    spec = TRANSACTION_EXPORT
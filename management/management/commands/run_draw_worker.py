@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from lottery.settlement import DEFAULT_CHUNK_SIZE
+from management.jobs import STALE_AFTER, claim_next_job, default_worker_name, run_job
+
+
+class Command(BaseCommand):
+    help = '执行开奖任务队列'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前队列后退出')
+        parser.add_argument('--sleep', type=float, default=2.0, help='队列为空时的等待秒数')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每批结算的彩票数量')
+        parser.add_argument('--stale-after', type=int, default=int(STALE_AFTER.total_seconds()),
+                            help='心跳超过该秒数的运行中任务视为中断并重新领取')
+
+    def handle(self, *args, **options):
+        worker = default_worker_name()
+        stale_after = timedelta(seconds=options['stale_after'])
+        self.stdout.write(f'开奖工作进程启动: {worker}')
+
+        while True:
+            job = claim_next_job(worker, stale_after=stale_after)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f'开始处理任务 #{job.pk}: {job.lottery_draw}')
+            try:
+                run_job(job, chunk_size=options['chunk_size'])
+            except Exception as exc:
+                self.stderr.write(self.style.ERROR(f'任务 #{job.pk} 失败: {exc}'))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'任务 #{job.pk} 完成: 结算 {job.processed_tickets} 张，{job.winning_tickets} 张中奖'
+            ))
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('lottery', '0002_number_masks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrawJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', '대기'), ('running', '실행 중'), ('done', '완료'), ('failed', '실패')], default='pending', max_length=20, verbose_name='상태')),
+                ('total_tickets', models.IntegerField(default=0, verbose_name='전체 복권 수')),
+                ('processed_tickets', models.IntegerField(default=0, verbose_name='처리한 복권 수')),
+                ('winning_tickets', models.IntegerField(default=0, verbose_name='당첨 복권 수')),
+                ('last_ticket_id', models.BigIntegerField(default=0, verbose_name='마지막 처리 복권 ID')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='작업자')),
+                ('error', models.TextField(blank=True, verbose_name='오류')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='생성 시간')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='시작 시간')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='최근 응답 시간')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='완료 시간')),
+                ('lottery_draw', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lottery.lotterydraw', verbose_name='추첨 회차')),
+            ],
+            options={
+                'verbose_name': '추첨 작업',
+                'verbose_name_plural': '추첨 작업',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-18 23:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('management', '0001_initial'),
+    ]
+
+    operations = [
+        # 用户管理按 (注册时间, id) 键集分页，auth_user 不是本项目的模型，直接用 SQL 建索引
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_joined_id_idx ON auth_user (date_joined, id);',
+            'DROP INDEX auth_user_joined_id_idx;',
+        ),
+    ]
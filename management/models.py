@@ -1,3 +1,60 @@
 from django.db import models
+from lottery.models import LotteryDraw
 
-# Create your models here.
+
+class DrawJob(models.Model):
+    """추첨 작업 대기열"""
+    STATUS_CHOICES = [
+        ('pending', '대기'),
+        ('running', '실행 중'),
+        ('done', '완료'),
+        ('failed', '실패'),
+    ]
+    
+    lottery_draw = models.ForeignKey(LotteryDraw, on_delete=models.CASCADE, verbose_name="추첨 회차")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="상태")
+    total_tickets = models.IntegerField(default=0, verbose_name="전체 복권 수")
+    processed_tickets = models.IntegerField(default=0, verbose_name="처리한 복권 수")
+    winning_tickets = models.IntegerField(default=0, verbose_name="당첨 복권 수")
+    last_ticket_id = models.BigIntegerField(default=0, verbose_name="마지막 처리 복권 ID")
+    worker = models.CharField(max_length=100, blank=True, verbose_name="작업자")
+    error = models.TextField(blank=True, verbose_name="오류")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="생성 시간")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="시작 시간")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="최근 응답 시간")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="완료 시간")
+    
+    class Meta:
+        verbose_name = "추첨 작업"
+        verbose_name_plural = "추첨 작업"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.lottery_draw} - {self.get_status_display()}"
+    
+    @property
+    def is_active(self):
+        return self.status in ('pending', 'running')
+    
+    @property
+    def progress_percent(self):
+        if self.total_tickets <= 0:
+            return 100 if self.status == 'done' else 0
+        return min(100, self.processed_tickets * 100 // self.total_tickets)
+    
+    @property
+    def tickets_per_second(self):
+        if not self.started_at or not self.heartbeat_at or self.processed_tickets <= 0:
+            return 0
+        elapsed = (self.heartbeat_at - self.started_at).total_seconds()
+        return self.processed_tickets / elapsed if elapsed > 0 else 0
+    
+    @property
+    def eta_seconds(self):
+        """남은 예상 시간(초), 계산할 수 없으면 None"""
+        if self.status == 'done':
+            return 0
+        rate = self.tickets_per_second
+        if rate <= 0:
+            return None
+        return max(0, self.total_tickets - self.processed_tickets) / rate
@@ -0,0 +1,82 @@
+"""销售报表统计"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from lottery.models import DailySalesRollup, LotteryType
+
+
+REPORT_RANGES = [7, 30, 90]
+
+
+def report_period(range_param, start_param=None, end_param=None):
+    """根据请求参数返回 (开始日期, 结束日期)，两端均包含"""
+    today = timezone.localdate()
+    if range_param == 'custom':
+        try:
+            start = datetime.strptime(start_param or '', '%Y-%m-%d').date()
+            end = datetime.strptime(end_param or '', '%Y-%m-%d').date()
+        except ValueError:
+            start = end = None
+        if start and end and start <= end:
+            return start, end
+
+    try:
+        days = int(range_param)
+    except (TypeError, ValueError):
+        days = REPORT_RANGES[0]
+    if days not in REPORT_RANGES:
+        days = REPORT_RANGES[0]
+    return today - timedelta(days=days - 1), today
+
+
+def sales_rows(start, end):
+    """从每日销售汇总表读取 (日期, 彩票类型) 的销售数据"""
+    rows = DailySalesRollup.objects.filter(
+        date__gte=start,
+        date__lte=end,
+        tickets__gt=0,
+    ).values('date', 'lottery_type_id', 'tickets', 'revenue').order_by('-date', 'lottery_type_id')
+
+    return [{
+        'date': row['date'],
+        'lottery_type_id': row['lottery_type_id'],
+        'tickets': row['tickets'],
+        'amount': row['revenue'],
+    } for row in rows]
+
+
+def sales_summary(start, end):
+    """汇总销售报表，Python 端只处理 (天数 x 类型数) 行"""
+    rows = sales_rows(start, end)
+    type_names = dict(LotteryType.objects.values_list('id', 'name'))
+
+    # 类型名称不唯一，按类型 id 汇总
+    lottery_sales = {
+        type_id: {'name': name, 'tickets': 0, 'amount': Decimal('0')}
+        for type_id, name in type_names.items()
+    }
+    daily_sales = {}
+    day = end
+    while day >= start:
+        daily_sales[day.strftime('%Y-%m-%d')] = {'tickets': 0, 'amount': Decimal('0')}
+        day -= timedelta(days=1)
+
+    total = {'tickets': 0, 'amount': Decimal('0')}
+    for row in rows:
+        row['lottery_type'] = type_names.get(row['lottery_type_id'], '')
+        for bucket in (lottery_sales[row['lottery_type_id']],
+                       daily_sales[row['date'].strftime('%Y-%m-%d')],
+                       total):
+            bucket['tickets'] += row['tickets']
+            bucket['amount'] += row['amount']
+
+    return {
+        'start': start,
+        'end': end,
+        'rows': rows,
+        'lottery_sales': lottery_sales,
+        'daily_sales': daily_sales,
+        'total_sales': total,
+    }
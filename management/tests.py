@@ -1,3 +1,420 @@
-from django.test import TestCase
+import csv
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from lottery.models import LotteryType, LotteryDraw, LotteryTicket, Transaction, DrawEvent
+from .jobs import claim_next_job, enqueue_draw, run_job
+from .models import DrawJob
 
-# Create your tests here.
+
+class DrawJobTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.client = Client()
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='adminpass123',
+            is_staff=True
+        )
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票',
+            description='测试用彩票',
+            price=2.00,
+            max_number=10,
+            numbers_count=3
+        )
+        self.draw = LotteryDraw.objects.create(
+            lottery_type=self.lottery_type,
+            draw_number='TEST-001',
+            draw_date=timezone.now() + timedelta(hours=1)
+        )
+        for selected in ['1,2,3', '4,5,6', '7,8,9', '1,5,9', '2,6,10']:
+            LotteryTicket.objects.create(user=self.user, lottery_draw=self.draw, selected_numbers=selected)
+
+    def test_conduct_draw_enqueues_job(self):
+        """测试开奖请求只提交任务"""
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.post(reverse('management:conduct_draw', args=[self.draw.id]))
+
+        job = DrawJob.objects.get(lottery_draw=self.draw)
+        self.assertRedirects(response, reverse('management:draw_job', args=[job.id]))
+        self.assertEqual(job.status, 'pending')
+        self.draw.refresh_from_db()
+        self.assertFalse(self.draw.is_drawn)
+
+        # 重复提交不会创建新任务
+        self.assertEqual(enqueue_draw(self.draw), job)
+
+    def test_worker_runs_job(self):
+        """测试工作进程执行任务"""
+        enqueue_draw(self.draw)
+        job = claim_next_job('test-worker')
+        self.assertEqual(job.status, 'running')
+        self.assertIsNone(claim_next_job('other-worker'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            run_job(job, chunk_size=2)
+
+        job.refresh_from_db()
+        self.draw.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.processed_tickets, 5)
+        self.assertTrue(self.draw.is_drawn)
+        self.assertEqual(job.winning_tickets,
+                         LotteryTicket.objects.filter(lottery_draw=self.draw, is_winning=True).count())
+
+        # 开奖号码和结算完成事件依次发布到实时结果流
+        events = list(DrawEvent.objects.filter(lottery_draw=self.draw).order_by('id'))
+        self.assertEqual([event.kind for event in events], ['drawn', 'settled'])
+        self.assertEqual(events[1].payload['winning_tickets'], job.winning_tickets)
+
+    def test_stale_job_resumes_from_cursor(self):
+        """测试中断的任务从上次位置继续"""
+        self.draw.generate_winning_numbers()
+        ticket_ids = list(LotteryTicket.objects.filter(lottery_draw=self.draw).order_by('id').values_list('id', flat=True))
+        job = DrawJob.objects.create(
+            lottery_draw=self.draw,
+            status='running',
+            total_tickets=5,
+            processed_tickets=2,
+            last_ticket_id=ticket_ids[1],
+            worker='dead-worker',
+            started_at=timezone.now() - timedelta(hours=1),
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+
+        claimed = claim_next_job('test-worker')
+        self.assertEqual(claimed, job)
+        run_job(claimed, chunk_size=2)
+
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, 'done')
+        self.assertEqual(claimed.processed_tickets, 5)
+        self.assertEqual(claimed.last_ticket_id, ticket_ids[-1])
+
+    def test_progress_endpoint(self):
+        """测试任务进度接口"""
+        job = enqueue_draw(self.draw)
+        self.client.login(username='admin', password='adminpass123')
+
+        response = self.client.get(reverse('management:draw_job_progress', args=[job.id]))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'pending')
+        self.assertIsNone(data['eta_seconds'])
+        self.assertEqual(self.client.get(reverse('management:draw_job', args=[job.id])).status_code, 200)
+
+
+class UserManagementTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.client = Client()
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='adminpass123',
+            is_staff=True
+        )
+        lottery_type = LotteryType.objects.create(
+            name='测试彩票',
+            description='测试用彩票',
+            price=2.00,
+            max_number=10,
+            numbers_count=3
+        )
+        draw = LotteryDraw.objects.create(
+            lottery_type=lottery_type,
+            draw_number='TEST-001',
+            draw_date=timezone.now()
+        )
+        self.winner = User.objects.create_user(username='winner', password='testpass123')
+        LotteryTicket.objects.create(user=self.winner, lottery_draw=draw, selected_numbers='1,2,3', is_winning=True)
+        LotteryTicket.objects.create(user=self.winner, lottery_draw=draw, selected_numbers='4,5,6')
+        self.client.login(username='admin', password='adminpass123')
+
+    def test_user_stats_and_footer(self):
+        """测试用户统计与汇总数据"""
+        response = self.client.get(reverse('management:user_management'))
+
+        self.assertEqual(response.status_code, 200)
+        stats = {stat['user'].username: stat for stat in response.context['user_stats']}
+        self.assertEqual(stats['winner']['tickets_count'], 2)
+        self.assertEqual(stats['winner']['winning_tickets'], 1)
+        self.assertIsNone(stats['winner']['profile'])
+        self.assertEqual(response.context['total_users_count'], 2)
+        self.assertEqual(response.context['winning_users_count'], 1)
+        self.assertEqual(response.context['new_users_count'], 2)
+
+    def test_search(self):
+        """测试按用户名搜索"""
+        response = self.client.get(reverse('management:user_management'), {'q': 'win'})
+
+        self.assertEqual([stat['user'].username for stat in response.context['user_stats']], ['winner'])
+
+    def test_keyset_pagination(self):
+        """测试键集分页"""
+        from . import views
+
+        for index in range(views.USER_PAGE_SIZE):
+            User.objects.create_user(username=f'user{index:03d}')
+
+        first = self.client.get(reverse('management:user_management'))
+        self.assertEqual(len(first.context['user_stats']), views.USER_PAGE_SIZE)
+        self.assertTrue(first.context['page'].has_next())
+
+        second = self.client.get(reverse('management:user_management'), {'after': first.context['page'].next_cursor})
+        names = [stat['user'].username for stat in first.context['user_stats'] + second.context['user_stats']]
+        self.assertEqual(len(names), views.USER_PAGE_SIZE + 2)
+        self.assertEqual(len(set(names)), len(names))
+        self.assertFalse(second.context['page'].has_next())
+
+        back = self.client.get(reverse('management:user_management'), {'before': second.context['page'].previous_cursor})
+        self.assertEqual([stat['user'] for stat in back.context['user_stats']],
+                         [stat['user'] for stat in first.context['user_stats']])
+
+    def test_page_query_reads_index_order(self):
+        """测试用户分页查询沿 (date_joined, id) 索引读取，不对全部用户分组排序"""
+        from django.db import connection
+
+        from . import views
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('断言的是 SQLite 执行计划')
+        plan = views.user_list().order_by(*views.USER_ORDERING)[:views.USER_PAGE_SIZE + 1].explain()
+        self.assertIn('auth_user_joined_id_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class SalesReportTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.client = Client()
+        User.objects.create_user(username='admin', password='adminpass123', is_staff=True)
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.lottery_type = LotteryType.objects.create(
+            name='测试彩票',
+            description='测试用彩票',
+            price=2.00,
+            max_number=10,
+            numbers_count=3
+        )
+        other_type = self.other_type = LotteryType.objects.create(
+            name='其他彩票',
+            description='测试用彩票',
+            price=5.00,
+            max_number=10,
+            numbers_count=3
+        )
+        for lottery_type, count in ((self.lottery_type, 3), (other_type, 2)):
+            draw = LotteryDraw.objects.create(
+                lottery_type=lottery_type,
+                draw_number='TEST-001',
+                draw_date=timezone.now()
+            )
+            for _ in range(count):
+                LotteryTicket.objects.create(user=user, lottery_draw=draw, selected_numbers='1,2,3')
+            Transaction.objects.create(user=user, transaction_type='purchase', lottery_type=lottery_type,
+                                       amount=lottery_type.price * count, description='购买')
+        # 超出统计范围的彩票
+        old_ticket = LotteryTicket.objects.create(user=user, lottery_draw=draw, selected_numbers='1,2,3')
+        LotteryTicket.objects.filter(pk=old_ticket.pk).update(purchase_time=timezone.now() - timedelta(days=40))
+        old_payment = Transaction.objects.create(user=user, transaction_type='purchase', lottery_type=other_type,
+                                                 amount=other_type.price, description='购买')
+        Transaction.objects.filter(pk=old_payment.pk).update(created_at=timezone.now() - timedelta(days=40))
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.client.login(username='admin', password='adminpass123')
+
+    def test_report_groups_by_type_and_date(self):
+        """测试按类型和日期分组统计"""
+        response = self.client.get(reverse('management:sales_report'))
+
+        self.assertEqual(response.status_code, 200)
+        lottery_sales = response.context['lottery_sales']
+        self.assertEqual(lottery_sales[self.lottery_type.id], {'name': '测试彩票', 'tickets': 3, 'amount': 6})
+        self.assertEqual(lottery_sales[self.other_type.id], {'name': '其他彩票', 'tickets': 2, 'amount': 10})
+        daily_sales = response.context['daily_sales']
+        self.assertEqual(len(daily_sales), 7)
+        today = timezone.localdate().strftime('%Y-%m-%d')
+        self.assertEqual(daily_sales[today]['tickets'], 5)
+
+    def test_report_ranges(self):
+        """测试统计区间"""
+        response = self.client.get(reverse('management:sales_report'), {'range': '90'})
+        self.assertEqual(response.context['total_sales']['tickets'], 6)
+        self.assertEqual(len(response.context['daily_sales']), 90)
+
+        today = timezone.localdate()
+        response = self.client.get(reverse('management:sales_report'), {
+            'range': 'custom',
+            'start': (today - timedelta(days=1)).isoformat(),
+            'end': today.isoformat(),
+        })
+        self.assertEqual(response.context['total_sales']['tickets'], 5)
+        self.assertEqual(len(response.context['daily_sales']), 2)
+
+    def test_report_exports(self):
+        """测试 CSV 与 JSON 导出"""
+        response = self.client.get(reverse('management:sales_report'), {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = response.content.decode('utf-8').strip().splitlines()
+        self.assertEqual(lines[0], 'date,lottery_type_id,lottery_type,tickets,amount')
+        self.assertEqual(len(lines), 3)
+
+        response = self.client.get(reverse('management:sales_report'), {'format': 'json'})
+        data = response.json()
+        self.assertEqual(data['total']['tickets'], 5)
+        self.assertEqual(len(data['rows']), 2)
+        self.assertEqual(data['lottery_sales'][str(self.other_type.id)]['name'], '其他彩票')
+        self.assertEqual({row['lottery_type_id'] for row in data['rows']}, {self.lottery_type.id, self.other_type.id})
+
+    def test_report_keeps_types_with_same_name_apart(self):
+        """测试同名彩票类型分别统计"""
+        LotteryType.objects.filter(pk=self.other_type.pk).update(name='测试彩票')
+
+        response = self.client.get(reverse('management:sales_report'))
+
+        lottery_sales = response.context['lottery_sales']
+        self.assertEqual(lottery_sales[self.lottery_type.id]['tickets'], 3)
+        self.assertEqual(lottery_sales[self.other_type.id]['tickets'], 2)
+        self.assertContains(response, '测试彩票', count=2)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='adminpass123', is_staff=True)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        lottery_type = LotteryType.objects.create(
+            name='测试彩票', description='测试用彩票', price=2.00, max_number=10, numbers_count=3
+        )
+        draw = LotteryDraw.objects.create(lottery_type=lottery_type, draw_number='TEST-001', draw_date=timezone.now())
+        for numbers in ('1,2,3', '4,5,6', '7,8,9'):
+            LotteryTicket.objects.create(user=self.user, lottery_draw=draw, selected_numbers=numbers)
+        Transaction.objects.create(user=self.user, transaction_type='recharge', amount=100, description='充值')
+
+    def test_export_command_pages_all_rows(self):
+        """测试导出命令分页读取全部记录"""
+        output = StringIO()
+        call_command('export_tickets', batch_size=2, stdout=output)
+
+        rows = list(csv.reader(StringIO(output.getvalue())))
+        self.assertEqual(rows[0][:3], ['id', 'ticket_number', 'username'])
+        self.assertEqual([row[5] for row in rows[1:]], ['1,2,3', '4,5,6', '7,8,9'])
+
+    def test_export_command_date_filter(self):
+        """测试按日期范围导出"""
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        output = StringIO()
+        call_command('export_transactions', end=yesterday, stdout=output)
+        self.assertEqual(output.getvalue().strip().splitlines(), [
+            'id,username,transaction_type,amount,description,created_at',
+        ])
+
+    def test_export_endpoint_streams_csv(self):
+        """测试导出接口以流式响应返回 CSV"""
+        url = reverse('management:export_data', args=['transactions'])
+        self.client.login(username='testuser', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode('utf-8').strip().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('testuser,recharge,100.00', lines[1])
+
+        self.assertEqual(self.client.get(reverse('management:export_data', args=['users'])).status_code, 404)
+
+
+@override_settings(QUERY_INSTRUMENTATION=True)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        """设置测试数据"""
+        from .instrumentation import view_stats
+
+        view_stats.reset()
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='adminpass123', is_staff=True)
+
+    def test_server_timing_header_and_stats(self):
+        """测试响应包含 Server-Timing 头并记录视图统计"""
+        from .instrumentation import view_stats
+
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.get(reverse('management:user_management'))
+
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        rows = {row['view']: row for row in view_stats.summary()}
+        self.assertEqual(rows['management:user_management']['requests'], 1)
+        self.assertGreater(rows['management:user_management']['max_queries'], 0)
+
+    def test_repeated_queries_reported(self):
+        """测试记录同一请求中重复次数最多的语句"""
+        from .instrumentation import QueryRecorder, ViewStats
+
+        recorder = QueryRecorder()
+        for _ in range(3):
+            recorder.add('SELECT 1 FROM t WHERE id = %s', 0.001)
+        recorder.add('SELECT 2', 0.001)
+
+        stats = ViewStats(window=2)
+        for wall_ms in (10, 20, 30):
+            stats.record('lottery:my_tickets', wall_ms, recorder)
+        row = stats.summary()[0]
+        self.assertEqual(row['requests'], 3)
+        self.assertEqual(row['samples'], 2)
+        self.assertEqual((row['p50_ms'], row['p95_ms']), (20, 30))
+        self.assertEqual(row['avg_queries'], 4)
+        self.assertEqual((row['max_repeats'], row['repeated_sql']), (3, 'SELECT 1 FROM t WHERE id = %s'))
+
+    def test_async_view_queries_counted(self):
+        """测试异步视图中的查询也被统计"""
+        from asgiref.sync import async_to_sync, sync_to_async
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .instrumentation import query_instrumentation_middleware
+
+        async def view(request):
+            await sync_to_async(User.objects.count)()
+            await sync_to_async(User.objects.count)()
+            return HttpResponse()
+
+        middleware = query_instrumentation_middleware(view)
+        response = async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+    @override_settings(QUERY_INSTRUMENTATION=False)
+    def test_disabled_by_setting(self):
+        """测试关闭统计时不添加 Server-Timing 头"""
+        from .instrumentation import view_stats
+
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.get(reverse('management:performance_stats'))
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertFalse(response.context['enabled'])
+        self.assertEqual(view_stats.summary(), [])
+
+    def test_stats_page_staff_only(self):
+        """测试统计页面仅限管理员访问"""
+        url = reverse('management:performance_stats')
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.login(username='admin', password='adminpass123')
+        self.client.get(reverse('management:admin_dashboard'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('management:admin_dashboard', [row['view'] for row in response.context['slowest_views']])
+        self.assertIn('views', self.client.get(url, {'format': 'json'}).json())
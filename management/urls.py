@@ -6,8 +6,12 @@ app_name = 'management'
 urlpatterns = [
     path('', views.admin_dashboard, name='admin_dashboard'),
     path('sales-report/', views.sales_report, name='sales_report'),
+    path('exports/<str:name>/', views.export_data, name='export_data'),
+    path('performance/', views.performance_stats, name='performance_stats'),
     path('draw-management/', views.draw_management, name='draw_management'),
     path('conduct-draw/<int:draw_id>/', views.conduct_draw, name='conduct_draw'),
+    path('draw-jobs/<int:job_id>/', views.draw_job, name='draw_job'),
+    path('draw-jobs/<int:job_id>/progress/', views.draw_job_progress, name='draw_job_progress'),
     path('create-draw/', views.create_draw, name='create_draw'),
     path('user-management/', views.user_management, name='user_management'),
     path('lottery-type-management/', views.lottery_type_management, name='lottery_type_management'),
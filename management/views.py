@@ -1,9 +1,22 @@
+import csv
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Exists, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from datetime import datetime, timedelta
+from lottery import draws
+from lottery.pagination import CursorPaginator
+from lottery.counters import get_counters
 from lottery.models import LotteryType, LotteryDraw, LotteryTicket, Transaction, UserProfile
+from .jobs import enqueue_draw
+from .exports import EXPORTS, iter_export, parquet_available
+from .instrumentation import view_stats
+from .reports import REPORT_RANGES, report_period, sales_summary
+from .models import DrawJob
 from django.contrib.auth.models import User
 
 
@@ -11,24 +24,19 @@ from django.contrib.auth.models import User
 def admin_dashboard(request):
     """管理员仪表板"""
     # 统计数据
-    total_users = User.objects.count()
-    total_tickets = LotteryTicket.objects.count()
-    total_sales = Transaction.objects.filter(transaction_type='purchase').aggregate(
-        total=Sum('amount'))['total'] or 0
-    total_winnings = Transaction.objects.filter(transaction_type='winning').aggregate(
-        total=Sum('amount'))['total'] or 0
+    # 计数器从缓存读取，缓存失效时从每日汇总表重新计算
+    counters = get_counters()
     
     # 最近的彩票销售
-    recent_tickets = LotteryTicket.objects.order_by('-purchase_time')[:10]
+    recent_tickets = LotteryTicket.objects.select_related(
+        'user', 'lottery_draw__lottery_type'
+    ).order_by('-purchase_time')[:10]
     
     # 待开奖的期次
-    pending_draws = LotteryDraw.objects.filter(is_drawn=False).order_by('draw_date')
+    pending_draws = LotteryDraw.objects.filter(is_drawn=False).select_related('lottery_type').order_by('draw_date')
     
     context = {
-        'total_users': total_users,
-        'total_tickets': total_tickets,
-        'total_sales': total_sales,
-        'total_winnings': total_winnings,
+        **counters,
         'recent_tickets': recent_tickets,
         'pending_draws': pending_draws,
     }
@@ -38,42 +46,106 @@ def admin_dashboard(request):
 @staff_member_required
 def sales_report(request):
     """销售报告"""
-    # 按彩票类型统计销售
-    lottery_sales = {}
-    for lottery_type in LotteryType.objects.all():
-        tickets = LotteryTicket.objects.filter(lottery_draw__lottery_type=lottery_type)
-        total_tickets = tickets.count()
-        total_amount = total_tickets * lottery_type.price
-        
-        lottery_sales[lottery_type.name] = {
-            'tickets': total_tickets,
-            'amount': total_amount,
-        }
-    
-    # 按日期统计销售
-    from django.db.models import Q
-    from datetime import datetime, timedelta
-    
-    today = timezone.now().date()
-    last_7_days = today - timedelta(days=7)
-    last_30_days = today - timedelta(days=30)
-    
-    daily_sales = {}
-    for i in range(7):
-        date = today - timedelta(days=i)
-        tickets = LotteryTicket.objects.filter(purchase_time__date=date)
-        daily_sales[date.strftime('%Y-%m-%d')] = {
-            'tickets': tickets.count(),
-            'amount': sum(ticket.lottery_draw.lottery_type.price for ticket in tickets)
-        }
+    start, end = report_period(
+        request.GET.get('range'),
+        request.GET.get('start'),
+        request.GET.get('end'),
+    )
+    summary = sales_summary(start, end)
+    
+    export_format = request.GET.get('format')
+    if export_format == 'csv':
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="sales_{start}_{end}.csv"'
+        writer = csv.writer(response)
+        writer.writerow(['date', 'lottery_type_id', 'lottery_type', 'tickets', 'amount'])
+        for row in summary['rows']:
+            writer.writerow([row['date'].isoformat(), row['lottery_type_id'], row['lottery_type'],
+                             row['tickets'], row['amount']])
+        return response
+    if export_format == 'json':
+        return JsonResponse({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'total': summary['total_sales'],
+            'lottery_sales': summary['lottery_sales'],
+            'daily_sales': summary['daily_sales'],
+            'rows': [{
+                'date': row['date'].isoformat(),
+                'lottery_type_id': row['lottery_type_id'],
+                'lottery_type': row['lottery_type'],
+                'tickets': row['tickets'],
+                'amount': row['amount'],
+            } for row in summary['rows']],
+        })
     
     context = {
-        'lottery_sales': lottery_sales,
-        'daily_sales': daily_sales,
+        'lottery_sales': summary['lottery_sales'],
+        'daily_sales': summary['daily_sales'],
+        'total_sales': summary['total_sales'],
+        'start': start,
+        'end': end,
+        'range': request.GET.get('range') or str(REPORT_RANGES[0]),
+        'report_ranges': REPORT_RANGES,
+        'parquet_available': parquet_available(),
     }
     return render(request, 'management/sales_report.html', context)
 
 
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+@staff_member_required
+def export_data(request, name):
+    """流式导出彩票或交易记录"""
+    spec = EXPORTS.get(name)
+    if spec is None:
+        raise Http404
+    
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'parquet'):
+        return HttpResponseBadRequest('不支持的导出格式')
+    if export_format == 'parquet' and not parquet_available():
+        return HttpResponseBadRequest('导出 Parquet 需要安装 pyarrow')
+    
+    start = _parse_date(request.GET.get('start'))
+    end = _parse_date(request.GET.get('end'))
+    content_type = 'application/vnd.apache.parquet' if export_format == 'parquet' else 'text/csv; charset=utf-8'
+    response = StreamingHttpResponse(iter_export(spec, export_format, start, end), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{name}_{start or "all"}_{end or "all"}.{export_format}"'
+    return response
+
+
+@staff_member_required
+def performance_stats(request):
+    """视图耗时与查询统计"""
+    if request.method == 'POST':
+        view_stats.reset()
+        messages.success(request, '统计数据已清空')
+        return redirect('management:performance_stats')
+    
+    rows = view_stats.summary()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'views': rows})
+    
+    context = {
+        'slowest_views': rows[:20],
+        # 同一语句在一个请求中重复执行次数最多的视图（N+1 查询嫌疑）
+        'repeat_offenders': sorted(
+            (row for row in rows if row['max_repeats'] > 1),
+            key=lambda row: row['max_repeats'],
+            reverse=True,
+        )[:10],
+        'window': view_stats.window,
+        'enabled': getattr(settings, 'QUERY_INSTRUMENTATION', False),
+    }
+    return render(request, 'management/performance_stats.html', context)
+
+
 @staff_member_required
 def draw_management(request):
     """开奖管理"""
@@ -87,20 +159,10 @@ def conduct_draw(request, draw_id):
     draw = get_object_or_404(LotteryDraw, id=draw_id, is_drawn=False)
     
     if request.method == 'POST':
-        # 生成中奖号码
-        draw.generate_winning_numbers()
-        
-        # 检查所有相关彩票的中奖情况
-        tickets = LotteryTicket.objects.filter(lottery_draw=draw)
-        winning_count = 0
-        
-        for ticket in tickets:
-            ticket.check_winning()
-            if ticket.is_winning:
-                winning_count += 1
-        
-        messages.success(request, f'开奖完成！中奖号码：{draw.winning_numbers}，共有 {winning_count} 张彩票中奖')
-        return redirect('management:draw_management')
+        # 提交后台开奖任务，由 run_draw_worker 生成中奖号码并结算
+        job = enqueue_draw(draw)
+        messages.success(request, f'开奖任务已提交（任务编号 #{job.pk}）')
+        return redirect('management:draw_job', job_id=job.pk)
     
     # 获取该期次的彩票数量
     ticket_count = LotteryTicket.objects.filter(lottery_draw=draw).count()
@@ -108,34 +170,97 @@ def conduct_draw(request, draw_id):
     context = {
         'draw': draw,
         'ticket_count': ticket_count,
+        'active_job': DrawJob.objects.filter(lottery_draw=draw, status__in=['pending', 'running']).first(),
     }
     return render(request, 'management/conduct_draw.html', context)
 
 
+@staff_member_required
+def draw_job(request, job_id):
+    """开奖任务进度"""
+    job = get_object_or_404(DrawJob.objects.select_related('lottery_draw__lottery_type'), id=job_id)
+    return render(request, 'management/draw_job.html', {'job': job})
+
+
+@staff_member_required
+def draw_job_progress(request, job_id):
+    """开奖任务进度（JSON）"""
+    job = get_object_or_404(DrawJob.objects.select_related('lottery_draw'), id=job_id)
+    eta = job.eta_seconds
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'total_tickets': job.total_tickets,
+        'processed_tickets': job.processed_tickets,
+        'winning_tickets': job.winning_tickets,
+        'progress_percent': job.progress_percent,
+        'tickets_per_second': round(job.tickets_per_second, 1),
+        'eta_seconds': round(eta, 1) if eta is not None else None,
+        'winning_numbers': job.lottery_draw.winning_numbers if job.lottery_draw.is_drawn else '',
+        'error': job.error.strip().splitlines()[-1] if job.error else '',
+    })
+
+
+USER_PAGE_SIZE = 50
+# 用户管理的键集分页顺序，由 management 迁移 0002 的 auth_user (date_joined, id) 索引支持
+USER_ORDERING = ('-date_joined', '-id')
+
+
+def _ticket_count(**filters):
+    """用户彩票数量的相关子查询
+
+    不用 JOIN + GROUP BY，分页查询才能沿 (date_joined, id) 索引只读一页用户，
+    否则要先对全部用户分组排序。
+    """
+    tickets = (LotteryTicket.objects.filter(user=OuterRef('pk'), **filters)
+               .order_by().values('user').annotate(count=Count('id')).values('count'))
+    return Coalesce(Subquery(tickets, output_field=IntegerField()), 0)
+
+
+def user_list(query=''):
+    """用户管理列表：用户、资料以及购买/中奖彩票数量（一次查询）"""
+    users = User.objects.select_related('userprofile').annotate(
+        tickets_count=_ticket_count(),
+        winning_tickets=_ticket_count(is_winning=True),
+    )
+    if query:
+        users = users.filter(username__icontains=query)
+    return users
+
+
 @staff_member_required
 def user_management(request):
     """用户管理"""
-    users = User.objects.all().order_by('-date_joined')
-    
-    # 用户统计
-    user_stats = []
-    for user in users:
-        try:
-            profile = user.userprofile
-        except UserProfile.DoesNotExist:
-            profile = UserProfile.objects.create(user=user)
-        
-        tickets_count = LotteryTicket.objects.filter(user=user).count()
-        winning_tickets = LotteryTicket.objects.filter(user=user, is_winning=True).count()
-        
-        user_stats.append({
-            'user': user,
-            'profile': profile,
-            'tickets_count': tickets_count,
-            'winning_tickets': winning_tickets,
-        })
+    query = request.GET.get('q', '').strip()
+    
+    # 按 (注册时间, id) 进行键集分页，避免全表渲染和 OFFSET
+    page = CursorPaginator(user_list(query), USER_ORDERING, USER_PAGE_SIZE).get_page(request.GET)
     
-    return render(request, 'management/user_management.html', {'user_stats': user_stats})
+    user_stats = [{
+        'user': user,
+        'profile': getattr(user, 'userprofile', None),
+        'tickets_count': user.tickets_count,
+        'winning_tickets': user.winning_tickets,
+    } for user in page]
+    
+    # 用户统计（一次聚合查询）
+    now = timezone.now()
+    stats = User.objects.annotate(
+        has_won=Exists(LotteryTicket.objects.filter(user=OuterRef('pk'), is_winning=True)),
+    ).aggregate(
+        total_users_count=Count('id'),
+        active_users_count=Count('id', filter=Q(last_login__gte=now - timedelta(days=30))),
+        new_users_count=Count('id', filter=Q(date_joined__gte=now - timedelta(days=7))),
+        winning_users_count=Count('id', filter=Q(has_won=True)),
+    )
+    
+    context = {
+        'user_stats': user_stats,
+        'query': query,
+        'page': page,
+        **stats,
+    }
+    return render(request, 'management/user_management.html', context)
 
 
 @staff_member_required
@@ -154,21 +279,10 @@ def create_draw(request):
         
         lottery_type = get_object_or_404(LotteryType, id=lottery_type_id)
         
-        # 生成期次号
-        today = timezone.now().strftime('%Y%m%d')
-        existing_draws = LotteryDraw.objects.filter(
-            lottery_type=lottery_type,
-            draw_number__startswith=today
-        ).count()
-        draw_number = f"{today}-{existing_draws + 1:03d}"
-        
-        draw = LotteryDraw.objects.create(
-            lottery_type=lottery_type,
-            draw_number=draw_number,
-            draw_date=draw_date
-        )
+        # 期次号冲突时自动使用下一个期次号
+        draw = draws.create_draw(lottery_type, draw_date)
         
-        messages.success(request, f'新期次创建成功：{draw_number}')
+        messages.success(request, f'新期次创建成功：{draw.draw_number}')
         return redirect('management:draw_management')
     
     lottery_types = LotteryType.objects.filter(is_active=True)